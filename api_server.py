@@ -3,13 +3,41 @@ Flask API Server for Events
 Serves events and images from MongoDB
 """
 
-from flask import Flask, jsonify, request, send_file, Response
+from flask import Flask, jsonify, request, send_file, redirect, Response, g
 from flask_cors import CORS
-from database import DatabaseManager
+from storage import open_database
+from serialization import FastJSONProvider
+from event_queries import (
+    clean_event_data, listing_event_data, internal_listing_event_data,
+    build_event_filters, validate_user_event, prepare_user_event, user_event_conflicts, parse_bulk_events,
+    parse_changes_token, changes_since, changes_payload, resolve_image_url, parse_id_list, image_entry,
+    IMAGE_PROJECTION, FULL_RESYNC_PAYLOAD, CONFLICT_ERROR
+)
+from compression import negotiate_encoding, compress
+from response_cache import ResponseCache
+from snapshot import snapshot_file, MANIFEST_NAME
+from thumbnails import ThumbnailCache, thumbnail_format, thumbnail_path, image_key
+from event_store import EventStore
+from write_queue import WriteBehindQueue
+from event_feed import EventFeedHub
+from time_index import TimeIndexRefresher, parse_time_range
+from metrics import observe_request, register_cache, render_metrics
+from scrape_telemetry import compare_runs
+import profiling
+from profiling import stage
 from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
 import io
+import os
+import time
 import logging
-from config import API_PORT, API_HOST
+from config import (
+    API_PORT, API_HOST, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES,
+    COMPRESSION_MIN_BYTES, SNAPSHOT_DIR, CHANGES_MAX_LIMIT, METRICS_ENABLED, METRICS_TOKEN,
+    IMAGE_PROXY_ENABLED, THUMBNAIL_CARD_WIDTH, THUMBNAIL_MAX_AGE_SECONDS, EVENT_STORE_ENABLED,
+    WRITE_BEHIND_ENABLED, EVENT_FEED_ENABLED, EVENT_STREAM_MAX_CLIENTS_SYNC
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,92 +46,236 @@ logger = logging.getLogger(__name__)
 logging.getLogger('pymongo').setLevel(logging.WARNING)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # orjson-backed jsonify (handles ObjectId/datetime)
 CORS(app)  # Enable CORS for frontend
 
-# Initialize database
-db = DatabaseManager()
-
-def clean_event_data(event):
-    """Remove internal/sensitive fields from event data"""
-    # Fields to keep (whitelist approach - more secure)
-    # Removed: ticket_url, image_url (hidden from public API response)
-    allowed_fields = [
-        'external_id', 'title', 'date_time', 'end_time', 'venue',
-        'organizer', 'description', 'category_tags',
-        'guest_count', 'ticket_count', 'timezone',
-        'event_type', 'discovery_location'
-    ]
-    
-    # Create clean event dict with only allowed fields
-    clean_event = {k: v for k, v in event.items() if k in allowed_fields}
+# Initialize database (lazy: no connection or index work until first query)
+db = open_database(role='api')
+
+def migrate_schema():
+    """Bring the schema up to SCHEMA_VERSION (dev server; gunicorn migrates once in on_starting)"""
+    try:
+        if db.ensure_schema():
+            logger.info("🗂️ Schema migrated at API startup")
+    except Exception as e:
+        logger.error(f"❌ Schema migration failed at API startup: {e}")
+
+# Optional in-memory copy of the events collection (EVENT_STORE_ENABLED)
+event_store = EventStore(db) if EVENT_STORE_ENABLED else None
+if event_store is not None:
+    event_store.start()  # Loads in the background; reads use MongoDB until it is ready
+
+# Sorted start/end times for ?from=&to= when reading from MongoDB (built on first use)
+time_index = TimeIndexRefresher(db)
+
+def _reads():
+    """Where event reads go: the in-memory store once loaded, else MongoDB"""
+    if event_store is not None:
+        event_store.start()  # Restarts the refresh thread in a forked worker
+        if event_store.ready:
+            return event_store
+    return db
+
+# Serialized (and precompressed) bodies of read endpoints
+response_cache = ResponseCache(RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES)
+register_cache('response', response_cache.stats)
+
+# Batched writes of user-listed events (WRITE_BEHIND_ENABLED); cached listings are
+# cleared once a batch is written
+write_queue = WriteBehindQueue(db, on_flush=response_cache.clear) if WRITE_BEHIND_ENABLED else None
+
+# Live SSE stream of event changes (EVENT_FEED_ENABLED). Each open stream holds a
+# worker thread here, so streams are capped per worker; api_server_async scales them
+event_feed = EventFeedHub(
+    db, max_clients=EVENT_STREAM_MAX_CLIENTS_SYNC, on_change=response_cache.clear
+) if EVENT_FEED_ENABLED else None
+
+# Resized cover images on local disk (IMAGE_PROXY_ENABLED)
+thumbnail_cache = ThumbnailCache()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    profiling.begin(request.method, request.full_path, request.headers)
+
+@app.teardown_request
+def clear_request_profile(exc):
+    profiling.end()
+
+# Registered before compress_response so it runs after it (Flask runs
+# after_request hooks in reverse) and records the bytes actually sent
+@app.after_request
+def record_request_metrics(response):
+    if METRICS_ENABLED and 'request_started' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe_request(
+            request.method, route, response.status_code,
+            time.perf_counter() - g.request_started, response.content_length
+        )
+    return response
+
+def _cached_body_response(entry):
+    """Build a response from a cache entry, reusing its compressed variants"""
+    encoding = None
+    if len(entry.body) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
     
-    return clean_event
+    with stage('compress'):
+        body = response_cache.variant(entry, encoding)
+    response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
 
-def internal_clean_event_data(event):
-    """Remove only MongoDB internal fields, keep URLs for frontend"""
-    # Remove only MongoDB internal fields
-    internal_fields = ['_id', 'scraped_at', 'updated_at', 'source']
+def cached_response(view):
+    """Serve a GET view from the response cache; cache only successful bodies"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not response_cache.enabled:
+            return view(*args, **kwargs)
+        
+        # urlencode escapes '&' and '=' inside values, so distinct queries never share a key;
+        # only keys are sorted, since repeated values (?ids=) are answered in request order
+        key = request.path + '?' + urlencode(
+            [(k, v) for k, values in sorted(request.args.lists()) for v in values]
+        )
+        entry = response_cache.get(key)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.set(key, response.get_data())
+        
+        return _cached_body_response(entry)
+    return wrapper
+
+# Runs after compress_response (hooks run in reverse registration order),
+# so the total includes compression
+@app.after_request
+def finish_request_profile(response):
+    profile = profiling.end()
+    if profile is not None:
+        response.headers['Server-Timing'] = profile.server_timing()
+        response.headers['X-Profile-Id'] = profile.profile_id
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress uncached responses (cached ones are already encoded)"""
+    if (response.direct_passthrough
+            or response.is_streamed
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(('application/json', 'text/'))):
+        return response
     
-    # Create clean event dict
-    clean_event = {k: v for k, v in event.items() if k not in internal_fields}
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return response
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        with stage('compress'):
+            response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _window_page(ids, limit, skip):
+    """A listing page of time-window IDs (already in listing order), fetched by ID"""
+    page = ids[skip:skip + limit if limit else None]
+    with stage('db_fetch'):
+        found = db.get_events_by_ids(page)
+    # IDs can be a refresh interval stale; events deleted since are skipped
+    return [found[eid] for eid in page if eid in found], len(ids)
+
+def _listing_response(search, location, status, limit, skip, clean, time_range=None):
+    """Fetch, count, clean and serialize a listing page (each step timed when profiling)"""
+    reads = _reads()
+    if reads is event_store:
+        with stage('store_query'):
+            events, total = event_store.query(search, location, status, limit=limit, skip=skip,
+                                              time_range=time_range)
+    elif time_range is not None:
+        with stage('time_index'):
+            ids = time_index.get().window(*time_range)
+        filters = build_event_filters(search, location, status)
+        if not filters:
+            events, total = _window_page(ids, limit, skip)
+        else:
+            filters['external_id'] = {'$in': ids}
+            with stage('db_fetch'):
+                events = db.get_all_events(filters=filters, limit=limit, skip=skip)
+            with stage('db_count'):
+                total = db.count_events(filters=filters)
+    else:
+        filters = build_event_filters(search, location, status)
+        with stage('db_fetch'):
+            events = db.get_all_events(filters=filters, limit=limit, skip=skip)
+        with stage('db_count'):
+            total = db.count_events(filters=filters)
+    with stage('clean'):
+        clean_events = [clean(event) for event in events]
+    with stage('serialize'):
+        return jsonify({
+            'success': True,
+            'events': clean_events,
+            'total': total,
+            'count': len(clean_events)
+        })
+
+def _events_by_ids_response(values, clean):
+    """Batch lookup: one $in query, results in request order, unknown IDs listed as missing"""
+    try:
+        ids = parse_id_list(values)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    return clean_event
+    with stage('db_fetch'):
+        found = _reads().get_events_by_ids(ids)
+    with stage('clean'):
+        events = [clean(found[eid]) for eid in ids if eid in found]
+    with stage('serialize'):
+        return jsonify({
+            'success': True,
+            'events': events,
+            'count': len(events),
+            'missing': [eid for eid in ids if eid not in found]
+        })
 
 @app.route('/api/events', methods=['GET'])
+@cached_response
 def get_events():
     """Get all events with optional filtering (PUBLIC - URLs hidden)"""
     try:
+        # ?ids=a,b,c: batch lookup instead of a listing
+        if request.args.get('ids'):
+            return _events_by_ids_response(request.args.getlist('ids'), clean_event_data)
+        
         # Get query parameters with default limit
         limit = request.args.get('limit', 100, type=int)  # Default 100 events
         skip = request.args.get('skip', 0, type=int)
         search = request.args.get('search', '')
         location = request.args.get('location', '')
         status = request.args.get('status', '')
+        try:
+            time_range = parse_time_range(request.args.get('from'), request.args.get('to'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # Enforce maximum limit for security
         if limit > 500:
             limit = 500
         
-        # Build filters
-        filters = {}
-        
-        if search:
-            filters['$text'] = {'$search': search}
-        
-        if location:
-            filters['venue'] = {'$regex': location, '$options': 'i'}
-        
-        if status:
-            now = datetime.now().isoformat()
-            if status == 'upcoming':
-                filters['date_time'] = {'$gt': now}
-            elif status == 'ended':
-                filters['end_time'] = {'$lt': now}
-            elif status == 'ongoing':
-                filters['$and'] = [
-                    {'date_time': {'$lte': now}},
-                    {'end_time': {'$gte': now}}
-                ]
-        
-        # Get events
-        events = db.get_all_events(filters=filters, limit=limit, skip=skip)
-        total = db.count_events(filters=filters)
-        
         # Clean events data - remove internal fields AND URLs (public API)
-        clean_events = [clean_event_data(event) for event in events]
-        
-        return jsonify({
-            'success': True,
-            'events': clean_events,
-            'total': total,
-            'count': len(clean_events)
-        })
+        return _listing_response(search, location, status, limit, skip, listing_event_data, time_range)
         
     except Exception as e:
         logger.error(f"Error getting events: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/internal/events', methods=['GET'])
+@cached_response
 def get_internal_events():
     """Get all events with URLs (INTERNAL - for frontend use only)"""
     try:
@@ -113,51 +285,88 @@ def get_internal_events():
         search = request.args.get('search', '')
         location = request.args.get('location', '')
         status = request.args.get('status', '')
-        
-        # Build filters
-        filters = {}
-        
-        if search:
-            filters['$text'] = {'$search': search}
-        
-        if location:
-            filters['venue'] = {'$regex': location, '$options': 'i'}
-        
-        if status:
-            now = datetime.now().isoformat()
-            if status == 'upcoming':
-                filters['date_time'] = {'$gt': now}
-            elif status == 'ended':
-                filters['end_time'] = {'$lt': now}
-            elif status == 'ongoing':
-                filters['$and'] = [
-                    {'date_time': {'$lte': now}},
-                    {'end_time': {'$gte': now}}
-                ]
-        
-        # Get events
-        events = db.get_all_events(filters=filters, limit=limit, skip=skip)
-        total = db.count_events(filters=filters)
+        try:
+            time_range = parse_time_range(request.args.get('from'), request.args.get('to'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # Clean events data - remove only MongoDB internal fields, keep URLs
-        clean_events = [internal_clean_event_data(event) for event in events]
-        
-        return jsonify({
-            'success': True,
-            'events': clean_events,
-            'total': total,
-            'count': len(clean_events)
-        })
+        return _listing_response(search, location, status, limit, skip, internal_listing_event_data,
+                                 time_range)
         
     except Exception as e:
         logger.error(f"Error getting events: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _changes_response(clean):
+    """
+    Delta sync: upserts and deletions since the client's token.
+    
+    Token is an opaque string (epoch milliseconds, plus the last external_id
+    while paging). Without a token, every event is returned (paged by limit),
+    which is also the initial sync.
+    """
+    limit = min(request.args.get('limit', 500, type=int), CHANGES_MAX_LIMIT)
+    now = datetime.now(timezone.utc)
+    
+    try:
+        since_ms, after_id = parse_changes_token(request.args.get('since'))
+        since = changes_since(since_ms, now)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f"Invalid since token: {e}"}), 400
+    if since is None:
+        return jsonify(FULL_RESYNC_PAYLOAD)
+    
+    upserts, deletions, has_more = db.get_changes(since, limit=limit, after_id=after_id)
+    return jsonify(changes_payload(upserts, deletions, has_more, since, now, clean))
+
+@app.route('/api/events/changes', methods=['GET'])
+def get_event_changes():
+    """Events changed/deleted since ?since=<token> (PUBLIC - URLs hidden)"""
+    try:
+        return _changes_response(listing_event_data)
+    except Exception as e:
+        logger.error(f"Error getting event changes: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/internal/events/changes', methods=['GET'])
+def get_internal_event_changes():
+    """Events changed/deleted since ?since=<token> (INTERNAL - with URLs)"""
+    try:
+        return _changes_response(internal_listing_event_data)
+    except Exception as e:
+        logger.error(f"Error getting event changes: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _stream_response(internal):
+    if event_feed is None:
+        return jsonify({'success': False, 'error': 'Event stream disabled'}), 404
+    if event_feed.full():
+        response = jsonify({'success': False, 'error': 'Too many event streams'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    stream = event_feed.stream(request.headers.get('Last-Event-ID'), internal)
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let proxies buffer the stream
+    return response
+
+@app.route('/api/events/stream', methods=['GET'])
+def get_event_stream():
+    """Server-Sent Events: event upserts and deletions as they happen (PUBLIC - URLs hidden)"""
+    return _stream_response(internal=False)
+
+@app.route('/api/internal/events/stream', methods=['GET'])
+def get_internal_event_stream():
+    """Server-Sent Events: event upserts and deletions as they happen (INTERNAL - with URLs)"""
+    return _stream_response(internal=True)
+
 @app.route('/api/events/<event_id>', methods=['GET'])
+@cached_response
 def get_event(event_id):
     """Get a single event by ID"""
     try:
-        event = db.get_event_by_id(event_id)
+        event = _reads().get_event_by_id(event_id)
         
         if event:
             # Clean the event data
@@ -170,18 +379,46 @@ def get_event(event_id):
         logger.error(f"Error getting event {event_id}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/images', methods=['GET'])
+@cached_response
+def get_images():
+    """Image URLs for many events (?ids=a,b,c), in request order; one query for a page of cards"""
+    try:
+        ids = parse_id_list(request.args.getlist('ids'))
+        if not ids:
+            return jsonify({'success': False, 'error': 'ids is required'}), 400
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        with stage('db_fetch'):
+            found = _reads().get_events_by_ids(ids, projection=IMAGE_PROJECTION)
+        return jsonify({
+            'success': True,
+            'images': [image_entry(eid, found.get(eid)) for eid in ids]
+        })
+    except Exception as e:
+        logger.error(f"Error getting image URLs: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/images/<event_id>', methods=['GET'])
+@cached_response
 def get_image(event_id):
     """Get image URL for an event (returns URL, not image data)"""
     try:
-        event = db.get_event_by_id(event_id)
+        event = _reads().get_event_by_id(event_id)
+        # Broken images (see image_health.py) are dropped or substituted per BROKEN_IMAGE_POLICY
+        image_url = resolve_image_url(event) if event else None
         
-        if event and event.get('image_url'):
+        if image_url:
             # Return the image URL so frontend can load it directly
-            return jsonify({
+            payload = {
                 'success': True,
-                'image_url': event['image_url']
-            })
+                'image_url': image_url
+            }
+            if IMAGE_PROXY_ENABLED:
+                payload['thumbnail_url'] = thumbnail_path(event_id, image_url)
+            return jsonify(payload)
         else:
             # Return placeholder if no image
             return jsonify({
@@ -193,7 +430,45 @@ def get_image(event_id):
         logger.error(f"Error getting image URL for {event_id}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/images/<event_id>/thumb', methods=['GET'])
+def get_image_thumbnail(event_id):
+    """
+    Resized cover image (?w=<width>, ?format=webp|jpeg, else negotiated from Accept).
+    Falls back to a redirect to the original image if a thumbnail can't be made.
+    """
+    if not IMAGE_PROXY_ENABLED:
+        return jsonify({'success': False, 'error': 'Image proxy disabled'}), 404
+    try:
+        event = _reads().get_event_by_id(event_id)
+        image_url = resolve_image_url(event) if event else None
+        if not (image_url or '').startswith('http'):
+            return jsonify({'success': False, 'error': 'Image not found'}), 404
+        
+        fmt = request.args.get('format') or thumbnail_format(request.headers.get('Accept'))
+        width = request.args.get('w', THUMBNAIL_CARD_WIDTH, type=int)
+        with stage('thumbnail'):
+            path, mimetype = thumbnail_cache.thumbnail(image_url, width, fmt)
+        if path is None:
+            return redirect(image_url)
+        
+        # Versioned URLs (v = hash of the source URL) never change content
+        versioned = request.args.get('v') == image_key(image_url)
+        response = send_file(
+            path, mimetype=mimetype,
+            max_age=31536000 if versioned else THUMBNAIL_MAX_AGE_SECONDS
+        )
+        response.cache_control.public = True
+        if versioned:
+            response.cache_control.immutable = True
+        if not request.args.get('format'):
+            response.vary.add('Accept')
+        return response
+    except Exception as e:
+        logger.error(f"Error getting thumbnail for {event_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/stats', methods=['GET'])
+@cached_response
 def get_stats():
     """Get database statistics"""
     try:
@@ -203,85 +478,216 @@ def get_stats():
         logger.error(f"Error getting stats: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/snapshot/manifest.json', methods=['GET'])
+def get_snapshot_manifest():
+    """Manifest of the current static snapshot (short-lived cache)"""
+    path = os.path.join(SNAPSHOT_DIR, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return jsonify({'success': False, 'error': 'No snapshot available'}), 404
+    return send_file(path, mimetype='application/json', max_age=60)
+
+@app.route('/api/snapshot/<path:shard_path>', methods=['GET'])
+def get_snapshot_shard(shard_path):
+    """Serve a precompressed snapshot shard straight from disk (versioned, immutable)"""
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    path, used_encoding = snapshot_file(SNAPSHOT_DIR, shard_path, encoding)
+    if not path:
+        return jsonify({'success': False, 'error': 'Snapshot shard not found'}), 404
+    
+    response = send_file(
+        path, mimetype='application/json', download_name=os.path.basename(shard_path),
+        max_age=31536000, etag=False
+    )
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    response.vary.add('Accept-Encoding')
+    if used_encoding:
+        response.headers['Content-Encoding'] = used_encoding
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    payload = {
         'success': True,
         'status': 'healthy',
         'timestamp': datetime.now().isoformat()
-    })
+    }
+    if event_store is not None:
+        payload['event_store'] = event_store.stats()
+    if write_queue is not None:
+        payload['write_queue'] = write_queue.stats()
+    if event_feed is not None:
+        payload['event_stream'] = event_feed.stats()
+    return jsonify(payload)
+
+@app.route('/api/scrape-runs', methods=['GET'])
+def get_scrape_runs():
+    """Recent scrape runs with their totals"""
+    try:
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        return jsonify({'success': True, 'runs': db.get_scrape_runs(limit=limit)})
+    except Exception as e:
+        logger.error(f"Error getting scrape runs: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scrape-runs/compare', methods=['GET'])
+def compare_scrape_runs():
+    """Compare two scrape runs: ?a=<run_id>&b=<run_id>"""
+    try:
+        run_a = db.get_scrape_run(request.args.get('a', ''))
+        run_b = db.get_scrape_run(request.args.get('b', ''))
+        if not run_a or not run_b:
+            return jsonify({'success': False, 'error': 'Scrape run not found'}), 404
+        return jsonify({'success': True, 'comparison': compare_runs(run_a, run_b)})
+    except Exception as e:
+        logger.error(f"Error comparing scrape runs: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scrape-runs/<run_id>', methods=['GET'])
+def get_scrape_run(run_id):
+    """A single scrape run with per-location timings"""
+    try:
+        run = db.get_scrape_run(run_id)
+        if not run:
+            return jsonify({'success': False, 'error': 'Scrape run not found'}), 404
+        return jsonify({'success': True, 'run': run})
+    except Exception as e:
+        logger.error(f"Error getting scrape run {run_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def get_profiles():
+    """Recent request profiles from this process (requires X-Profile token)"""
+    if not profiling.is_authorized(request.headers):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    return jsonify({'success': True, 'profiles': profiling.profile_store.list()})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One request profile, including the cProfile report if captured"""
+    if not profiling.is_authorized(request.headers):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    profile = profiling.profile_store.get(profile_id)
+    if not profile:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return jsonify({'success': True, 'profile': profile})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text-format metrics for this process"""
+    if not METRICS_ENABLED:
+        return jsonify({'success': False, 'error': 'Metrics disabled'}), 404
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: database reachable and schema migrated (health stays a liveness check)"""
+    if db.is_ready():
+        return jsonify({'success': True, 'status': 'ready'})
+    return jsonify({'success': False, 'status': 'not ready'}), 503
+
+def _save_user_events(items):
+    """
+    Queue (write-behind) or write prepared submissions.
+    
+    Returns:
+        (outcomes, failure): outcomes per item when written now (None when queued;
+        conflicts are then logged by the writer), failure as (response body, status)
+        when they cannot be accepted
+    """
+    if write_queue is not None:
+        if not write_queue.submit(items):
+            return None, ({'success': False, 'error': 'Too many pending submissions, retry shortly'}, 503)
+        return None, None
+    outcomes = db.save_user_events(items)
+    if outcomes is None:
+        return None, ({'success': False, 'error': 'Failed to save event'}, 500)
+    response_cache.clear()
+    return outcomes, None
 
 @app.route('/api/user/list-event', methods=['POST'])
 def list_event():
-    """Save user-listed event to MongoDB user collection. Images as URLs."""
+    """
+    Save user-listed event to MongoDB user collection. Images as URLs.
+    
+    An Idempotency-Key header makes retries safe: the same key always maps to
+    the same external_id, and reusing it for a different event is a 409 (the
+    stored listing is kept). With write-behind on, the response is 202 once
+    queued and such conflicts are only logged by the writer.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'success': False, 'error': 'No JSON body'}), 400
+        data = request.get_json(silent=True)
+        error = validate_user_event(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         
-        title = (data.get('title') or '').strip()
-        if not title:
-            return jsonify({'success': False, 'error': 'Title is required'}), 400
-        
-        # Build event doc; store image as URL only
-        event_data = {
-            'title': title,
-            'description': (data.get('description') or '').strip() or None,
-            'venue': (data.get('venue') or '').strip() or None,
-            'date_time': (data.get('date_time') or '').strip() or None,
-            'end_time': (data.get('end_time') or '').strip() or None,
-            'image_url': (data.get('image_url') or '').strip() or None,
-            'category_tags': (data.get('category_tags') or '').strip() or None,
-            'organizer': (data.get('organizer') or '').strip() or None,
-            'ticket_url': (data.get('ticket_url') or '').strip() or None,
-            'event_type': (data.get('event_type') or '').strip() or None,
-            # Extended structured fields from multi-step form (all optional)
-            'organizer_details': data.get('organizer_details') or None,
-            'tickets': data.get('tickets') or [],
-            'sponsors': data.get('sponsors') or [],
-            'partners': data.get('partners') or [],
-            'faqs': data.get('faqs') or [],
-            'contents': data.get('contents') or [],
-        }
+        # Build event docs; store image as URL only
+        item = prepare_user_event(data, request.headers.get('Idempotency-Key') or data.get('idempotency_key'))
+        outcomes, failure = _save_user_events([item])
+        if failure:
+            return jsonify(failure[0]), failure[1]
         
-        eid = db.save_user_listed_event(event_data)
-        if eid:
-            # Also insert into main events collection so it appears in listings
-            tags = event_data['category_tags']
-            if not tags:
-                base_tags = ['crypto', 'web3', 'blockchain']
-                if event_data.get('event_type'):
-                    base_tags.append(event_data['event_type'])
-                tags = ','.join(base_tags)
-
-            event_doc = {
-                'external_id': eid,
-                'event_slug': None,
-                'title': event_data['title'],
-                'date_time': event_data['date_time'],
-                'end_time': event_data['end_time'],
-                'venue': event_data['venue'],
-                'organizer': event_data['organizer'],
-                'description': event_data['description'],
-                'category_tags': tags,
-                'ticket_url': event_data['ticket_url'],
-                'image_url': event_data['image_url'],
-                'guest_count': 0,
-                'ticket_count': 0,
-                'discovery_location': None,
-                'timezone': None,
-                'scraped_at': datetime.now(timezone.utc).isoformat(),
-                'source': 'user_listed'
-            }
-            db.save_event(event_doc)
-
-            return jsonify({'success': True, 'external_id': eid})
-        return jsonify({'success': False, 'error': 'Failed to save event'}), 500
+        eid = item[0]['external_id']
+        if outcomes and outcomes[0] == 'conflict':
+            return jsonify({'success': False, 'error': CONFLICT_ERROR, 'external_id': eid}), 409
+        if write_queue is not None:
+            return jsonify({'success': True, 'external_id': eid, 'queued': True}), 202
+        return jsonify({'success': True, 'external_id': eid})
     except Exception as e:
         logger.error(f"Error in list-event: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/user/list-events', methods=['POST'])
+def list_events_bulk():
+    """
+    Bulk list-event: {"events": [...]} (or a bare list), up to BULK_LIST_MAX_EVENTS.
+    
+    Each event may carry an idempotency_key; otherwise one is derived from the
+    request's Idempotency-Key header and the event's position. Invalid events are
+    reported in errors and skipped; the rest are written in one batch. Keys reused
+    for a different event are reported in errors too (when written synchronously).
+    """
+    try:
+        try:
+            submissions = parse_bulk_events(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        request_key = request.headers.get('Idempotency-Key')
+        items, external_ids, errors = [], [], []
+        for index, data in enumerate(submissions):
+            error = validate_user_event(data)
+            if error:
+                errors.append({'index': index, 'error': error})
+                external_ids.append(None)
+                continue
+            key = data.get('idempotency_key') or (f"{request_key}:{index}" if request_key else None)
+            items.append(prepare_user_event(data, key))
+            external_ids.append(items[-1][0]['external_id'])
+        
+        if not items:
+            return jsonify({'success': False, 'error': 'No valid events', 'errors': errors}), 400
+        outcomes, failure = _save_user_events(items)
+        if failure:
+            return jsonify(failure[0]), failure[1]
+        conflicts = user_event_conflicts(items, outcomes, external_ids)
+        errors.extend({'index': index, 'error': CONFLICT_ERROR} for index in conflicts)
+        
+        body = {
+            'success': True,
+            'accepted': len(items) - len(conflicts),
+            'external_ids': external_ids,
+            'errors': errors,
+            'queued': write_queue is not None
+        }
+        return jsonify(body), 202 if write_queue is not None else 200
+    except Exception as e:
+        logger.error(f"Error in list-events: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/')
 def index():
     """API documentation"""
@@ -291,11 +697,23 @@ def index():
         'endpoints': {
             '/api/events': 'Get all events (PUBLIC - URLs hidden)',
             '/api/internal/events': 'Get all events with URLs (INTERNAL - for frontend)',
+            '/api/events?from=<date>&to=<date>': 'Events overlapping a date range (ISO date/datetime or epoch seconds; also /api/internal/events)',
             '/api/events/<id>': 'Get single event (PUBLIC)',
+            '/api/events?ids=<id>,<id>': 'Batch lookup by IDs, in request order (PUBLIC)',
+            '/api/events/changes?since=<token>': 'Delta sync: upserts and deletions since token',
+            '/api/events/stream': 'Server-Sent Events: live upserts and deletions (Last-Event-ID resumes; also /api/internal/events/stream)',
             '/api/images/<id>': 'Get event image URL',
-            '/api/user/list-event': 'POST: Submit user-listed event',
+            '/api/images?ids=<id>,<id>': 'Batch image URLs, in request order',
+            '/api/images/<id>/thumb?w=<width>': 'Resized cover image (WebP/JPEG, when IMAGE_PROXY_ENABLED)',
+            '/api/user/list-event': 'POST: Submit user-listed event (Idempotency-Key header supported)',
+            '/api/user/list-events': 'POST: Submit up to BULK_LIST_MAX_EVENTS user-listed events in one batch',
+            '/api/snapshot/manifest.json': 'Static snapshot manifest (sharded, precompressed listings)',
             '/api/stats': 'Get database statistics',
-            '/api/health': 'Health check'
+            '/api/scrape-runs': 'Recent scrape run telemetry (/<run_id>, /compare?a=&b=)',
+            '/api/health': 'Health check',
+            '/api/admin/profiles': 'Recent request profiles (X-Profile token required)',
+            '/api/metrics': 'Prometheus metrics (requests, latency, payload sizes, Mongo commands, cache)',
+            '/api/ready': 'Readiness check (database reachable, schema migrated)'
         }
     })
 
@@ -309,9 +727,11 @@ if __name__ == '__main__':
     print(f"📄 API Docs: http://localhost:{API_PORT}/")
     print(f"🔍 Events: http://localhost:{API_PORT}/api/events")
     print(f"📊 Stats: http://localhost:{API_PORT}/api/stats")
+    print("\n⚠️  Development server. For production use: gunicorn -c gunicorn.conf.py wsgi:app")
     print("\n⏹️  Press Ctrl+C to stop")
     print("=" * 60 + "\n")
     
+    migrate_schema()
     try:
         app.run(host=API_HOST, port=API_PORT, debug=False, use_reloader=False)
     except KeyboardInterrupt:
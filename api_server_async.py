@@ -0,0 +1,520 @@
+"""
+ASGI Events API (async variant of api_server.py)
+Same routes and response shapes, backed by Motor so an in-flight Atlas
+round trip doesn't hold a worker thread; find and count run concurrently.
+Not yet ported: /api/scrape-runs (list, compare, by id) and /api/admin/profiles;
+use api_server.py for those.
+
+    uvicorn api_server_async:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, FileResponse, RedirectResponse, StreamingResponse
+from starlette.routing import Route
+from async_database import AsyncDatabaseManager
+from database import DatabaseManager
+from event_feed import EventFeedHub
+from compression import negotiate_encoding
+from event_queries import (
+    clean_event_data, listing_event_data, internal_listing_event_data,
+    build_event_filters, validate_user_event, prepare_user_event, user_event_conflicts, parse_bulk_events,
+    parse_changes_token, changes_since, changes_payload, CONFLICT_ERROR,
+    resolve_image_url, parse_id_list, image_entry, IMAGE_PROJECTION, FULL_RESYNC_PAYLOAD
+)
+from serialization import dumps, loads
+from snapshot import snapshot_file, MANIFEST_NAME
+from time_index import TimeIndexRefresher, parse_time_range
+from thumbnails import ThumbnailCache, thumbnail_format, thumbnail_path, image_key
+from metrics import observe_request, render_metrics
+from config import (
+    COMPRESSION_MIN_BYTES, SNAPSHOT_DIR, CHANGES_MAX_LIMIT, METRICS_ENABLED, METRICS_TOKEN,
+    IMAGE_PROXY_ENABLED, THUMBNAIL_CARD_WIDTH, THUMBNAIL_MAX_AGE_SECONDS, EVENT_FEED_ENABLED,
+    EVENT_STREAM_MAX_CLIENTS
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reduce MongoDB logging verbosity
+logging.getLogger('pymongo').setLevel(logging.WARNING)
+
+db = AsyncDatabaseManager(role='api')
+time_index = TimeIndexRefresher(db)
+thumbnail_cache = ThumbnailCache()
+
+# Live SSE stream of event changes: the feed is tailed by one thread (sync client),
+# each open stream is just a parked coroutine
+event_feed = EventFeedHub(
+    DatabaseManager(role='api'), max_clients=EVENT_STREAM_MAX_CLIENTS
+) if EVENT_FEED_ENABLED else None
+
+
+class JSONResponse(Response):
+    """JSON response using the shared serializer (orjson when available)"""
+    media_type = 'application/json'
+
+    def render(self, content):
+        return dumps(content)
+
+
+def _int_arg(request, name, default=None):
+    """Integer query parameter; falls back to default when missing or invalid (like Flask's type=int)"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _error(message, status_code=500):
+    return JSONResponse({'success': False, 'error': message}, status_code=status_code)
+
+
+async def _listing(request, clean, default_limit, max_limit):
+    limit = _int_arg(request, 'limit', default_limit)
+    if max_limit and limit and limit > max_limit:
+        limit = max_limit
+    skip = _int_arg(request, 'skip', 0)
+    try:
+        time_range = parse_time_range(request.query_params.get('from'), request.query_params.get('to'))
+    except ValueError as e:
+        return _error(str(e), 400)
+    filters = build_event_filters(
+        request.query_params.get('search', ''),
+        request.query_params.get('location', ''),
+        request.query_params.get('status', '')
+    )
+
+    if time_range is None:
+        events, total = await db.get_events_page(filters=filters, limit=limit, skip=skip)
+    else:
+        # See api_server._listing_response
+        ids = (await time_index.get_async()).window(*time_range)
+        if filters:
+            filters['external_id'] = {'$in': ids}
+            events, total = await db.get_events_page(filters=filters, limit=limit, skip=skip)
+        else:
+            page = ids[skip:skip + limit if limit else None]
+            found = await db.get_events_by_ids(page)
+            events, total = [found[eid] for eid in page if eid in found], len(ids)
+    clean_events = [clean(event) for event in events]
+    return JSONResponse({
+        'success': True,
+        'events': clean_events,
+        'total': total,
+        'count': len(clean_events)
+    })
+
+
+async def _events_by_ids(request, clean):
+    """Batch lookup (see api_server._events_by_ids_response)"""
+    try:
+        ids = parse_id_list(request.query_params.getlist('ids'))
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    found = await db.get_events_by_ids(ids)
+    events = [clean(found[eid]) for eid in ids if eid in found]
+    return JSONResponse({
+        'success': True,
+        'events': events,
+        'count': len(events),
+        'missing': [eid for eid in ids if eid not in found]
+    })
+
+
+async def get_events(request):
+    """Get all events with optional filtering (PUBLIC - URLs hidden)"""
+    try:
+        if request.query_params.get('ids'):
+            return await _events_by_ids(request, clean_event_data)
+        return await _listing(request, listing_event_data, default_limit=100, max_limit=500)
+    except Exception as e:
+        logger.error(f"Error getting events: {e}")
+        return _error(str(e))
+
+
+async def get_internal_events(request):
+    """Get all events with URLs (INTERNAL - for frontend use only)"""
+    try:
+        return await _listing(request, internal_listing_event_data, default_limit=None, max_limit=None)
+    except Exception as e:
+        logger.error(f"Error getting events: {e}")
+        return _error(str(e))
+
+
+async def _changes(request, clean):
+    limit = min(_int_arg(request, 'limit', 500), CHANGES_MAX_LIMIT)
+    now = datetime.now(timezone.utc)
+
+    try:
+        since_ms, after_id = parse_changes_token(request.query_params.get('since'))
+        since = changes_since(since_ms, now)
+    except ValueError as e:
+        return _error(f"Invalid since token: {e}", 400)
+    if since is None:
+        return JSONResponse(FULL_RESYNC_PAYLOAD)
+
+    upserts, deletions, has_more = await db.get_changes(since, limit=limit, after_id=after_id)
+    return JSONResponse(changes_payload(upserts, deletions, has_more, since, now, clean))
+
+
+async def get_event_changes(request):
+    """Events changed/deleted since ?since=<token> (PUBLIC - URLs hidden)"""
+    try:
+        return await _changes(request, listing_event_data)
+    except Exception as e:
+        logger.error(f"Error getting event changes: {e}")
+        return _error(str(e))
+
+
+async def get_internal_event_changes(request):
+    """Events changed/deleted since ?since=<token> (INTERNAL - with URLs)"""
+    try:
+        return await _changes(request, internal_listing_event_data)
+    except Exception as e:
+        logger.error(f"Error getting event changes: {e}")
+        return _error(str(e))
+
+
+def _stream(request, internal):
+    if event_feed is None:
+        return _error('Event stream disabled', 404)
+    if event_feed.full():
+        return JSONResponse({'success': False, 'error': 'Too many event streams'}, 503,
+                            headers={'Retry-After': '30'})
+    return StreamingResponse(
+        event_feed.stream_async(request.headers.get('last-event-id'), internal),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def get_event_stream(request):
+    """Server-Sent Events: event upserts and deletions as they happen (PUBLIC - URLs hidden)"""
+    return _stream(request, internal=False)
+
+
+async def get_internal_event_stream(request):
+    """Server-Sent Events: event upserts and deletions as they happen (INTERNAL - with URLs)"""
+    return _stream(request, internal=True)
+
+
+async def get_event(request):
+    """Get a single event by ID"""
+    event_id = request.path_params['event_id']
+    try:
+        event = await db.get_event_by_id(event_id)
+        if event:
+            return JSONResponse({'success': True, 'event': clean_event_data(event)})
+        return _error('Event not found', 404)
+    except Exception as e:
+        logger.error(f"Error getting event {event_id}: {e}")
+        return _error(str(e))
+
+
+async def get_images(request):
+    """Image URLs for many events (?ids=a,b,c), in request order"""
+    try:
+        ids = parse_id_list(request.query_params.getlist('ids'))
+    except ValueError as e:
+        return _error(str(e), 400)
+    if not ids:
+        return _error('ids is required', 400)
+    try:
+        found = await db.get_events_by_ids(ids, projection=IMAGE_PROJECTION)
+        return JSONResponse({'success': True, 'images': [image_entry(eid, found.get(eid)) for eid in ids]})
+    except Exception as e:
+        logger.error(f"Error getting image URLs: {e}")
+        return _error(str(e))
+
+
+async def get_image(request):
+    """Get image URL for an event (returns URL, not image data)"""
+    event_id = request.path_params['event_id']
+    try:
+        event = await db.get_event_by_id(event_id)
+        image_url = resolve_image_url(event) if event else None
+        if image_url:
+            payload = {'success': True, 'image_url': image_url}
+            if IMAGE_PROXY_ENABLED:
+                payload['thumbnail_url'] = thumbnail_path(event_id, image_url)
+            return JSONResponse(payload)
+        return JSONResponse({'success': False, 'image_url': None}, status_code=404)
+    except Exception as e:
+        logger.error(f"Error getting image URL for {event_id}: {e}")
+        return _error(str(e))
+
+
+async def get_image_thumbnail(request):
+    """Resized cover image (see api_server.get_image_thumbnail); fetch/resize runs in a thread"""
+    if not IMAGE_PROXY_ENABLED:
+        return _error('Image proxy disabled', 404)
+    event_id = request.path_params['event_id']
+    try:
+        event = await db.get_event_by_id(event_id)
+        image_url = resolve_image_url(event) if event else None
+        if not (image_url or '').startswith('http'):
+            return _error('Image not found', 404)
+
+        fmt = request.query_params.get('format') or thumbnail_format(request.headers.get('accept'))
+        try:
+            width = int(request.query_params.get('w', THUMBNAIL_CARD_WIDTH))
+        except ValueError:
+            width = THUMBNAIL_CARD_WIDTH
+        path, mimetype = await run_in_threadpool(thumbnail_cache.thumbnail, image_url, width, fmt)
+        if path is None:
+            return RedirectResponse(image_url, status_code=302)
+
+        if request.query_params.get('v') == image_key(image_url):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = f'public, max-age={THUMBNAIL_MAX_AGE_SECONDS}'
+        headers = {'Cache-Control': cache_control}
+        if not request.query_params.get('format'):
+            headers['Vary'] = 'Accept'
+        return FileResponse(path, media_type=mimetype, headers=headers)
+    except Exception as e:
+        logger.error(f"Error getting thumbnail for {event_id}: {e}")
+        return _error(str(e))
+
+
+async def get_stats(request):
+    """Get database statistics"""
+    try:
+        return JSONResponse({'success': True, 'stats': await db.get_stats()})
+    except Exception as e:
+        logger.error(f"Error getting stats: {e}")
+        return _error(str(e))
+
+
+async def get_snapshot_manifest(request):
+    """Manifest of the current static snapshot (short-lived cache)"""
+    path = os.path.join(SNAPSHOT_DIR, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return _error('No snapshot available', 404)
+    return FileResponse(path, media_type='application/json', headers={'Cache-Control': 'public, max-age=60'})
+
+
+async def get_snapshot_shard(request):
+    """Serve a precompressed snapshot shard straight from disk (versioned, immutable)"""
+    encoding = negotiate_encoding(request.headers.get('accept-encoding', ''))
+    path, used_encoding = snapshot_file(SNAPSHOT_DIR, request.path_params['shard_path'], encoding)
+    if not path:
+        return _error('Snapshot shard not found', 404)
+
+    headers = {'Cache-Control': 'public, max-age=31536000, immutable', 'Vary': 'Accept-Encoding'}
+    if used_encoding:
+        headers['Content-Encoding'] = used_encoding
+    return FileResponse(path, media_type='application/json', headers=headers)
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    payload = {
+        'success': True,
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat()
+    }
+    if event_feed is not None:
+        payload['event_stream'] = event_feed.stats()
+    return JSONResponse(payload)
+
+
+async def get_metrics(request):
+    """Prometheus text-format metrics for this process"""
+    if not METRICS_ENABLED:
+        return _error('Metrics disabled', 404)
+    if METRICS_TOKEN and request.headers.get('authorization') != f"Bearer {METRICS_TOKEN}":
+        return _error('Unauthorized', 401)
+    return Response(render_metrics(), media_type='text/plain; version=0.0.4')
+
+
+async def readiness_check(request):
+    """Readiness probe: database reachable and schema migrated"""
+    if await db.is_ready():
+        return JSONResponse({'success': True, 'status': 'ready'})
+    return JSONResponse({'success': False, 'status': 'not ready'}, status_code=503)
+
+
+async def list_event(request):
+    """Save user-listed event (see api_server.list_event; written before responding)"""
+    try:
+        try:
+            data = loads(await request.body())
+        except ValueError:
+            data = None
+        error = validate_user_event(data)
+        if error:
+            return _error(error, 400)
+
+        item = prepare_user_event(data, request.headers.get('Idempotency-Key') or data.get('idempotency_key'))
+        outcomes = await db.save_user_events([item])
+        if outcomes is None:
+            return _error('Failed to save event')
+        if outcomes[0] == 'conflict':
+            return JSONResponse({'success': False, 'error': CONFLICT_ERROR, 'external_id': item[0]['external_id']},
+                                status_code=409)
+        return JSONResponse({'success': True, 'external_id': item[0]['external_id']})
+    except Exception as e:
+        logger.error(f"Error in list-event: {e}")
+        return _error(str(e))
+
+
+async def list_events_bulk(request):
+    """Bulk list-event (see api_server.list_events_bulk), written as one batch before responding"""
+    try:
+        try:
+            submissions = parse_bulk_events(loads(await request.body()))
+        except ValueError as e:
+            return _error(str(e), 400)
+
+        request_key = request.headers.get('Idempotency-Key')
+        items, external_ids, errors = [], [], []
+        for index, data in enumerate(submissions):
+            error = validate_user_event(data)
+            if error:
+                errors.append({'index': index, 'error': error})
+                external_ids.append(None)
+                continue
+            key = data.get('idempotency_key') or (f"{request_key}:{index}" if request_key else None)
+            items.append(prepare_user_event(data, key))
+            external_ids.append(items[-1][0]['external_id'])
+
+        if not items:
+            return JSONResponse({'success': False, 'error': 'No valid events', 'errors': errors},
+                                status_code=400)
+        outcomes = await db.save_user_events(items)
+        if outcomes is None:
+            return _error('Failed to save events')
+        conflicts = user_event_conflicts(items, outcomes, external_ids)
+        errors.extend({'index': index, 'error': CONFLICT_ERROR} for index in conflicts)
+        return JSONResponse({
+            'success': True,
+            'accepted': len(items) - len(conflicts),
+            'external_ids': external_ids,
+            'errors': errors,
+            'queued': False
+        })
+    except Exception as e:
+        logger.error(f"Error in list-events: {e}")
+        return _error(str(e))
+
+
+async def index(request):
+    """API documentation"""
+    return JSONResponse({
+        'name': 'Crypto Events API',
+        'version': '1.0.0',
+        'server': 'asgi',
+        'endpoints': {
+            '/api/events': 'Get all events (PUBLIC - URLs hidden)',
+            '/api/internal/events': 'Get all events with URLs (INTERNAL - for frontend)',
+            '/api/events?from=<date>&to=<date>': 'Events overlapping a date range (ISO date/datetime or epoch seconds; also /api/internal/events)',
+            '/api/events/<id>': 'Get single event (PUBLIC)',
+            '/api/events?ids=<id>,<id>': 'Batch lookup by IDs, in request order (PUBLIC)',
+            '/api/events/changes?since=<token>': 'Delta sync: upserts and deletions since token',
+            '/api/events/stream': 'Server-Sent Events: live upserts and deletions (Last-Event-ID resumes; also /api/internal/events/stream)',
+            '/api/images/<id>': 'Get event image URL',
+            '/api/images?ids=<id>,<id>': 'Batch image URLs, in request order',
+            '/api/images/<id>/thumb?w=<width>': 'Resized cover image (WebP/JPEG, when IMAGE_PROXY_ENABLED)',
+            '/api/user/list-event': 'POST: Submit user-listed event (Idempotency-Key header supported)',
+            '/api/user/list-events': 'POST: Submit up to BULK_LIST_MAX_EVENTS user-listed events in one batch',
+            '/api/snapshot/manifest.json': 'Static snapshot manifest (sharded, precompressed listings)',
+            '/api/stats': 'Get database statistics',
+            '/api/health': 'Health check',
+            '/api/metrics': 'Prometheus metrics (requests, latency, payload sizes, Mongo commands)',
+            '/api/ready': 'Readiness check (database reachable, schema migrated)'
+        }
+    })
+
+
+routes = [
+    Route('/', index),
+    Route('/api/events', get_events),
+    Route('/api/internal/events', get_internal_events),
+    # Static paths before /api/events/{event_id}
+    Route('/api/events/changes', get_event_changes),
+    Route('/api/internal/events/changes', get_internal_event_changes),
+    Route('/api/events/stream', get_event_stream),
+    Route('/api/internal/events/stream', get_internal_event_stream),
+    Route('/api/events/{event_id}', get_event),
+    Route('/api/images', get_images),
+    Route('/api/images/{event_id}', get_image),
+    Route('/api/images/{event_id}/thumb', get_image_thumbnail),
+    Route('/api/stats', get_stats),
+    Route('/api/snapshot/manifest.json', get_snapshot_manifest),
+    Route('/api/snapshot/{shard_path:path}', get_snapshot_shard),
+    Route('/api/health', health_check),
+    Route('/api/metrics', get_metrics),
+    Route('/api/ready', readiness_check),
+    Route('/api/user/list-event', list_event, methods=['POST']),
+    Route('/api/user/list-events', list_events_bulk, methods=['POST']),
+]
+
+# Endpoint function -> route template, for metric labels
+_route_paths = {route.endpoint: route.path for route in routes}
+
+
+class MetricsMiddleware:
+    """Records per-route request count, latency and bytes sent (outermost, so sizes are post-gzip)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        state = {'status': 500, 'size': 0}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                state['size'] += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = _route_paths.get(scope.get('endpoint'), 'unmatched')
+            observe_request(
+                scope['method'], route, state['status'],
+                time.perf_counter() - started, state['size']
+            )
+
+
+middleware = [
+    Middleware(MetricsMiddleware),
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    Middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_BYTES),
+]
+
+@asynccontextmanager
+async def lifespan(app):
+    # Migrations use the sync manager; a find_one once the schema is current, and
+    # only the worker that claims the migration runs it (see ensure_schema)
+    schema_db = DatabaseManager(role='api')
+    try:
+        await run_in_threadpool(schema_db.ensure_schema)
+    except Exception as e:
+        logger.error(f"❌ Schema migration failed at API startup: {e}")
+    finally:
+        schema_db.close()
+    yield
+    if event_feed is not None:
+        event_feed.stop()
+    db.close()
+
+
+app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
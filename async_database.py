@@ -0,0 +1,210 @@
+"""
+Async MongoDB Database Manager
+Motor-backed counterpart of DatabaseManager for the ASGI API (api_server_async.py).
+Query shapes are shared with database.py so both servers return the same data.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, UpdateOne, ReadPreference
+from pymongo.errors import BulkWriteError, CollectionInvalid
+from metrics import command_listener
+from database import (
+    build_event_upsert, changes_query, client_options, feed_upserts, user_event_outcomes, stats_queries,
+    format_stats, SCHEMA_VERSION
+)
+from config import (
+    MONGODB_URI, METRICS_ENABLED, DATABASE_NAME, EVENTS_COLLECTION, USER_COLLECTION, TOMBSTONES_COLLECTION,
+    META_COLLECTION, EVENT_FEED_COLLECTION, EVENT_FEED_ENABLED, EVENT_FEED_CAPPED_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseManager:
+    def __init__(self, role='api'):
+        """Set up the manager; the Motor client is created on first use (inside the event loop)"""
+        self.role = role
+        self._client = None
+        self._feed_checked = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                MONGODB_URI,
+                event_listeners=[command_listener] if METRICS_ENABLED else [],
+                **client_options(self.role)
+            )
+            logger.info(f"✅ Connected to MongoDB (async): {DATABASE_NAME} ({self.role})")
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[DATABASE_NAME]
+
+    @property
+    def events(self):
+        return self.db[EVENTS_COLLECTION]
+
+    @property
+    def user_listed(self):
+        return self.db[USER_COLLECTION]
+
+    @property
+    def tombstones(self):
+        return self.db[TOMBSTONES_COLLECTION]
+
+    @property
+    def meta(self):
+        return self.db[META_COLLECTION]
+
+    @property
+    def event_feed(self):
+        return self.db[EVENT_FEED_COLLECTION]
+
+    async def _ensure_event_feed(self):
+        """Async DatabaseManager._ensure_event_feed"""
+        if self._feed_checked:
+            return
+        cursor = await self.db.list_collections(filter={'name': EVENT_FEED_COLLECTION})
+        infos = await cursor.to_list(length=None)
+        if not infos:
+            try:
+                await self.db.create_collection(EVENT_FEED_COLLECTION, capped=True, size=EVENT_FEED_CAPPED_BYTES)
+            except CollectionInvalid:
+                pass  # Created concurrently
+        elif not infos[0].get('options', {}).get('capped'):
+            await self.db.command('convertToCapped', EVENT_FEED_COLLECTION, size=EVENT_FEED_CAPPED_BYTES)
+        self._feed_checked = True
+
+    async def append_feed(self, entries):
+        """Async append_feed (see DatabaseManager.append_feed)"""
+        if not EVENT_FEED_ENABLED or not entries:
+            return
+        try:
+            await self._ensure_event_feed()
+            now = datetime.now(timezone.utc)
+            await self.event_feed.insert_many([dict(entry, at=now) for entry in entries], ordered=True)
+        except Exception as e:
+            logger.error(f"Error appending {len(entries)} entries to the event feed: {e}")
+
+    async def get_events_page(self, filters=None, limit=None, skip=0):
+        """
+        Fetch a page of events and the total match count concurrently.
+
+        Returns:
+            (events, total)
+        """
+        query = filters or {}
+        cursor = self.events.find(query).sort('date_time', DESCENDING)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        events, total = await asyncio.gather(
+            cursor.to_list(length=None),
+            self.events.count_documents(query)
+        )
+        return events, total
+
+    async def get_event_by_id(self, external_id):
+        """Get a single event by external_id"""
+        try:
+            return await self.events.find_one({'external_id': external_id})
+        except Exception as e:
+            logger.error(f"Error retrieving event {external_id}: {e}")
+            return None
+
+    async def get_events_by_ids(self, external_ids, projection=None):
+        """Async get_events_by_ids (see DatabaseManager.get_events_by_ids)"""
+        if not external_ids:
+            return {}
+        try:
+            cursor = self.events.find({'external_id': {'$in': list(external_ids)}}, projection)
+            return {event['external_id']: event for event in await cursor.to_list(length=None)}
+        except Exception as e:
+            logger.error(f"Error retrieving {len(external_ids)} events by id: {e}")
+            return {}
+
+    async def get_changes(self, since, limit=500, after_id=None):
+        """Async get_changes (see DatabaseManager.get_changes), also from the primary"""
+        primary = ReadPreference.PRIMARY
+        upserts_cursor = (
+            self.events.with_options(read_preference=primary).find(changes_query(since, after_id))
+            .sort([('updated_at', ASCENDING), ('external_id', ASCENDING)])
+            .limit(limit + 1)
+        )
+        tombstones_cursor = self.tombstones.with_options(read_preference=primary).find(
+            {'deleted_at': {'$gte': since}}, {'external_id': 1, '_id': 0}
+        )
+        upserts, tombstones = await asyncio.gather(
+            upserts_cursor.to_list(length=None),
+            tombstones_cursor.to_list(length=None)
+        )
+        has_more = len(upserts) > limit
+        return upserts[:limit], [t['external_id'] for t in tombstones], has_more
+
+    async def save_user_events(self, items):
+        """Async save_user_events (see DatabaseManager.save_user_events)"""
+        if not items:
+            return []
+        try:
+            stored_hashes = {}
+            try:
+                await self.user_listed.insert_many([dict(user_doc) for user_doc, _ in items], ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors', [])
+                if any(error.get('code') != 11000 for error in errors):
+                    raise
+                duplicates = {error['index']: items[error['index']][0]['external_id'] for error in errors}
+                cursor = self.user_listed.find(
+                    {'external_id': {'$in': list(set(duplicates.values()))}},
+                    {'external_id': 1, 'payload_hash': 1, '_id': 0}
+                )
+                stored = {doc['external_id']: doc.get('payload_hash') for doc in await cursor.to_list(length=None)}
+                stored_hashes = {index: stored.get(eid) for index, eid in duplicates.items()}
+            outcomes = user_event_outcomes(items, stored_hashes)
+            event_docs = [event_doc for (_, event_doc), outcome in zip(items, outcomes) if outcome != 'conflict']
+            if event_docs:
+                await self.events.bulk_write(
+                    [UpdateOne(*build_event_upsert(event_doc), upsert=True) for event_doc in event_docs],
+                    ordered=False
+                )
+                await self.append_feed(feed_upserts(event_docs, 'user'))
+            return outcomes
+        except Exception as e:
+            logger.error(f"Error saving {len(items)} user-listed events: {e}")
+            return None
+
+    async def get_stats(self):
+        """Get database statistics (counts run concurrently)"""
+        try:
+            queries = stats_queries(datetime.now(timezone.utc))
+            counts = await asyncio.gather(*(
+                self.events.count_documents(query) for query in queries.values()
+            ))
+            return format_stats(dict(zip(queries.keys(), counts)))
+        except Exception as e:
+            logger.error(f"Error getting stats: {e}")
+            return {}
+
+    async def is_ready(self):
+        """Readiness: database reachable and schema up to date"""
+        try:
+            await self.client.admin.command('ping')
+            doc = await self.meta.find_one({'_id': 'schema'})
+            return (doc.get('version', 0) if doc else 0) >= SCHEMA_VERSION
+        except Exception as e:
+            logger.error(f"Readiness check failed: {e}")
+            return False
+
+    def close(self):
+        """Close MongoDB connection (no-op if it was never opened)"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            logger.info("🔌 MongoDB connection closed")
@@ -0,0 +1,230 @@
+"""
+API Load Benchmark
+Seeds a local database with synthetic events at several sizes, serves the
+Flask app on a local port and drives it with concurrent clients. Reports
+throughput and p50/p95/p99 latency per endpoint and query shape.
+
+Run from the repository root:
+    python benchmarks/bench_api.py --mongo-uri mongodb://localhost:27017 --sizes 10000,100000
+    python benchmarks/bench_api.py --concurrency 16 --requests 500 --json after.json --baseline before.json
+    python benchmarks/bench_api.py --backend memory --sizes 2000 --shapes list,detail
+    python benchmarks/bench_api.py --backend sqlite --sizes 10000,100000
+
+The response cache is off by default so every request reaches the database;
+pass --response-cache to measure the cached path instead. Seeded databases are
+reused when they already hold the requested number of events (--reseed to rebuild).
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_event_document
+import database
+from database import DatabaseManager
+from sqlite_database import SQLiteDatabaseManager
+
+# name -> path (or callable(rng, ids) -> path for per-request parameters)
+SHAPES = {
+    'list': '/api/events?limit=100',
+    'list_deep': '/api/events?limit=100&skip=5000',
+    'internal': '/api/internal/events?limit=100',
+    'internal_all': '/api/internal/events',
+    'search': '/api/events?search=hackathon&limit=100',
+    'location': '/api/events?location=London&limit=100',
+    'status': '/api/events?status=upcoming&limit=100',
+    'detail': lambda rng, ids: f"/api/events/{rng.choice(ids)}",
+    'image': lambda rng, ids: f"/api/images/{rng.choice(ids)}",
+}
+DEFAULT_SHAPES = 'list,list_deep,internal,search,location,status,detail,image'
+SEED_BATCH_SIZE = 1000
+
+
+def database_name(args, size):
+    return f"{args.database}_{size}"
+
+
+def seed(db, size, description_bytes, reseed=False):
+    """Fill the events collection with `size` synthetic events; returns their external_ids"""
+    ids = [make_event_document(i, description_bytes=0)['external_id'] for i in range(size)]
+    if not reseed and db.count_events() == size:
+        print(f"   reusing {size} seeded events in {getattr(db, 'database_name', None) or db.path}")
+        return ids
+
+    if db.backend == 'sqlite':
+        db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db.path + suffix):
+                os.remove(db.path + suffix)
+    else:
+        db.client.drop_database(db.database_name)
+    db.ensure_schema(force=True)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    for offset in range(0, size, SEED_BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, size)):
+            doc = make_event_document(i, description_bytes)
+            doc['updated_at'] = now
+            batch.append(doc)
+        if db.backend == 'sqlite':
+            db.save_events(batch)
+        else:
+            db.events.insert_many(batch, ordered=False)
+    print(f"   seeded {size} events in {time.perf_counter() - started:.1f}s")
+    return ids
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_shape(base_url, shape, ids, requests_count, concurrency, seed_value=0):
+    """Issue requests_count requests for one shape across `concurrency` client threads"""
+    local = threading.local()
+    target = SHAPES[shape]
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        path = target(random.Random(f"{seed_value}:{i}"), ids) if callable(target) else target
+        started = time.perf_counter()
+        response = session.get(base_url + path)
+        body = response.content
+        return time.perf_counter() - started, response.status_code, len(body)
+
+    # Warm up connections and lazy clients before measuring
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(concurrency)))
+        started = time.perf_counter()
+        results = list(pool.map(one, range(requests_count)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for r in results if r[1] >= 500)
+    return {
+        'shape': shape,
+        'requests': requests_count,
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput_rps': round(requests_count / wall, 1) if wall else 0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'avg_bytes': int(sum(r[2] for r in results) / len(results)),
+    }
+
+
+def compare(results, baseline_path):
+    """Print throughput and p95 changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['size'], r['shape']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r['size'], r['shape']))
+        if not old:
+            continue
+        rps_change = (r['throughput_rps'] - old['throughput_rps']) / old['throughput_rps'] * 100 if old['throughput_rps'] else 0
+        p95_change = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+        flag = '  <-- regression' if p95_change > 10 or rps_change < -10 else ''
+        print(f"   size={r['size']:7d} {r['shape']:12s} rps {old['throughput_rps']:8.1f} -> {r['throughput_rps']:8.1f} "
+              f"({rps_change:+.0f}%)  p95 {old['p95_ms']:8.2f} -> {r['p95_ms']:8.2f}ms ({p95_change:+.0f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the events API against seeded local data")
+    parser.add_argument('--backend', choices=('mongo', 'memory', 'sqlite'), default='mongo',
+                        help="mongo: real server at --mongo-uri; memory: mongomock (no $text search); "
+                             "sqlite: embedded file in --sqlite-dir")
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017')
+    parser.add_argument('--sqlite-dir', default=tempfile.gettempdir())
+    parser.add_argument('--database', default='events_apibench', help="Prefix; the size is appended")
+    parser.add_argument('--sizes', default='10000,100000', help="Comma-separated event counts")
+    parser.add_argument('--description-bytes', type=int, default=1500)
+    parser.add_argument('--shapes', default=DEFAULT_SHAPES, help=f"Comma-separated, from: {', '.join(SHAPES)}")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per shape")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--response-cache', action='store_true', help="Leave the response cache on")
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--baseline', help="Earlier --json output to compare against")
+    args = parser.parse_args()
+
+    shapes = [s for s in args.shapes.split(',') if s]
+    unknown = set(shapes) - set(SHAPES)
+    if unknown:
+        parser.error(f"unknown shapes: {', '.join(sorted(unknown))}")
+
+    if args.backend == 'memory':
+        try:
+            import mongomock
+        except ImportError:
+            parser.error("--backend memory needs mongomock (pip install mongomock)")
+        client = mongomock.MongoClient()
+        database.MongoClient = lambda *a, **k: client
+
+    import api_server
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if not args.response_cache:
+        api_server.response_cache.ttl_seconds = 0
+
+    server = make_server('127.0.0.1', 0, api_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = []
+    try:
+        for size in (int(s) for s in args.sizes.split(',') if s):
+            print(f"\n== {size} events ==")
+            if args.backend == 'sqlite':
+                db = SQLiteDatabaseManager(os.path.join(args.sqlite_dir, f"{database_name(args, size)}.db"))
+            else:
+                db = DatabaseManager(uri=args.mongo_uri, database_name=database_name(args, size))
+            ids = seed(db, size, args.description_bytes, args.reseed)
+            api_server.db = db
+            api_server.response_cache.clear()
+            for shape in shapes:
+                result = dict(size=size, **run_shape(base_url, shape, ids, args.requests, args.concurrency))
+                results.append(result)
+                print(f"   {shape:12s} {result['throughput_rps']:8.1f} req/s  p50={result['p50_ms']:8.2f}ms  "
+                      f"p95={result['p95_ms']:8.2f}ms  p99={result['p99_ms']:8.2f}ms  "
+                      f"bytes={result['avg_bytes']}  errors={result['errors']}")
+            db.close()
+    finally:
+        server.shutdown()
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'baseline')},
+                'results': results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
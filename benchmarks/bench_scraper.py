@@ -0,0 +1,200 @@
+"""
+Scraper Throughput Benchmark
+Runs MongoDBScraper against the local Luma stand-in (fake_luma.py) and a local
+MongoDB (in-memory mongomock, or an embedded SQLite file) and reports events/sec, HTTP calls, retries
+and DB round trips for each combination of settings.
+
+Run from the repository root:
+    python benchmarks/bench_scraper.py --mongo-uri mongodb://localhost:27017
+    python benchmarks/bench_scraper.py --backend memory --page-sizes 25,100 --latency-ms 0,50
+    python benchmarks/bench_scraper.py --backend sqlite --passes 2
+    python benchmarks/bench_scraper.py --rate-429 0.1 --passes 2 --json results.json
+
+Each combination starts from an empty database; with --passes 2 the second pass
+re-scrapes the same data, which measures the "unchanged" upsert path.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import tempfile
+import time
+from collections import Counter
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_luma import FakeLumaServer
+
+# Connection handshakes and monitoring, not work the scraper asked for
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'buildInfo'}
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts MongoDB commands by name (registered globally before any client exists)"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            with self._lock:
+                self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+round_trips = RoundTripCounter()
+monitoring.register(round_trips)
+
+import database
+from database import DatabaseManager
+from sqlite_database import SQLiteDatabaseManager
+from scraper_mongodb import MongoDBScraper
+from config import EVENT_CATEGORIES, SCRAPING_LOCATIONS
+
+
+def sqlite_path(args):
+    return os.path.join(args.sqlite_dir, f"{args.database}.db")
+
+
+def drop_db(args, db):
+    if args.backend == 'sqlite':
+        db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(sqlite_path(args) + suffix):
+                os.remove(sqlite_path(args) + suffix)
+    else:
+        db.client.drop_database(args.database)
+
+
+def make_db(args):
+    if args.backend == 'sqlite':
+        db = SQLiteDatabaseManager(sqlite_path(args))
+    else:
+        db = DatabaseManager(uri=args.mongo_uri, database_name=args.database, role='scraper')
+    drop_db(args, db)
+    db.ensure_schema(force=True)
+    return db
+
+
+def run_pass(args, db, server, page_size):
+    """One full scrape; returns the measured totals"""
+    scraper = MongoDBScraper(
+        db=db,
+        categories=EVENT_CATEGORIES[:args.categories],
+        locations=SCRAPING_LOCATIONS[:args.locations],
+        page_size=page_size,
+        max_pages=args.max_pages,
+        rate_delay=0,
+        base_api_url=server.url
+    )
+    round_trips.reset()
+    started = time.perf_counter()
+    scraper.scrape_all_events()
+    elapsed = time.perf_counter() - started
+    commands = round_trips.snapshot()
+
+    totals = Counter()
+    for entry in scraper.telemetry.locations:
+        totals.update(entry.counts)
+    return {
+        'wall_time_s': round(elapsed, 3),
+        'events': totals['events'],
+        'events_per_s': round(totals['events'] / elapsed, 1) if elapsed else 0,
+        'http_calls': totals['http_calls'],
+        'retries': totals['retries'],
+        'new': totals['new'],
+        'updated': totals['updated'],
+        'unchanged': totals['unchanged'],
+        'errors': totals['errors'],
+        'fetch_s': round(totals['fetch_s'], 3),
+        'write_s': round(totals['write_s'], 3),
+        'db_round_trips': sum(commands.values()) if args.backend == 'mongo' else None,
+        'db_commands': commands if args.backend == 'mongo' else None,
+    }
+
+
+def parse_list(value, cast):
+    return [cast(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MongoDBScraper against a local Luma stand-in")
+    parser.add_argument('--backend', choices=('mongo', 'memory', 'sqlite'), default='mongo',
+                        help="mongo: real server at --mongo-uri; memory: mongomock; sqlite: file in "
+                             "--sqlite-dir (round trips are only counted for mongo)")
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017')
+    parser.add_argument('--sqlite-dir', default=tempfile.gettempdir())
+    parser.add_argument('--database', default='events_bench')
+    parser.add_argument('--categories', type=int, default=1, help="First N EVENT_CATEGORIES")
+    parser.add_argument('--locations', type=int, default=5, help="First N SCRAPING_LOCATIONS")
+    parser.add_argument('--events', type=int, default=200, help="Fake entries per location")
+    parser.add_argument('--description-bytes', type=int, default=1500)
+    parser.add_argument('--page-sizes', default='100', help="Comma-separated pagination_limit values")
+    parser.add_argument('--latency-ms', default='0', help="Comma-separated fake server latencies")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Fraction of requests throttled")
+    parser.add_argument('--max-pages', type=int, default=50)
+    parser.add_argument('--overlap', action='store_true', help="Same entries for every location")
+    parser.add_argument('--passes', type=int, default=1)
+    parser.add_argument('--json', help="Write results to this file")
+    args = parser.parse_args()
+
+    # scraper_mongodb configures INFO logging on import; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.backend == 'memory':
+        try:
+            import mongomock
+        except ImportError:
+            parser.error("--backend memory needs mongomock (pip install mongomock)")
+        client = mongomock.MongoClient()
+        database.MongoClient = lambda *a, **k: client
+
+    results = []
+    for page_size, latency in itertools.product(parse_list(args.page_sizes, int),
+                                                parse_list(args.latency_ms, float)):
+        settings = {'page_size': page_size, 'latency_ms': latency, 'rate_429': args.rate_429}
+        db = make_db(args)
+        try:
+            with FakeLumaServer(events_per_location=args.events, description_bytes=args.description_bytes,
+                                latency_ms=latency, rate_429=args.rate_429, overlap=args.overlap) as server:
+                for n in range(1, args.passes + 1):
+                    result = dict(settings, run_pass=n, **run_pass(args, db, server, page_size))
+                    results.append(result)
+                    trips = result['db_round_trips']
+                    print(f"page={page_size:4d} latency={latency:5.0f}ms pass={n}  "
+                          f"{result['events']:6d} events  {result['events_per_s']:8.1f}/s  "
+                          f"http={result['http_calls']} retries={result['retries']}  "
+                          f"db_round_trips={trips if trips is not None else 'n/a'}  "
+                          f"new={result['new']} updated={result['updated']} unchanged={result['unchanged']}")
+        finally:
+            drop_db(args, db)
+            db.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Serialization Microbenchmark
+Compares the old response path (str(_id) per document + stdlib json)
+with serialization.dumps on raw Mongo documents.
+
+Run from the repository root:
+    python benchmarks/bench_serialization.py --events 500 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+
+
+def make_events(count):
+    """Build documents shaped like what get_all_events returns"""
+    now = datetime.now(timezone.utc)
+    description = "<p>" + "Join us for talks, demos and networking. " * 40 + "</p>"
+    events = []
+    for i in range(count):
+        start = now + timedelta(hours=i)
+        events.append({
+            '_id': ObjectId(),
+            'external_id': f"evt-{i:06d}",
+            'event_slug': f"event-{i}",
+            'title': f"Crypto Meetup #{i}",
+            'date_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=3)).isoformat(),
+            'venue': "123 Market St, San Francisco, CA, United States",
+            'organizer': "Web3 Builders, DAO Friends",
+            'description': description,
+            'category_tags': "crypto,web3,blockchain",
+            'event_type': "independent",
+            'ticket_url': f"https://lu.ma/event-{i}",
+            'image_url': f"https://images.lumacdn.com/event-covers/{i}.png",
+            'guest_count': i % 300,
+            'ticket_count': i % 50,
+            'discovery_location': "San Francisco, USA",
+            'timezone': "America/Los_Angeles",
+            'scraped_at': now.isoformat(),
+            'updated_at': now,
+            'source': "api-crypto",
+        })
+    return events
+
+
+def legacy_dumps(events):
+    """Old path: mutate _id to str, then the stdlib encoder (as jsonify did)"""
+    for event in events:
+        event['_id'] = str(event['_id'])
+        event['updated_at'] = event['updated_at'].isoformat()
+    return json.dumps({'success': True, 'events': events, 'count': len(events)}).encode('utf-8')
+
+
+def new_dumps(events):
+    return serialization.dumps({'success': True, 'events': events, 'count': len(events)})
+
+
+def bench(fn, events_factory, repeat):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        events = events_factory()
+        start = time.perf_counter()
+        body = fn(events)
+        timings.append(time.perf_counter() - start)
+        size = len(body)
+    timings.sort()
+    return {
+        'median_ms': timings[len(timings) // 2] * 1000,
+        'min_ms': timings[0] * 1000,
+        'bytes': size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    template = make_events(args.events)
+    factory = lambda: [dict(e) for e in template]  # fresh copies, legacy path mutates
+
+    legacy = bench(legacy_dumps, factory, args.repeat)
+    new = bench(new_dumps, factory, args.repeat)
+
+    print(f"Events per response: {args.events}  (backend: {serialization.BACKEND})")
+    print(f"  legacy str(_id) + json : {legacy['median_ms']:.2f} ms median, {legacy['bytes']} bytes")
+    print(f"  serialization.dumps    : {new['median_ms']:.2f} ms median, {new['bytes']} bytes")
+    if new['median_ms']:
+        print(f"  speedup                : {legacy['median_ms'] / new['median_ms']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Local Luma Discovery Stand-in
+Serves /discover/get-paginated-events with synthetic, paginated entries so the
+scraper can be benchmarked without touching api2.luma.com.
+
+    python benchmarks/fake_luma.py --port 8765 --events 300 --latency-ms 50 --rate-429 0.05
+    LUMA_API_URL=http://127.0.0.1:8765 python scraper_mongodb.py
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_entry
+
+
+class FakeLumaServer:
+    """
+    Threaded HTTP server answering discovery requests.
+
+    Args:
+        events_per_location: Entries available for each (slug, lat, lng)
+        description_bytes: Approximate description size per entry
+        latency_ms: Delay added to every response
+        rate_429: Fraction of requests answered with 429 (Retry-After: 0)
+        overlap: Share entries across locations of a category (as the real API does
+                 for nearby coordinates), so later locations hit "unchanged" upserts
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, events_per_location=200, description_bytes=1500,
+                 latency_ms=0, rate_429=0.0, overlap=False, seed=0):
+        self.events_per_location = events_per_location
+        self.description_bytes = description_bytes
+        self.latency_ms = latency_ms
+        self.rate_429 = rate_429
+        self.overlap = overlap
+        self.requests = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._thread = None
+
+        handler = type('Handler', (_Handler,), {'fake': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def entries_for(self, slug, lat, lng):
+        """All entries for a discovery key (built once, then served from memory)"""
+        key = slug if self.overlap else f"{slug}:{lat},{lng}"
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is None:
+                entries = [make_entry(key, i, self.description_bytes) for i in range(self.events_per_location)]
+                self._entries[key] = entries
+            return entries
+
+    def should_throttle(self):
+        with self._lock:
+            self.requests += 1
+            throttle = self.rate_429 and self._rng.random() < self.rate_429
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/discover/get-paginated-events':
+            self._send(404, b'{"message": "not found"}')
+            return
+
+        fake = self.fake
+        if fake.latency_ms:
+            time.sleep(fake.latency_ms / 1000)
+        if fake.should_throttle():
+            self._send(429, b'{"message": "rate limited"}', {'Retry-After': '0'})
+            return
+
+        params = parse_qs(url.query)
+        first = lambda name, default=None: params.get(name, [default])[0]
+        entries = fake.entries_for(first('slug', ''), first('latitude', ''), first('longitude', ''))
+        limit = int(first('pagination_limit', 50))
+        offset = int(first('pagination_cursor', 0))
+        page = entries[offset:offset + limit]
+        has_more = offset + limit < len(entries)
+
+        body = json.dumps({
+            'entries': page,
+            'has_more': has_more,
+            'next_cursor': str(offset + limit) if has_more else None,
+        }).encode('utf-8')
+        self._send(200, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Luma discovery stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--events', type=int, default=200, help="Entries per location")
+    parser.add_argument('--description-bytes', type=int, default=1500)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--overlap', action='store_true', help="Share entries across locations")
+    args = parser.parse_args()
+
+    server = FakeLumaServer(args.host, args.port, args.events, args.description_bytes,
+                            args.latency_ms, args.rate_429, args.overlap)
+    print(f"Serving fake Luma discovery on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Synthetic Event Data
+Deterministic Luma-style discovery entries and stored event documents for
+benchmarks. The same seed always produces the same data.
+"""
+
+import hashlib
+import random
+from datetime import datetime, timezone, timedelta
+
+CITIES = [
+    ("San Francisco", "CA", "United States"), ("New York", "NY", "United States"),
+    ("London", "England", "United Kingdom"), ("Berlin", "Berlin", "Germany"),
+    ("Singapore", "Singapore", "Singapore"), ("Tokyo", "Tokyo", "Japan"),
+    ("Dubai", "Dubai", "United Arab Emirates"), ("Toronto", "ON", "Canada"),
+]
+WORDS = (
+    "crypto web3 blockchain defi nft dao ethereum solana bitcoin zk rollup "
+    "ai agents llm inference builders hackathon meetup summit demo day panel "
+    "founders investors research security wallet protocol governance"
+).split()
+
+
+def _description(rng, size):
+    """Roughly `size` bytes of HTML description"""
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return "<p>" + " ".join(words) + "</p>"
+
+
+def make_entry(seed, index, description_bytes=1500, base_time=None):
+    """
+    One entry shaped like /discover/get-paginated-events output.
+
+    Args:
+        seed: Namespace for ids (e.g. "crypto:37.77,-122.41"); entries with the same
+              seed and index are identical, so overlapping locations share events
+        index: Entry number within the seed
+        description_bytes: Approximate description size
+    """
+    rng = random.Random(f"{seed}:{index}")
+    base_time = base_time or datetime(2030, 1, 1, tzinfo=timezone.utc)
+    start = base_time + timedelta(hours=rng.randint(-24 * 30, 24 * 90))
+    city, region, country = rng.choice(CITIES)
+    api_id = "evt-" + hashlib.sha1(f"{seed}:{index}".encode()).hexdigest()[:12]
+    return {
+        "api_id": api_id,
+        "start_at": start.isoformat(),
+        "end_at": (start + timedelta(hours=rng.randint(1, 72))).isoformat(),
+        "guest_count": rng.randint(0, 2000),
+        "ticket_count": rng.randint(0, 500),
+        "hosts": [{"name": f"Host {rng.randint(1, 500)}"} for _ in range(rng.randint(1, 3))],
+        "event": {
+            "name": " ".join(rng.choice(WORDS).title() for _ in range(4)),
+            "url": f"bench-{api_id}",
+            "description": _description(rng, description_bytes),
+            "cover_url": f"https://images.lumacdn.com/event-covers/{api_id}.png",
+            "timezone": "UTC",
+            "event_type": rng.choice(["independent", "conference", "meetup"]),
+            "geo_address_info": {
+                "address": f"{rng.randint(1, 999)} Main St",
+                "city_state": f"{city}, {region}",
+                "country": country,
+            },
+        },
+    }
+
+
+def make_event_document(index, description_bytes=1500, seed="bench"):
+    """A stored events-collection document (what the scraper writes)"""
+    entry = make_entry(seed, index, description_bytes)
+    event = entry["event"]
+    geo = event["geo_address_info"]
+    return {
+        "external_id": entry["api_id"],
+        "event_slug": event["url"],
+        "title": event["name"],
+        "date_time": entry["start_at"],
+        "end_time": entry["end_at"],
+        "venue": f"{geo['address']}, {geo['city_state']}, {geo['country']}",
+        "organizer": ", ".join(h["name"] for h in entry["hosts"]),
+        "description": event["description"],
+        "category_tags": "crypto,web3,blockchain",
+        "event_type": event["event_type"],
+        "ticket_url": f"https://lu.ma/{event['url']}",
+        "image_url": event["cover_url"],
+        "guest_count": entry["guest_count"],
+        "ticket_count": entry["ticket_count"],
+        "discovery_location": f"{geo['city_state'].split(',')[0]}",
+        "timezone": "UTC",
+        "scraped_at": datetime.now(timezone.utc).isoformat(),
+        "source": "bench",
+    }
@@ -1,98 +1,126 @@
 """
-Check system status and image URLs
+Check system status and validate image URLs
+
+Usage:
+    python check_images.py                  # check images not checked in IMAGE_CHECK_MAX_AGE_HOURS
+    python check_images.py --all            # recheck every image now
+    python check_images.py --limit 200 --workers 32
+    python check_images.py --report         # status only, no checks
 """
 
-from database import DatabaseManager
+import argparse
+import logging
+import sys
+from storage import open_database
+from image_health import run_image_checks
+from config import IMAGE_CHECK_MAX_AGE_HOURS, IMAGE_CHECK_WORKERS, BROKEN_IMAGE_POLICY
 import requests
 
-print("🔍 Checking System Status")
-print("=" * 60)
-
-# Check database
-db = DatabaseManager()
-
-# Get stats
-stats = db.get_stats()
-print(f"\n📊 Database Stats:")
-print(f"   Total Events: {stats.get('total_events', 0)}")
-print(f"   Events with Images: {stats.get('events_with_images', 0)}")
-print(f"   Upcoming Events: {stats.get('upcoming_events', 0)}")
-print(f"   Storage Method: {stats.get('storage_method', 'N/A')}")
-
-# Get a few events
-events = db.get_all_events(limit=5)
-print(f"\n📋 Sample Events:")
-
-for i, event in enumerate(events, 1):
-    event_id = event.get('external_id')
-    title = event.get('title', 'Untitled')[:50]
-    image_url = event.get('image_url')
-    
-    has_image = "✅" if image_url and image_url not in ['null', 'None', None] else "❌"
-    
-    print(f"\n   {i}. {has_image} {title}")
-    print(f"      ID: {event_id}")
-    
-    if image_url and image_url not in ['null', 'None', None]:
-        print(f"      Image URL: {image_url[:80]}...")
-    else:
-        print(f"      Image URL: None")
-
-print("\n" + "=" * 60)
-print("🌐 Testing API Server")
-print("=" * 60)
-
-# Test if API server is running
-try:
-    response = requests.get('http://localhost:5000/api/health', timeout=2)
-    if response.status_code == 200:
-        print("✅ API Server is running")
-        
-        # Test stats endpoint
-        stats_response = requests.get('http://localhost:5000/api/stats', timeout=5)
-        if stats_response.status_code == 200:
-            api_stats = stats_response.json()
-            print(f"\n📊 API Stats:")
-            if api_stats.get('success'):
-                for key, value in api_stats.get('stats', {}).items():
-                    print(f"   {key}: {value}")
+def print_stats(stats):
+    print(f"\n📊 Database Stats:")
+    print(f"   Total Events: {stats.get('total_events', 0)}")
+    print(f"   Events with Images: {stats.get('events_with_images', 0)}")
+    print(f"   Broken Images: {stats.get('broken_images', 0)}")
+    print(f"   Unchecked Images: {stats.get('unchecked_images', 0)}")
+    print(f"   Upcoming Events: {stats.get('upcoming_events', 0)}")
+    print(f"   Storage Method: {stats.get('storage_method', 'N/A')}")
+
+def check_api_server():
+    print("\n" + "=" * 60)
+    print("🌐 Testing API Server")
+    print("=" * 60)
+
+    # Test if API server is running
+    try:
+        response = requests.get('http://localhost:5000/api/health', timeout=2)
+        if response.status_code == 200:
+            print("✅ API Server is running")
+
+            # Test stats endpoint
+            stats_response = requests.get('http://localhost:5000/api/stats', timeout=5)
+            if stats_response.status_code == 200:
+                api_stats = stats_response.json()
+                print(f"\n📊 API Stats:")
+                if api_stats.get('success'):
+                    for key, value in api_stats.get('stats', {}).items():
+                        print(f"   {key}: {value}")
+        else:
+            print(f"⚠️  API Server responded with status: {response.status_code}")
+
+    except requests.exceptions.ConnectionError:
+        print("❌ API Server is NOT running!")
+        print("\n💡 Solution:")
+        print("   Run: python api_server.py")
+        print("   Or: python setup_and_run.py")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+def print_summary(stats):
+    print("\n" + "=" * 60)
+    print("📝 Summary")
+    print("=" * 60)
+
+    total = stats.get('total_events', 0)
+    with_images = stats.get('events_with_images', 0)
+    broken = stats.get('broken_images', 0)
+
+    if total == 0:
+        print("\n❌ NO EVENTS IN DATABASE")
+        print("\n💡 Solution:")
+        print("   Run: python setup_and_run.py")
+    elif with_images == 0:
+        print(f"\n⚠️  NO IMAGE URLS: {total} events but no image URLs")
+        print("\n💡 Solution:")
+        print("   Run: python scraper_mongodb.py")
+    elif broken:
+        print(f"\n⚠️  BROKEN IMAGES: {broken} of {with_images} image URLs are dead")
+        print(f"   API policy for broken images: {BROKEN_IMAGE_POLICY} (BROKEN_IMAGE_POLICY)")
+    elif with_images < total:
+        print(f"\n⚠️  PARTIAL IMAGES: {with_images} of {total} events have image URLs")
+        print("\n💡 This is normal - not all events have images")
     else:
-        print(f"⚠️  API Server responded with status: {response.status_code}")
-        
-except requests.exceptions.ConnectionError:
-    print("❌ API Server is NOT running!")
-    print("\n💡 Solution:")
-    print("   Run: python api_server.py")
-    print("   Or: python setup_and_run.py")
-except Exception as e:
-    print(f"❌ Error: {e}")
-
-print("\n" + "=" * 60)
-print("📝 Summary")
-print("=" * 60)
-
-total = stats.get('total_events', 0)
-with_images = stats.get('events_with_images', 0)
-
-if total == 0:
-    print("\n❌ NO EVENTS IN DATABASE")
-    print("\n💡 Solution:")
-    print("   Run: python setup_and_run.py")
-elif with_images == 0:
-    print(f"\n⚠️  NO IMAGE URLS: {total} events but no image URLs")
-    print("\n💡 Solution:")
-    print("   Run: python scraper_mongodb.py")
-elif with_images < total:
-    print(f"\n⚠️  PARTIAL IMAGES: {with_images} of {total} events have image URLs")
-    print("\n💡 This is normal - not all events have images")
-else:
-    print(f"\n✅ ALL GOOD: {with_images} of {total} events have image URLs")
-
-print("\n💡 Image Storage:")
-print("   Images are loaded directly from Luma CDN")
-print("   No images stored in MongoDB (saves space!)")
-print("   Frontend loads images from original URLs")
-
-db.close()
-
-input("\nPress Enter to exit...")
+        print(f"\n✅ ALL GOOD: {with_images} of {total} events have image URLs")
+
+    print("\n💡 Image Storage:")
+    print("   Images are loaded directly from Luma CDN")
+    print("   No images stored in MongoDB (saves space!)")
+    print("   Frontend loads images from original URLs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check system status and validate event image URLs")
+    parser.add_argument('--all', action='store_true', help="Recheck every image, whatever its age")
+    parser.add_argument('--max-age-hours', type=int, default=IMAGE_CHECK_MAX_AGE_HOURS)
+    parser.add_argument('--limit', type=int, help="Maximum images to check")
+    parser.add_argument('--workers', type=int, default=IMAGE_CHECK_WORKERS)
+    parser.add_argument('--report', action='store_true', help="Only print status, check nothing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger('pymongo').setLevel(logging.WARNING)
+
+    print("🔍 Checking System Status")
+    print("=" * 60)
+
+    db = open_database()
+    try:
+        if not args.report:
+            print(f"\n🖼️  Validating image URLs ({args.workers} workers)...")
+            counts = run_image_checks(
+                db, max_age_hours=0 if args.all else args.max_age_hours,
+                limit=args.limit, workers=args.workers
+            )
+            print(f"   Checked: {counts['checked']}  OK: {counts['ok']}  "
+                  f"Broken: {counts['broken']}  Errors: {counts['error']}")
+
+        stats = db.get_stats()
+        print_stats(stats)
+        check_api_server()
+        print_summary(stats)
+    finally:
+        db.close()
+
+    if sys.stdin.isatty():
+        input("\nPress Enter to exit...")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+HTTP Response Compression
+Accept-Encoding negotiation and gzip/brotli encoders (brotli is optional)
+"""
+
+import gzip
+from config import COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Server preference order, best ratio first
+SUPPORTED_ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the best encoding the client accepts.
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+
+    Returns:
+        'br', 'gzip' or None (identity)
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    for encoding in SUPPORTED_ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding, best=False):
+    """
+    Compress bytes with the given encoding.
+
+    Args:
+        body: Bytes to compress
+        encoding: 'br' or 'gzip'
+        best: Use maximum compression (for offline/precompressed output)
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if best else COMPRESSION_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9 if best else COMPRESSION_GZIP_LEVEL)
+    raise ValueError(f"Unsupported encoding: {encoding}")
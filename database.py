@@ -2,29 +2,371 @@
 MongoDB Database Manager
 """
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne, ReturnDocument, ReadPreference, CursorType
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError
 from datetime import datetime, timezone, timedelta
+import hashlib
+import importlib.util
+import json
 import logging
-from config import MONGODB_URI, DATABASE_NAME, EVENTS_COLLECTION, USER_COLLECTION
+import os
+import sys
+import threading
+import time
+import weakref
+from metrics import command_listener
+from storage import EventStorage
+import profiling
+from event_queries import derived_text_fields
+from config import (
+    MONGODB_URI, MONGO_CLIENT_PROFILES, METRICS_ENABLED, DATABASE_NAME, EVENTS_COLLECTION, USER_COLLECTION,
+    TOMBSTONES_COLLECTION, META_COLLECTION, SCRAPE_RUNS_COLLECTION, SCRAPE_TASKS_COLLECTION,
+    EVENT_FEED_COLLECTION, TOMBSTONE_RETENTION_DAYS, SCRAPE_TASK_RETENTION_DAYS, CLEANUP_GRACE_DAYS,
+    CLEANUP_BATCH_SIZE, CLEANUP_BATCH_PAUSE_SECONDS, EVENT_FEED_ENABLED, EVENT_FEED_CAPPED_BYTES,
+    EVENT_FEED_POLL_SECONDS, SCHEMA_MIGRATION_LEASE_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
-class DatabaseManager:
-    def __init__(self):
-        """Initialize MongoDB connection"""
+# Bump when _create_indexes or backfill_fields changes; ensure_schema re-runs them once per bump
+SCHEMA_VERSION = 9
+
+# Image health fields (image_health.py); reset whenever an event's image_url changes
+IMAGE_CHECK_FIELDS = (
+    'image_status', 'image_http_status', 'image_content_type', 'image_size',
+    'image_etag', 'image_last_modified', 'image_checked_at'
+)
+
+# Fields that change on every scrape and must not affect the content hash
+VOLATILE_FIELDS = ('_id', 'scraped_at', 'updated_at', 'content_hash', 'expire_at')
+# Where the scraper found an event (category, discovery tile), not its content: one
+# event found under two categories or tiles must not count as changed on every write
+DISCOVERY_FIELDS = ('discovery_location', 'category_tags', 'source')
+# Fields written by other jobs (image_health.py), never part of a scraped event
+UNHASHED_FIELDS = frozenset(VOLATILE_FIELDS + DISCOVERY_FIELDS + IMAGE_CHECK_FIELDS)
+
+def content_hash(event_data):
+    """Stable hash of an event's Luma-sourced content, ignoring bookkeeping and discovery fields"""
+    content = {k: v for k, v in event_data.items() if k not in UNHASHED_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def backfill_fields(doc):
+    """
+    Fields to set on a stored event written by an older schema: derived text
+    fields it lacks, and the content hash if the current content_hash() differs
+    (so the next scrape doesn't see the event as changed)
+    """
+    fields = {} if 'search_tokens' in doc else derived_text_fields(doc)
+    digest = content_hash(dict(doc, **fields))
+    if digest != doc.get('content_hash'):
+        fields['content_hash'] = digest
+    return fields
+
+def compute_expire_at(end_time, grace_days=CLEANUP_GRACE_DAYS):
+    """
+    BSON expiry date for the TTL index: end_time + grace_days.
+    Returns None (never expires) if end_time is missing or unparseable.
+    """
+    if not end_time:
+        return None
+    try:
+        end = datetime.fromisoformat(str(end_time).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return end + timedelta(days=grace_days)
+
+def _command_listeners():
+    """PyMongo command listeners for metrics and request profiling"""
+    listeners = [profiling.command_listener]
+    if METRICS_ENABLED:
+        listeners.append(command_listener)
+    return listeners
+
+# Wire compressors and the module each needs (zlib is always available)
+COMPRESSOR_MODULES = {'zstd': ('zstandard', 'backports.zstd'), 'snappy': ('snappy',), 'zlib': ('zlib',)}
+
+def _module_available(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def available_compressors(compressors):
+    """The comma-separated compressors whose library is installed, in order"""
+    return ','.join(
+        name for name in (c.strip() for c in compressors.split(','))
+        if any(_module_available(module) for module in COMPRESSOR_MODULES.get(name, ()))
+    )
+
+def client_options(role):
+    """MongoClient keyword arguments for a role in MONGO_CLIENT_PROFILES"""
+    options = dict(MONGO_CLIENT_PROFILES.get(role) or MONGO_CLIENT_PROFILES['default'])
+    if 'compressors' in options:
+        options['compressors'] = available_compressors(options['compressors'])
+        if not options['compressors']:
+            del options['compressors']
+    if options.get('readPreference') in (None, 'primary'):
+        options.pop('maxStalenessSeconds', None)  # Only valid for secondary reads
+    return options
+
+# Live managers, so forked children (gunicorn workers) can drop inherited clients
+_managers = weakref.WeakSet()
+
+def _reset_managers_after_fork():
+    for manager in list(_managers):
+        manager._reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_managers_after_fork)
+
+def changes_query(since, after_id=None):
+    """
+    get_changes filter: updated_at >= since, or with after_id (a page cursor,
+    see event_queries.changes_cursor) past that id within the since millisecond
+    """
+    if not after_id:
+        return {'updated_at': {'$gte': since}}
+    bucket_end = since + timedelta(milliseconds=1)
+    return {'$or': [
+        {'updated_at': {'$gte': bucket_end}},
+        {'updated_at': {'$gte': since, '$lt': bucket_end}, 'external_id': {'$gt': after_id}},
+    ]}
+
+def build_event_upsert(event_data):
+    """
+    Filter and update pipeline for upserting an event.
+    
+    updated_at only moves when the content hash changes; expire_at drives the TTL index.
+    Values are wrapped in $literal so strings starting with '$' are never read as field paths.
+    """
+    digest = content_hash(event_data)
+    fields = {k: {'$literal': v} for k, v in event_data.items() if k != '_id'}
+    fields['content_hash'] = digest
+    fields['expire_at'] = {'$literal': compute_expire_at(event_data.get('end_time'))}
+    fields['updated_at'] = {
+        '$cond': [{'$eq': ['$content_hash', digest]}, '$updated_at', datetime.now(timezone.utc)]
+    }
+    # A new image_url invalidates the previous health check
+    same_image = {'$eq': ['$image_url', {'$literal': event_data.get('image_url')}]}
+    for field in IMAGE_CHECK_FIELDS:
+        fields[field] = {'$cond': [same_image, f'${field}', '$$REMOVE']}
+    return {'external_id': event_data['external_id']}, [{'$set': fields}]
+
+def feed_upserts(events, source):
+    """Event feed entries announcing new or changed events (as written, without _id)"""
+    return [
+        {'op': 'upsert', 'external_id': event['external_id'], 'source': source,
+         'event': {k: v for k, v in event.items() if k != '_id'}}
+        for event in events
+    ]
+
+def feed_deletes(external_ids, source):
+    """Event feed entries announcing deleted events"""
+    return [{'op': 'delete', 'external_id': eid, 'source': source} for eid in external_ids]
+
+def user_event_outcomes(items, stored_hashes):
+    """
+    Outcome per (user_doc, event_doc) item of a user-event batch, in order.
+    
+    Args:
+        stored_hashes: {item index: payload_hash already stored under that
+            external_id} for the items whose user insert was a duplicate
+    
+    Returns:
+        'new'; 'replayed' (a retry with the same payload: written again, which
+        is idempotent); or 'conflict' (the idempotency key was reused for a
+        different payload: the stored listing is left alone)
+    """
+    outcomes = []
+    for index, (user_doc, _) in enumerate(items):
+        if index not in stored_hashes:
+            outcomes.append('new')
+        elif stored_hashes[index] == user_doc.get('payload_hash'):
+            outcomes.append('replayed')
+        else:
+            outcomes.append('conflict')
+    return outcomes
+
+def _feed_entry(doc):
+    entry = {k: v for k, v in doc.items() if k != '_id'}
+    entry['id'] = str(doc['_id'])
+    return entry
+
+# image_url values that actually hold a URL (older scrapes stored 'null'/'None' strings)
+VALID_IMAGE_URL = {'$exists': True, '$nin': [None, '', 'null', 'None']}
+
+def stats_queries(now):
+    """Count queries behind get_stats, shared with the async manager"""
+    return {
+        'total_events': {},
+        'upcoming_events': {'date_time': {'$gt': now.isoformat()}},
+        'events_with_images': {'image_url': VALID_IMAGE_URL},
+        'broken_images': {'image_status': 'broken'},
+        'unchecked_images': {'image_url': VALID_IMAGE_URL, 'image_checked_at': {'$exists': False}},
+    }
+
+def format_stats(counts):
+    """Shape get_stats output from the stats_queries counts"""
+    return {
+        'total_events': counts['total_events'],
+        'events_with_images': counts['events_with_images'],
+        'broken_images': counts['broken_images'],
+        'unchecked_images': counts['unchecked_images'],
+        'upcoming_events': counts['upcoming_events'],
+        'database_name': DATABASE_NAME,
+        'storage_method': 'Direct URLs (no image storage in DB)'
+    }
+
+class DatabaseManager(EventStorage):
+    backend = 'mongo'
+    
+    def __init__(self, uri=None, database_name=None, role='default'):
+        """
+        Set up the manager without touching the network.
+        
+        The MongoClient is created on first use and indexes are managed by
+        ensure_schema(), so constructing a DatabaseManager costs nothing at startup.
+        
+        Args:
+            uri: MongoDB connection string (default: MONGODB_URI)
+            database_name: Database to use (default: DATABASE_NAME)
+            role: Client profile in MONGO_CLIENT_PROFILES ('api', 'scraper', 'default')
+        """
+        self.uri = uri or MONGODB_URI
+        self.database_name = database_name or DATABASE_NAME
+        self.role = role
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._feed_checked = False
+        _managers.add(self)
+    
+    def _reset_after_fork(self):
+        """
+        Forget a client inherited from the parent process.
+        MongoClient is not fork-safe; each worker lazily creates its own.
+        """
+        self._client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """MongoClient, created lazily on first access"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        self._client = MongoClient(
+                            self.uri,
+                            event_listeners=_command_listeners(),
+                            **client_options(self.role)
+                        )
+                        logger.info(f"✅ Connected to MongoDB: {self.database_name} ({self.role})")
+                    except Exception as e:
+                        logger.error(f"❌ Failed to connect to MongoDB: {e}")
+                        raise
+        return self._client
+    
+    @property
+    def db(self):
+        return self.client[self.database_name]
+    
+    @property
+    def events(self):
+        return self.db[EVENTS_COLLECTION]
+    
+    @property
+    def primary_events(self):
+        """events read from the primary, for reads that must not lag behind writes"""
+        return self.events.with_options(read_preference=ReadPreference.PRIMARY)
+    
+    @property
+    def user_listed(self):
+        return self.db[USER_COLLECTION]
+    
+    @property
+    def tombstones(self):
+        return self.db[TOMBSTONES_COLLECTION]
+    
+    @property
+    def meta(self):
+        return self.db[META_COLLECTION]
+    
+    @property
+    def scrape_runs(self):
+        return self.db[SCRAPE_RUNS_COLLECTION]
+    
+    @property
+    def scrape_tasks(self):
+        return self.db[SCRAPE_TASKS_COLLECTION]
+    
+    @property
+    def event_feed(self):
+        return self.db[EVENT_FEED_COLLECTION]
+    
+    def schema_version(self):
+        """Schema version recorded in the database (0 if never migrated)"""
+        doc = self.meta.find_one({'_id': 'schema'})
+        return doc.get('version', 0) if doc else 0
+    
+    def ensure_schema(self, force=False):
+        """
+        Create indexes once per SCHEMA_VERSION and record the version,
+        so normal starts only pay a single find_one. Concurrent callers
+        (API workers, scrape workers) claim the migration first, so only
+        one of them runs it; the others return and wait for readiness.
+        
+        Returns:
+            True if the migration ran, False if already up to date or running elsewhere
+        """
+        if not force and self.schema_version() >= SCHEMA_VERSION:
+            return False
+        if not self._claim_migration():
+            logger.info("⏳ Schema migration is running in another process")
+            return False
+        
         try:
-            self.client = MongoClient(MONGODB_URI)
-            self.db = self.client[DATABASE_NAME]
-            self.events = self.db[EVENTS_COLLECTION]
-            self.user_listed = self.db[USER_COLLECTION]
-            
-            # Create indexes
+            # Another process may have finished between the version check and the claim
+            if not force and self.schema_version() >= SCHEMA_VERSION:
+                return False
             self._create_indexes()
-            
-            logger.info(f"✅ Connected to MongoDB: {DATABASE_NAME}")
+            self._backfill_events()
+            self.meta.update_one(
+                {'_id': 'schema'},
+                {'$set': {'version': SCHEMA_VERSION, 'migrated_at': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        finally:
+            self.meta.delete_one({'_id': 'migration', 'owner': self._migration_owner})
+        logger.info(f"✅ Database schema migrated to version {SCHEMA_VERSION}")
+        return True
+    
+    def _claim_migration(self):
+        """Claim the migration lock in the meta collection (taking over an expired claim)"""
+        now = datetime.now(timezone.utc)
+        self.meta.delete_one({'_id': 'migration', 'expires_at': {'$lt': now}})
+        self._migration_owner = f"{os.getpid()}-{id(self)}"
+        try:
+            self.meta.insert_one({
+                '_id': 'migration',
+                'owner': self._migration_owner,
+                'version': SCHEMA_VERSION,
+                'expires_at': now + timedelta(seconds=SCHEMA_MIGRATION_LEASE_SECONDS)
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+    
+    def is_ready(self):
+        """Readiness: database reachable and schema up to date"""
+        try:
+            self.client.admin.command('ping')
+            return self.schema_version() >= SCHEMA_VERSION
         except Exception as e:
-            logger.error(f"❌ Failed to connect to MongoDB: {e}")
-            raise
+            logger.error(f"Readiness check failed: {e}")
+            return False
     
     def _create_indexes(self):
         """Create database indexes for better performance"""
@@ -33,26 +375,201 @@ class DatabaseManager:
         self.events.create_index([("date_time", DESCENDING)])
         self.events.create_index([("scraped_at", DESCENDING)])
         self.events.create_index([("title", "text"), ("description", "text")])
+        # Delta sync pages by (updated_at, external_id)
+        self.events.create_index([("updated_at", ASCENDING), ("external_id", ASCENDING)])
+        # TTL index: Mongo removes events continuously once expire_at passes
+        self.events.create_index([("expire_at", ASCENDING)], expireAfterSeconds=0)
+        self.events.create_index([("end_time", ASCENDING)])
+        self.events.create_index([("image_checked_at", ASCENDING)])
         self.user_listed.create_index([("listed_at", -1)])
+        # Idempotent list-event submissions (a retried key inserts nothing)
+        self.user_listed.create_index([("external_id", ASCENDING)], unique=True)
+        self.tombstones.create_index(
+            [("deleted_at", ASCENDING)],
+            expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400
+        )
+        self.scrape_runs.create_index([("run_id", ASCENDING)], unique=True)
+        self.scrape_runs.create_index([("started_at", DESCENDING)])
+        # Scrape work queue: claim order, expired leases, per-run status, retention
+        self.scrape_tasks.create_index([("state", ASCENDING), ("available_at", ASCENDING)])
+        self.scrape_tasks.create_index([("state", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self.scrape_tasks.create_index([("run_id", ASCENDING)])
+        self.scrape_tasks.create_index(
+            [("finished_at", ASCENDING)],
+            expireAfterSeconds=SCRAPE_TASK_RETENTION_DAYS * 86400
+        )
+        self._ensure_event_feed(force=True)
         
         logger.info("✅ Database indexes created")
     
+    def _backfill_events(self, batch_size=1000):
+        """Bring stored events up to the current schema (see backfill_fields); updated_at is kept"""
+        requests = []
+        updated = 0
+        for doc in self.primary_events.find({}):
+            fields = backfill_fields(doc)
+            if fields:
+                requests.append(UpdateOne({'_id': doc['_id']}, {'$set': fields}))
+            if len(requests) >= batch_size:
+                updated += self.events.bulk_write(requests, ordered=False).modified_count
+                requests = []
+        if requests:
+            updated += self.events.bulk_write(requests, ordered=False).modified_count
+        logger.info(f"✅ Backfilled {updated} events")
+    
     def save_event(self, event_data):
-        """Save or update an event"""
+        """
+        Save or update an event.
+        
+        updated_at only moves when the event content actually changes, so it can
+        drive delta sync (get_changes) instead of being bumped on every scrape.
+        """
+        # Changed means a new content hash; modified_count also counts discovery fields
+        return self.upsert_event(event_data) in ('new', 'updated')
+    
+    def upsert_event(self, event_data):
+        """
+        Save or update an event and report what happened, in one round trip.
+        
+        Returns:
+            'new', 'updated' or 'unchanged' (content hash comparison), or None on error
+        """
         try:
-            event_data['updated_at'] = datetime.now(timezone.utc)
-            
-            result = self.events.update_one(
-                {'external_id': event_data['external_id']},
-                {'$set': event_data},
-                upsert=True
+            query, pipeline = build_event_upsert(event_data)
+            previous = self.events.find_one_and_update(
+                query, pipeline, upsert=True,
+                projection={'content_hash': 1, '_id': 0},
+                return_document=ReturnDocument.BEFORE
             )
-            
-            return result.upserted_id or result.modified_count > 0
+            if previous is not None and previous.get('content_hash') == pipeline[0]['$set']['content_hash']:
+                return 'unchanged'
+            self.append_feed(feed_upserts([event_data], 'scraper'))
+            return 'new' if previous is None else 'updated'
         except Exception as e:
             logger.error(f"Error saving event {event_data.get('external_id')}: {e}")
+            return None
+    
+    def upsert_events(self, events):
+        """
+        Upsert many events in two round trips: one read of the stored content
+        hashes, then one unordered bulk write (same pipeline as save_event).
+        
+        Returns:
+            Outcomes ('new', 'updated', 'unchanged') in input order, or None on error
+        """
+        if not events:
+            return []
+        try:
+            stored = {
+                doc['external_id']: doc.get('content_hash') for doc in self.primary_events.find(
+                    {'external_id': {'$in': [event['external_id'] for event in events]}},
+                    {'external_id': 1, 'content_hash': 1, '_id': 0}
+                )
+            }
+            outcomes = []
+            requests = []
+            for event in events:
+                query, pipeline = build_event_upsert(event)
+                digest = pipeline[0]['$set']['content_hash']
+                if event['external_id'] not in stored:
+                    outcomes.append('new')
+                else:
+                    outcomes.append('unchanged' if stored[event['external_id']] == digest else 'updated')
+                stored[event['external_id']] = digest  # A repeat within the batch is unchanged
+                requests.append(UpdateOne(query, pipeline, upsert=True))
+            self.events.bulk_write(requests, ordered=False)
+            self.append_feed(feed_upserts(
+                [event for event, outcome in zip(events, outcomes) if outcome != 'unchanged'], 'scraper'
+            ))
+            return outcomes
+        except Exception as e:
+            logger.error(f"Error saving {len(events)} events: {e}")
+            return None
+    
+    def save_events(self, events):
+        """Upsert many events in one unordered bulk write (same pipeline as save_event)"""
+        if not events:
+            return True
+        try:
+            self.events.bulk_write(
+                [UpdateOne(*build_event_upsert(event), upsert=True) for event in events],
+                ordered=False
+            )
+            self.append_feed(feed_upserts(events, 'scraper'))
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {len(events)} events: {e}")
             return False
     
+    def _ensure_event_feed(self, force=False):
+        """
+        Make sure the event feed is a capped collection (tailable, trims itself),
+        once per manager. A write before the migration would otherwise auto-create
+        it as a plain collection, which tailable cursors reject.
+        """
+        if self._feed_checked and not force:
+            return
+        info = next(iter(self.db.list_collections(filter={'name': EVENT_FEED_COLLECTION})), None)
+        if info is None:
+            try:
+                self.db.create_collection(EVENT_FEED_COLLECTION, capped=True, size=EVENT_FEED_CAPPED_BYTES)
+            except CollectionInvalid:
+                pass  # Created concurrently
+        elif not info.get('options', {}).get('capped'):
+            self.db.command('convertToCapped', EVENT_FEED_COLLECTION, size=EVENT_FEED_CAPPED_BYTES)
+            logger.info(f"✅ Converted {EVENT_FEED_COLLECTION} to a capped collection")
+        self._feed_checked = True
+    
+    def append_feed(self, entries):
+        """
+        Append entries to the event feed (the SSE stream's source).
+        Best effort: a feed failure never fails the write it announces.
+        """
+        if not EVENT_FEED_ENABLED or not entries:
+            return
+        try:
+            self._ensure_event_feed()
+            now = datetime.now(timezone.utc)
+            self.event_feed.insert_many([dict(entry, at=now) for entry in entries], ordered=True)
+        except Exception as e:
+            logger.error(f"Error appending {len(entries)} entries to the event feed: {e}")
+    
+    def tail_feed(self, stop, backlog=0, poll_seconds=EVENT_FEED_POLL_SECONDS):
+        """
+        Follow the event feed with a tailable cursor until stop is set.
+        
+        Yields:
+            Lists of entries (with a string 'id'), in insertion order: first the last
+            backlog entries (possibly an empty list), then new entries as they arrive
+        """
+        self._ensure_event_feed()
+        recent = list(self.event_feed.find().sort('$natural', DESCENDING).limit(max(backlog, 1)))
+        last_id = recent[0]['_id'] if recent else None
+        yield [_feed_entry(doc) for doc in reversed(recent[:backlog])]
+        
+        while not stop.is_set():
+            cursor = self.event_feed.find(
+                {'_id': {'$gt': last_id}} if last_id else {},
+                cursor_type=CursorType.TAILABLE_AWAIT,
+                max_await_time_ms=int(poll_seconds * 1000)
+            )
+            batch = []
+            while cursor.alive and not stop.is_set():
+                doc = cursor.try_next()
+                if doc is not None:
+                    batch.append(_feed_entry(doc))
+                    last_id = doc['_id']
+                    if len(batch) < 500:
+                        continue
+                if batch:
+                    yield batch
+                    batch = []
+            cursor.close()
+            if batch:
+                yield batch
+            # A dead cursor (empty collection, or fell behind the capped size) is reopened
+            stop.wait(poll_seconds)
+    
     def get_all_events(self, filters=None, limit=None, skip=0):
         """Get all events with optional filters"""
         try:
@@ -64,13 +581,8 @@ class DatabaseManager:
             if limit:
                 cursor = cursor.limit(limit)
             
-            events = list(cursor)
-            
-            # Convert ObjectId to string for JSON serialization
-            for event in events:
-                event['_id'] = str(event['_id'])
-            
-            return events
+            # ObjectId/datetime are handled by the API serializer, no per-document conversion
+            return list(cursor)
         except Exception as e:
             logger.error(f"Error retrieving events: {e}")
             return []
@@ -78,14 +590,32 @@ class DatabaseManager:
     def get_event_by_id(self, external_id):
         """Get a single event by external_id"""
         try:
-            event = self.events.find_one({'external_id': external_id})
-            if event:
-                event['_id'] = str(event['_id'])
-            return event
+            return self.events.find_one({'external_id': external_id})
         except Exception as e:
             logger.error(f"Error retrieving event {external_id}: {e}")
             return None
     
+    def get_events_by_ids(self, external_ids, projection=None):
+        """
+        Fetch many events in one $in query on the external_id index.
+        
+        Returns:
+            {external_id: event} for the IDs that exist
+        """
+        if not external_ids:
+            return {}
+        try:
+            cursor = self.events.find({'external_id': {'$in': list(external_ids)}}, projection)
+            return {event['external_id']: event for event in cursor}
+        except Exception as e:
+            logger.error(f"Error retrieving {len(external_ids)} events by id: {e}")
+            return {}
+    
+    def iter_events(self, fields=None):
+        """Every event, optionally projected to fields"""
+        projection = dict.fromkeys(fields, 1) if fields else None
+        return self.events.find({}, projection)
+    
     def count_events(self, filters=None):
         """Count events with optional filters"""
         try:
@@ -95,15 +625,111 @@ class DatabaseManager:
             logger.error(f"Error counting events: {e}")
             return 0
     
+    def get_changes(self, since, limit=500, after_id=None):
+        """
+        Get events changed and deleted since a point in time.
+        
+        Args:
+            since: datetime (UTC); changes with updated_at/deleted_at >= since are returned
+            limit: Maximum number of upserts to return
+            after_id: Resume a page: skip events in the since millisecond up to this external_id
+        
+        Returns:
+            (upserts, deleted_ids, has_more) - upserts sorted by (updated_at, external_id)
+        """
+        # From the primary: a lagging secondary would let tokens skip its missing changes
+        upserts = list(
+            self.primary_events.find(changes_query(since, after_id))
+            .sort([('updated_at', ASCENDING), ('external_id', ASCENDING)])
+            .limit(limit + 1)
+        )
+        has_more = len(upserts) > limit
+        upserts = upserts[:limit]
+        
+        deleted_ids = [
+            t['external_id'] for t in
+            self.tombstones.with_options(read_preference=ReadPreference.PRIMARY)
+            .find({'deleted_at': {'$gte': since}}, {'external_id': 1, '_id': 0})
+        ]
+        return upserts, deleted_ids, has_more
+    
+    def _delete_with_tombstones(self, external_ids):
+        """Delete events by id, recording a tombstone for each for delta sync clients"""
+        now = datetime.now(timezone.utc)
+        self.tombstones.insert_many([
+            {'external_id': eid, 'deleted_at': now} for eid in external_ids
+        ])
+        result = self.events.delete_many({'external_id': {'$in': external_ids}})
+        self.append_feed(feed_deletes(external_ids, 'cleanup'))
+        return result.deleted_count
+    
+    def _sweep(self, query, batch_size=CLEANUP_BATCH_SIZE, pause_seconds=CLEANUP_BATCH_PAUSE_SECONDS):
+        """
+        Delete matching events in small batches with a pause in between,
+        so a large backlog never turns into one long, latency-spiking delete.
+        """
+        total = 0
+        while True:
+            batch = self.events.find(query, {'external_id': 1, '_id': 0}).limit(batch_size)
+            external_ids = [doc['external_id'] for doc in batch]
+            if not external_ids:
+                break
+            total += self._delete_with_tombstones(external_ids)
+            if len(external_ids) < batch_size:
+                break
+            time.sleep(pause_seconds)
+        return total
+    
+    def backfill_expire_at(self, grace_days=CLEANUP_GRACE_DAYS, batch_size=CLEANUP_BATCH_SIZE,
+                           pause_seconds=CLEANUP_BATCH_PAUSE_SECONDS):
+        """
+        Set expire_at on events stored before TTL expiry existed.
+        Runs in rate-limited batches; events without a usable end_time are skipped.
+        
+        Returns:
+            Number of events updated
+        """
+        try:
+            updated = 0
+            last_id = None
+            while True:
+                query = {'expire_at': {'$exists': False}, 'end_time': {'$ne': None}}
+                if last_id is not None:
+                    query['_id'] = {'$gt': last_id}
+                batch = list(
+                    self.events.find(query, {'end_time': 1}).sort('_id', ASCENDING).limit(batch_size)
+                )
+                if not batch:
+                    break
+                last_id = batch[-1]['_id']
+                
+                operations = [
+                    UpdateOne({'_id': doc['_id']}, {'$set': {'expire_at': expire_at}})
+                    for doc in batch
+                    if (expire_at := compute_expire_at(doc.get('end_time'), grace_days))
+                ]
+                if operations:
+                    updated += self.events.bulk_write(operations, ordered=False).modified_count
+                if len(batch) < batch_size:
+                    break
+                time.sleep(pause_seconds)
+            
+            if updated:
+                logger.info(f"⏳ Backfilled expire_at on {updated} events")
+            return updated
+        except Exception as e:
+            logger.error(f"Error backfilling expire_at: {e}")
+            return 0
+    
     def delete_old_events(self, days=90):
-        """Delete events older than specified days"""
+        """Delete events older than specified days (batched, see _sweep)"""
         try:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-            result = self.events.delete_many({
+            deleted_count = self._sweep({
                 'scraped_at': {'$lt': cutoff_date.isoformat()}
             })
-            logger.info(f"🗑️  Deleted {result.deleted_count} old events")
-            return result.deleted_count
+            logger.info(f"🗑️  Deleted {deleted_count} old events")
+            return deleted_count
         except Exception as e:
             logger.error(f"Error deleting old events: {e}")
             return 0
@@ -111,7 +737,10 @@ class DatabaseManager:
     def delete_ended_events(self, grace_days=7):
         """
         Delete events that have ended more than grace_days ago.
-        This keeps the database clean and saves storage.
+        
+        Normally the expire_at TTL index already removes these continuously;
+        this batched sweep catches events the TTL monitor hasn't reached yet
+        (e.g. stored before expire_at existed).
         
         Args:
             grace_days: Number of days after event ends before deletion (default: 7)
@@ -124,12 +753,10 @@ class DatabaseManager:
             cutoff_iso = cutoff_date.isoformat()
             
             # Delete events where end_time is older than cutoff
-            result = self.events.delete_many({
+            deleted_count = self._sweep({
                 'end_time': {'$lt': cutoff_iso, '$ne': None}
             })
             
-            deleted_count = result.deleted_count
-            
             if deleted_count > 0:
                 logger.info(f"🗑️  Deleted {deleted_count} ended events (older than {grace_days} days)")
             else:
@@ -154,34 +781,168 @@ class DatabaseManager:
             logger.error(f"Error saving user-listed event: {e}")
             return None
     
+    def save_user_events(self, items):
+        """
+        Write a batch of user-listed events: one insert_many into the user
+        collection and one bulk upsert into events.
+        
+        Args:
+            items: [(user_doc, event_doc), ...] from prepare_user_event
+        
+        Returns:
+            Outcomes in item order (see user_event_outcomes), or None on failure.
+            Conflicting items are not written to events.
+        """
+        if not items:
+            return []
+        try:
+            stored_hashes = {}
+            try:
+                self.user_listed.insert_many([dict(user_doc) for user_doc, _ in items], ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys are retried (or reused) keys; anything else is a real failure
+                errors = e.details.get('writeErrors', [])
+                if any(error.get('code') != 11000 for error in errors):
+                    raise
+                duplicates = {error['index']: items[error['index']][0]['external_id'] for error in errors}
+                stored = {
+                    doc['external_id']: doc.get('payload_hash') for doc in self.user_listed.find(
+                        {'external_id': {'$in': list(set(duplicates.values()))}},
+                        {'external_id': 1, 'payload_hash': 1, '_id': 0}
+                    )
+                }
+                stored_hashes = {index: stored.get(eid) for index, eid in duplicates.items()}
+            outcomes = user_event_outcomes(items, stored_hashes)
+            event_docs = [event_doc for (_, event_doc), outcome in zip(items, outcomes) if outcome != 'conflict']
+            if event_docs:
+                self.events.bulk_write(
+                    [UpdateOne(*build_event_upsert(event_doc), upsert=True) for event_doc in event_docs],
+                    ordered=False
+                )
+                self.append_feed(feed_upserts(event_docs, 'user'))
+            return outcomes
+        except Exception as e:
+            logger.error(f"Error saving {len(items)} user-listed events: {e}")
+            return None
+    
+    def get_images_to_check(self, max_age_hours, limit, checked_before=None):
+        """
+        Events whose image was never checked or was last checked more than
+        max_age_hours ago (oldest first), with their previous check fields.
+        
+        Args:
+            checked_before: Also exclude images checked at/after this time (the current run)
+        """
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+            if checked_before is not None:
+                cutoff = min(cutoff, checked_before)
+            projection = {'external_id': 1, 'image_url': 1, '_id': 0}
+            projection.update(dict.fromkeys(IMAGE_CHECK_FIELDS, 1))
+            return list(
+                self.events.find(
+                    {
+                        'image_url': VALID_IMAGE_URL,
+                        '$or': [
+                            {'image_checked_at': {'$exists': False}},
+                            {'image_checked_at': {'$lt': cutoff}}
+                        ]
+                    },
+                    projection
+                )
+                .sort('image_checked_at', ASCENDING)
+                .limit(limit)
+            )
+        except Exception as e:
+            logger.error(f"Error getting images to check: {e}")
+            return []
+    
+    def save_image_checks(self, results):
+        """
+        Store image check results in one bulk write.
+        
+        Args:
+            results: [(external_id, {image_* fields}), ...]
+        """
+        if not results:
+            return True
+        try:
+            self.events.bulk_write(
+                [UpdateOne({'external_id': eid}, {'$set': fields}) for eid, fields in results],
+                ordered=False
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving image checks: {e}")
+            return False
+    
+    def save_scrape_run(self, run_doc):
+        """Persist one scrape run's telemetry"""
+        self.scrape_runs.insert_one(run_doc)
+    
+    def get_scrape_runs(self, limit=10):
+        """Most recent scrape runs (without the per-location breakdown)"""
+        try:
+            return list(
+                self.scrape_runs.find({}, {'_id': 0, 'locations': 0})
+                .sort('started_at', DESCENDING)
+                .limit(limit)
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving scrape runs: {e}")
+            return []
+    
+    def get_scrape_run(self, run_id):
+        """A single scrape run with its per-location breakdown"""
+        try:
+            return self.scrape_runs.find_one({'run_id': run_id}, {'_id': 0})
+        except Exception as e:
+            logger.error(f"Error retrieving scrape run {run_id}: {e}")
+            return None
+    
+    def get_discovery_plan(self):
+        """The saved discovery tile plan (one document in the meta collection)"""
+        try:
+            return self.meta.find_one({'_id': 'discovery_plan'}, {'_id': 0})
+        except Exception as e:
+            logger.error(f"Error retrieving discovery plan: {e}")
+            return None
+    
+    def save_discovery_plan(self, plan):
+        self.meta.replace_one(
+            {'_id': 'discovery_plan'},
+            dict(plan, saved_at=datetime.now(timezone.utc)),
+            upsert=True
+        )
+    
     def get_stats(self):
         """Get database statistics"""
         try:
-            total_events = self.events.count_documents({})
-            
-            # Count by status
-            now = datetime.now(timezone.utc)
-            upcoming = self.events.count_documents({
-                'date_time': {'$gt': now.isoformat()}
+            queries = stats_queries(datetime.now(timezone.utc))
+            return format_stats({
+                name: self.events.count_documents(query) for name, query in queries.items()
             })
-            
-            # Count events with images
-            events_with_images = self.events.count_documents({
-                'image_url': {'$exists': True, '$ne': None, '$ne': 'null', '$ne': 'None'}
-            })
-            
-            return {
-                'total_events': total_events,
-                'events_with_images': events_with_images,
-                'upcoming_events': upcoming,
-                'database_name': DATABASE_NAME,
-                'storage_method': 'Direct URLs (no image storage in DB)'
-            }
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return {}
     
     def close(self):
-        """Close MongoDB connection"""
-        self.client.close()
-        logger.info("🔌 MongoDB connection closed")
+        """Close MongoDB connection (no-op if it was never opened)"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            logger.info("🔌 MongoDB connection closed")
+
+
+if __name__ == '__main__':
+    # python database.py migrate [--force]
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python database.py migrate [--force]")
+        sys.exit(1)
+    manager = DatabaseManager()
+    try:
+        if not manager.ensure_schema(force='--force' in sys.argv):
+            logger.info(f"✅ Schema already at version {SCHEMA_VERSION}")
+    finally:
+        manager.close()
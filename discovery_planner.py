@@ -0,0 +1,236 @@
+"""
+Adaptive Geo-tiling Discovery Planner
+Replaces the fixed SCRAPING_LOCATIONS with a grid of tiles over DISCOVERY_REGIONS;
+each tile is one discovery query at its center. The grid adapts between runs:
+
+- Split: a tile whose results were truncated (more pages than the scraper
+  follows) and mostly new is replaced by its four quadrants, so dense areas
+  get finer tiles.
+- Merge: a tile whose events were already found by other tiles in the same run
+  (dedup ratio at or above DISCOVERY_DEDUP_THRESHOLD, smoothed over runs) or
+  that keeps returning nothing is merged away and only re-probed every
+  DISCOVERY_REPROBE_RUNS runs. When all four quadrants are merged, they
+  collapse back into their parent.
+
+Tiles live on one global grid (level 0 = DISCOVERY_TILE_DEGREES, each level
+halves it), keyed "level:row:col", so a tile's parent and children are
+computed, not stored. The plan is kept per category (event density differs)
+and persisted with db.save_discovery_plan() between runs.
+"""
+
+import logging
+import math
+import zlib
+from collections import defaultdict
+from config import (
+    DISCOVERY_REGIONS, DISCOVERY_TILE_DEGREES, DISCOVERY_MIN_TILE_DEGREES,
+    DISCOVERY_DEDUP_THRESHOLD, DISCOVERY_DEDUP_SMOOTHING, DISCOVERY_MERGE_RUNS,
+    DISCOVERY_REPROBE_RUNS
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = 'active'
+SPLIT = 'split'
+MERGED = 'merged'
+
+
+def tile_key(level, row, col):
+    return f"{level}:{row}:{col}"
+
+
+def tile_size(level, base_degrees=DISCOVERY_TILE_DEGREES):
+    return base_degrees / (2 ** level)
+
+
+def tile_center(level, row, col, base_degrees=DISCOVERY_TILE_DEGREES):
+    """(lat, lng) of a tile's center"""
+    size = tile_size(level, base_degrees)
+    lat = -90 + (row + 0.5) * size
+    lng = -180 + (col + 0.5) * size
+    return round(lat, 4), round(lng, 4)
+
+
+def region_tiles(regions, base_degrees=DISCOVERY_TILE_DEGREES):
+    """(row, col) of every level-0 tile overlapping the regions' bounding boxes"""
+    cells = set()
+    for region in regions:
+        first_row = math.floor((region['south'] + 90) / base_degrees)
+        last_row = math.ceil((region['north'] + 90) / base_degrees)
+        first_col = math.floor((region['west'] + 180) / base_degrees)
+        last_col = math.ceil((region['east'] + 180) / base_degrees)
+        for row in range(first_row, last_row):
+            for col in range(first_col, last_col):
+                cells.add((row, col))
+    return sorted(cells)
+
+
+def _new_tile(level, row, col):
+    return {
+        'key': tile_key(level, row, col), 'level': level, 'row': row, 'col': col,
+        'state': ACTIVE, 'runs': 0, 'dedup_ratio': None, 'last_ratio': None, 'entries': 0, 'full': False,
+        'redundant_runs': 0, 'empty_runs': 0, 'probed_run': None,
+    }
+
+
+class DiscoveryPlanner:
+    """
+    One scrape run's tile plan: begin(), locations(category) per category,
+    record() per scraped tile, finish() to adapt and save the grid.
+    """
+
+    def __init__(self, db, regions=None, base_degrees=DISCOVERY_TILE_DEGREES,
+                 min_degrees=DISCOVERY_MIN_TILE_DEGREES, dedup_threshold=DISCOVERY_DEDUP_THRESHOLD,
+                 smoothing=DISCOVERY_DEDUP_SMOOTHING, merge_runs=DISCOVERY_MERGE_RUNS,
+                 reprobe_runs=DISCOVERY_REPROBE_RUNS):
+        self.db = db
+        self.regions = regions or DISCOVERY_REGIONS
+        self.base_degrees = base_degrees
+        self.max_level = max(0, int(math.log2(base_degrees / min_degrees)))
+        self.dedup_threshold = dedup_threshold
+        self.smoothing = smoothing
+        self.merge_runs = merge_runs
+        self.reprobe_runs = reprobe_runs
+        self.run = 0
+        self.tiles = {}  # category slug -> {tile key: tile}
+        self._seen = defaultdict(set)  # category slug -> event IDs found this run
+
+    def begin(self):
+        """Load the saved plan (adding tiles for new regions) and start a run"""
+        plan = self.db.get_discovery_plan() or {}
+        self.run = plan.get('run', 0) + 1
+        self.tiles = defaultdict(dict)
+        for tile in plan.get('tiles', []):
+            self.tiles[tile['category']][tile['key']] = tile
+        self._seen = defaultdict(set)
+        return self
+
+    def _category_tiles(self, slug):
+        """The category's tiles, reconciled with the configured regions"""
+        tiles = self.tiles[slug]
+        roots = set(region_tiles(self.regions, self.base_degrees))
+        covered = set()
+        for key, tile in list(tiles.items()):
+            root = (tile['row'] >> tile['level'], tile['col'] >> tile['level'])
+            if root in roots:
+                covered.add(root)
+            else:
+                del tiles[key]  # Region removed from DISCOVERY_REGIONS
+        for row, col in roots - covered:
+            tiles[tile_key(0, row, col)] = dict(_new_tile(0, row, col), category=slug)
+        return tiles
+
+    def _due(self, tile):
+        if tile['state'] == ACTIVE:
+            return True
+        if tile['state'] == MERGED:
+            if tile['probed_run'] is None:
+                return True
+            # Per-tile offset, so tiles merged in the same run aren't all re-probed together
+            offset = zlib.crc32(tile['key'].encode()) % self.reprobe_runs
+            return self.run - tile['probed_run'] >= self.reprobe_runs + offset
+        return False
+
+    def locations(self, category):
+        """
+        Tiles to query this run as scraper locations: active tiles first, finest
+        first, in a stable order, then re-probed merged tiles, so each tile's
+        dedup ratio is measured against the same coverage every run.
+        """
+        due = [tile for tile in self._category_tiles(category['slug']).values() if self._due(tile)]
+        due.sort(key=lambda tile: (tile['state'] != ACTIVE, -tile['level'], tile['row'], tile['col']))
+        locations = []
+        for tile in due:
+            lat, lng = tile_center(tile['level'], tile['row'], tile['col'], self.base_degrees)
+            locations.append({'name': f"tile {tile['key']}", 'lat': lat, 'lng': lng, 'tile': tile['key']})
+        return locations
+
+    def record(self, category, location, event_ids, truncated):
+        """
+        Results of one tile query.
+
+        Args:
+            event_ids: IDs of the events the tile returned
+            truncated: True if the tile had more results than were fetched
+        """
+        tile = self.tiles[category['slug']].get(location.get('tile'))
+        if tile is None:
+            return
+        event_ids = set(event_ids)
+        seen = self._seen[category['slug']]
+        duplicates = len(event_ids & seen)
+        seen |= event_ids
+
+        tile['runs'] += 1
+        tile['entries'] = len(event_ids)
+        tile['full'] = bool(truncated)
+        tile['probed_run'] = self.run
+        if event_ids:
+            ratio = duplicates / len(event_ids)
+            tile['last_ratio'] = round(ratio, 4)
+            previous = tile['dedup_ratio']
+            tile['dedup_ratio'] = round(
+                ratio if previous is None else self.smoothing * ratio + (1 - self.smoothing) * previous, 4
+            )
+            tile['empty_runs'] = 0
+            tile['redundant_runs'] = tile['redundant_runs'] + 1 if tile['dedup_ratio'] >= self.dedup_threshold else 0
+        else:
+            tile['last_ratio'] = None
+            tile['empty_runs'] += 1
+            tile['redundant_runs'] = 0
+
+    def _adapt(self, tiles):
+        """Split truncated tiles, merge redundant ones, collapse fully merged quadrants"""
+        counts = {'split': 0, 'merged': 0, 'collapsed': 0, 'reactivated': 0}
+        for tile in list(tiles.values()):
+            if tile['probed_run'] != self.run:
+                continue
+            redundant = tile['redundant_runs'] >= self.merge_runs or tile['empty_runs'] >= self.merge_runs
+            # Splitting only pays off where the truncated results were mostly new events
+            novel = tile['last_ratio'] is not None and tile['last_ratio'] < self.dedup_threshold
+            if tile['full'] and novel and tile['level'] < self.max_level:
+                tile['state'] = SPLIT
+                for row in (2 * tile['row'], 2 * tile['row'] + 1):
+                    for col in (2 * tile['col'], 2 * tile['col'] + 1):
+                        child = _new_tile(tile['level'] + 1, row, col)
+                        tiles.setdefault(child['key'], dict(child, category=tile['category']))
+                counts['split'] += 1
+            elif tile['state'] == ACTIVE and redundant:
+                tile['state'] = MERGED
+                counts['merged'] += 1
+            elif tile['state'] == MERGED and not redundant:
+                tile['state'] = ACTIVE
+                counts['reactivated'] += 1
+
+        # Deepest first, so collapsing can cascade up several levels
+        for level in range(self.max_level, 0, -1):
+            parents = defaultdict(list)
+            for tile in tiles.values():
+                if tile['level'] == level:
+                    parents[tile_key(level - 1, tile['row'] >> 1, tile['col'] >> 1)].append(tile)
+            for parent_key, children in parents.items():
+                parent = tiles.get(parent_key)
+                if parent and parent['state'] == SPLIT and len(children) == 4 and all(child['state'] == MERGED for child in children):
+                    for child in children:
+                        del tiles[child['key']]
+                    parent.update(state=MERGED, probed_run=self.run, full=False)
+                    counts['collapsed'] += 1
+        return counts
+
+    def finish(self):
+        """Adapt every category's grid and save the plan"""
+        summary = {}
+        for slug, tiles in self.tiles.items():
+            summary[slug] = self._adapt(tiles)
+            states = defaultdict(int)
+            for tile in tiles.values():
+                states[tile['state']] += 1
+            logger.info(f"🗺️  Discovery plan {slug}: {dict(states)}, {summary[slug]}")
+        try:
+            self.db.save_discovery_plan({
+                'run': self.run,
+                'tiles': [tile for tiles in self.tiles.values() for tile in tiles.values()],
+            })
+        except Exception as e:
+            logger.error(f"Error saving discovery plan: {e}")
+        return summary
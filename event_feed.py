@@ -0,0 +1,257 @@
+"""
+Live Event Stream (Server-Sent Events)
+Writers append every new, changed or deleted event to the event feed in the
+database (see DatabaseManager.append_feed): the scraper's batch writes, the
+list-event path and the cleanup sweeps. Each API process runs one thread that
+tails the feed and fans the changes out to its connected clients:
+
+    - each change is serialized into an SSE frame once (public and internal
+      variants) and appended to a shared, bounded history
+    - clients keep only a position in that history and wait on one condition
+      (threads) or one future per wake-up (asyncio), so an idle client costs a
+      parked thread or coroutine, not a poll
+    - a reconnecting client sends Last-Event-ID and is replayed from the
+      history; if it fell too far behind it gets a 'reset' event and should
+      reload (or catch up with /api/events/changes)
+
+Frames:
+    event: upsert   data: {"event": {...}}  (same fields as /api/events)
+    event: delete   data: {"external_id": "..."}
+    event: reset    data: {}
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from event_queries import listing_event_data, internal_listing_event_data
+from serialization import dumps
+from config import EVENT_STREAM_HISTORY, EVENT_STREAM_HEARTBEAT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+RETRY_MS = 5000          # Client reconnect delay, sent with the first frame
+READY_TIMEOUT_SECONDS = 5  # How long a new stream waits for the backlog before resolving Last-Event-ID
+RESTART_DELAY_SECONDS = 5
+HEARTBEAT = b': keepalive\n\n'
+RESET_FRAME = b'event: reset\ndata: {}\n\n'
+
+
+def _frame(feed_id, name, payload):
+    return b'id: ' + feed_id.encode() + b'\nevent: ' + name.encode() + b'\ndata: ' + dumps(payload) + b'\n\n'
+
+
+def feed_frames(entry):
+    """(public, internal) SSE frames for one feed entry"""
+    if entry['op'] == 'delete':
+        frame = _frame(entry['id'], 'delete', {'external_id': entry['external_id']})
+        return frame, frame
+    event = entry.get('event') or {'external_id': entry['external_id']}
+    return (_frame(entry['id'], 'upsert', {'event': listing_event_data(event)}),
+            _frame(entry['id'], 'upsert', {'event': internal_listing_event_data(event)}))
+
+
+class EventFeedHub:
+    """Per-process fan-out of the event feed to SSE clients"""
+
+    def __init__(self, db, history=EVENT_STREAM_HISTORY, max_clients=None, on_change=None):
+        self.db = db
+        self.max_clients = max_clients
+        self.on_change = on_change  # Called after each batch of live changes (e.g. clear response caches)
+        self._history = deque(maxlen=history)  # (n, feed_id, public_frame, internal_frame)
+        self._n = 0                            # Position of the newest frame
+        self._cond = threading.Condition()
+        self._waiters = set()                  # (loop, future) of waiting async streams
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+        self._clients = 0
+        self.counts = {'changes': 0, 'resets': 0, 'rejected': 0}
+
+    def start(self):
+        """Start the tail thread (once per process, safe after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._history.clear()
+            self._waiters = set()
+            self._clients = 0
+            self._ready.clear()
+            self._stop.clear()
+            threading.Thread(target=self._run, name='event-feed', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake()
+
+    def _run(self):
+        backlog = self._history.maxlen
+        while not self._stop.is_set():
+            try:
+                live = False
+                for entries in self.db.tail_feed(self._stop, backlog=backlog):
+                    self._publish(entries, live)
+                    live = True
+                    self._ready.set()
+            except Exception as e:
+                logger.error(f"Event feed error: {e}")
+            if self._stop.is_set():
+                break
+            # Changes made while reconnecting are not replayed: every client reloads instead
+            backlog = 0
+            with self._cond:
+                self._n += 1
+                self._history.append((self._n, None, RESET_FRAME, RESET_FRAME))
+            self._wake()
+            self._stop.wait(RESTART_DELAY_SECONDS)
+
+    def _publish(self, entries, live=True):
+        frames = []
+        for entry in entries:
+            try:
+                frames.append((entry['id'],) + feed_frames(entry))
+            except Exception as e:
+                logger.error(f"Skipping feed entry {entry.get('id')}: {e}")
+        if frames:
+            with self._cond:
+                for feed_id, public, internal in frames:
+                    self._n += 1
+                    self._history.append((self._n, feed_id, public, internal))
+            self.counts['changes'] += len(frames)
+            self._wake()
+        if live and frames and self.on_change:
+            self.on_change()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    # Clients
+
+    def full(self):
+        """True if max_clients streams are open (the caller should answer 503)"""
+        with self._cond:
+            if self.max_clients is not None and self._clients >= self.max_clients:
+                self.counts['rejected'] += 1
+                return True
+            return False
+
+    def position(self, last_event_id=None):
+        """
+        History position to stream from: just after Last-Event-ID if it is still
+        in the history, else the current end. Returns (position, reset).
+        """
+        with self._cond:
+            if not last_event_id:
+                return self._n, False
+            for n, feed_id, _, _ in reversed(self._history):
+                if feed_id == last_event_id:
+                    return n, False
+            return self._n, True
+
+    def frames_after(self, position, internal=False):
+        """(frames newer than position, new position, True if some were already dropped)"""
+        with self._cond:
+            if not self._history or position >= self._n:
+                return [], position, False
+            oldest = self._history[0][0]
+            lost = position < oldest - 1
+            count = self._n - max(position, oldest - 1)
+            size = len(self._history)
+            # Indexing from the right end: a client that is up to date reads only the new frames
+            frames = [self._history[i][3 if internal else 2] for i in range(size - count, size)]
+            return frames, self._n, lost
+
+    def wait(self, position, timeout):
+        """Block until there are frames after position (or timeout)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._n > position or self._stop.is_set(), timeout)
+
+    async def wait_async(self, position, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            if self._n > position or self._stop.is_set():
+                return
+            self._waiters.add((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiters.discard((loop, future))
+
+    def _open(self, last_event_id):
+        self.start()
+        with self._cond:
+            self._clients += 1
+        self._ready.wait(READY_TIMEOUT_SECONDS)
+        position, reset = self.position(last_event_id)
+        if reset:
+            self.counts['resets'] += 1
+        head = f"retry: {RETRY_MS}\n\n".encode()
+        return position, head + (RESET_FRAME if reset else b'')
+
+    def _next(self, position, internal):
+        frames, position, lost = self.frames_after(position, internal)
+        if lost:
+            self.counts['resets'] += 1
+            frames = [RESET_FRAME]
+        return frames, position
+
+    def _close(self):
+        with self._cond:
+            self._clients -= 1
+
+    def stream(self, last_event_id=None, internal=False, heartbeat=EVENT_STREAM_HEARTBEAT_SECONDS):
+        """SSE byte chunks for a WSGI response; counts as a client while it is being iterated"""
+        position, head = self._open(last_event_id)
+        try:
+            yield head
+            while not self._stop.is_set():
+                frames, position = self._next(position, internal)
+                if frames:
+                    yield b''.join(frames)
+                    continue
+                started = time.monotonic()
+                self.wait(position, heartbeat)
+                if self._n <= position and time.monotonic() - started >= heartbeat:
+                    yield HEARTBEAT
+        finally:
+            self._close()
+
+    async def stream_async(self, last_event_id=None, internal=False, heartbeat=EVENT_STREAM_HEARTBEAT_SECONDS):
+        """stream() for ASGI: an async generator of SSE byte chunks"""
+        position, head = await asyncio.to_thread(self._open, last_event_id)
+        try:
+            yield head
+            while not self._stop.is_set():
+                frames, position = self._next(position, internal)
+                if frames:
+                    yield b''.join(frames)
+                    continue
+                started = time.monotonic()
+                await self.wait_async(position, heartbeat)
+                if self._n <= position and time.monotonic() - started >= heartbeat:
+                    yield HEARTBEAT
+        finally:
+            self._close()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counts, clients=self._clients, history=len(self._history),
+                        ready=self._ready.is_set())
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
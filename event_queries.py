@@ -0,0 +1,368 @@
+"""
+Event Query Helpers
+Filter building and response shaping shared by the sync and async API
+servers and offline exporters
+"""
+
+import hashlib
+import html
+import json
+import re
+import uuid
+from datetime import datetime, timezone, timedelta
+from config import (
+    TOMBSTONE_RETENTION_DAYS, CHANGES_SAFETY_WINDOW_SECONDS, CLEANUP_GRACE_DAYS,
+    BROKEN_IMAGE_POLICY, IMAGE_PLACEHOLDER_URL, IMAGE_PROXY_ENABLED, BATCH_LOOKUP_MAX_IDS,
+    BULK_LIST_MAX_EVENTS, EXCERPT_MAX_CHARS, LISTING_EXCERPTS
+)
+from thumbnails import thumbnail_path, proxy_allowed
+
+# Fields exposed by the public API (whitelist approach - more secure)
+# Removed: ticket_url, image_url (hidden from public API response)
+PUBLIC_FIELDS = frozenset([
+    'external_id', 'title', 'date_time', 'end_time', 'venue',
+    'organizer', 'description', 'category_tags',
+    'guest_count', 'ticket_count', 'timezone',
+    'event_type', 'discovery_location', 'excerpt', 'word_count'
+])
+
+# MongoDB internal fields removed from internal (frontend) responses
+INTERNAL_FIELDS = frozenset([
+    '_id', 'scraped_at', 'updated_at', 'source', 'content_hash', 'expire_at',
+    'image_http_status', 'image_content_type', 'image_size', 'image_etag',
+    'image_last_modified', 'image_checked_at', 'search_tokens'
+])
+
+def clean_event_data(event):
+    """Remove internal/sensitive fields from event data"""
+    return {k: v for k, v in event.items() if k in PUBLIC_FIELDS}
+
+def internal_clean_event_data(event):
+    """Remove only MongoDB internal fields, keep URLs for frontend"""
+    cleaned = {k: v for k, v in event.items() if k not in INTERNAL_FIELDS}
+    if cleaned.get('image_status') == 'broken':
+        cleaned['image_url'] = resolve_image_url(event)
+    if IMAGE_PROXY_ENABLED and proxy_allowed(cleaned.get('image_url')) and cleaned.get('external_id'):
+        # Resized copy served by /api/images/<id>/thumb; cards use this instead of the full cover
+        cleaned['thumbnail_url'] = thumbnail_path(cleaned['external_id'], cleaned['image_url'])
+    return cleaned
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\w+')
+
+def plain_text(text):
+    """Text without HTML tags or entities, whitespace collapsed ('' for non-strings)"""
+    if not isinstance(text, str):
+        return ''
+    return _SPACE_RE.sub(' ', _TAG_RE.sub(' ', html.unescape(text))).strip()
+
+def text_tokens(text):
+    """Lowercase word tokens of a plain text"""
+    return set(_WORD_RE.findall(text.lower()))
+
+def make_excerpt(text, max_chars=EXCERPT_MAX_CHARS):
+    """Plain text cut to max_chars at a word boundary, with an ellipsis if cut"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    if text[max_chars] != ' ' and ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:-') + '…'
+
+def derived_text_fields(event):
+    """
+    Fields computed once when an event is written, so reads don't redo them:
+    excerpt (plain-text description for listings), search_tokens (sorted words
+    of title and description, matched by the in-memory store's ?search=) and
+    word_count (of the description).
+    """
+    description = plain_text(event.get('description'))
+    title = plain_text(event.get('title'))
+    return {
+        'excerpt': make_excerpt(description) or None,
+        'search_tokens': sorted(text_tokens(f"{title} {description}")),
+        'word_count': sum(1 for word in description.split() if _WORD_RE.search(word)),
+    }
+
+def listing_cleaner(clean):
+    """
+    clean for listing-shaped responses: the excerpt instead of the full description
+    (LISTING_EXCERPTS). Events written before the excerpt existed get one here.
+    """
+    if not LISTING_EXCERPTS:
+        return clean
+    
+    def clean_listing(event):
+        cleaned = clean(event)
+        description = cleaned.pop('description', None)
+        if 'excerpt' not in cleaned:
+            cleaned['excerpt'] = make_excerpt(plain_text(description)) or None
+        return cleaned
+    return clean_listing
+
+listing_event_data = listing_cleaner(clean_event_data)
+internal_listing_event_data = listing_cleaner(internal_clean_event_data)
+
+def resolve_image_url(event):
+    """Image URL to serve for an event, applying BROKEN_IMAGE_POLICY to images marked broken"""
+    if event.get('image_status') != 'broken' or BROKEN_IMAGE_POLICY == 'keep':
+        return event.get('image_url')
+    if BROKEN_IMAGE_POLICY == 'substitute':
+        return IMAGE_PLACEHOLDER_URL
+    return None
+
+def event_status(event, now_iso):
+    """Classify an event as 'upcoming', 'ongoing' or 'ended' (ISO string comparison, like the API filters)"""
+    start = event.get('date_time')
+    end = event.get('end_time')
+    if start and start > now_iso:
+        return 'upcoming'
+    if end and end < now_iso:
+        return 'ended'
+    return 'ongoing'
+
+def build_event_filters(search='', location='', status=''):
+    """Build the MongoDB query for the listing endpoints' search/location/status parameters"""
+    filters = {}
+    
+    if search:
+        filters['$text'] = {'$search': search}
+    
+    if location:
+        filters['venue'] = {'$regex': location, '$options': 'i'}
+    
+    if status:
+        now = datetime.now().isoformat()
+        if status == 'upcoming':
+            filters['date_time'] = {'$gt': now}
+        elif status == 'ended':
+            filters['end_time'] = {'$lt': now}
+        elif status == 'ongoing':
+            filters['$and'] = [
+                {'date_time': {'$lte': now}},
+                {'end_time': {'$gte': now}}
+            ]
+    
+    return filters
+
+def parse_id_list(values, max_ids=BATCH_LOOKUP_MAX_IDS):
+    """
+    External IDs from ?ids=a,b,c (repeatable), de-duplicated in request order.
+    
+    Raises:
+        ValueError: more than max_ids IDs
+    """
+    ids = list(dict.fromkeys(
+        part.strip() for value in values for part in value.split(',') if part.strip()
+    ))
+    if len(ids) > max_ids:
+        raise ValueError(f"Too many ids (maximum {max_ids})")
+    return ids
+
+# Fields needed to build image_entry items
+IMAGE_PROJECTION = {'external_id': 1, 'image_url': 1, 'image_status': 1, '_id': 0}
+
+def image_entry(external_id, event):
+    """Batch /api/images item for one requested ID (event may be None)"""
+    image_url = resolve_image_url(event) if event else None
+    entry = {'external_id': external_id, 'image_url': image_url}
+    if IMAGE_PROXY_ENABLED and proxy_allowed(image_url):
+        entry['thumbnail_url'] = thumbnail_path(external_id, image_url)
+    return entry
+
+# Response for delta sync tokens older than the tombstone retention window
+FULL_RESYNC_PAYLOAD = {'success': True, 'full_resync': True, 'upserts': [], 'deletions': []}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _epoch_ms(value):
+    """Whole epoch milliseconds of a datetime (naive is UTC), without float rounding"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+def parse_changes_token(token):
+    """
+    (epoch ms, external_id or None) from a delta sync token: '<ms>', or
+    '<ms>:<external_id>' when resuming a page. ValueError if malformed.
+    """
+    if not token:
+        return 0, None
+    ms, _, after_id = token.partition(':')
+    return int(ms), after_id or None
+
+def changes_since(since_ms, now):
+    """
+    Datetime to resume delta sync from, given a client token (epoch milliseconds).
+    Returns None when tombstones for that window are gone and a full resync is needed;
+    raises ValueError for a token outside the datetime range.
+    """
+    try:
+        since = EPOCH + timedelta(milliseconds=since_ms)
+    except OverflowError:
+        raise ValueError(f"since token out of range: {since_ms}")
+    if since_ms and since < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        return None
+    return since
+
+def changes_cursor(event):
+    """
+    Resume point after a returned change: (its updated_at millisecond, external_id).
+    get_changes(since, after_id=...) continues inside that millisecond by
+    external_id, so pages advance even when more than a page share one.
+    """
+    return EPOCH + timedelta(milliseconds=_epoch_ms(event['updated_at'])), event['external_id']
+
+def changes_payload(upserts, deletions, has_more, since, now, clean):
+    """
+    Delta sync response body with the client's next token.
+    
+    Events removed by the expire_at TTL index leave no tombstone; clients drop
+    any held event whose end_time is before 'expired_before' instead.
+    """
+    if has_more:
+        # Resume after the last returned change (updated_at millisecond, external_id)
+        next_since, after_id = changes_cursor(upserts[-1])
+        token = f"{_epoch_ms(next_since)}:{after_id}"
+    else:
+        token = str(_epoch_ms(max(since, now - timedelta(seconds=CHANGES_SAFETY_WINDOW_SECONDS))))
+    
+    return {
+        'success': True,
+        'full_resync': False,
+        'upserts': [clean(event) for event in upserts],
+        'deletions': deletions,
+        'expired_before': (now - timedelta(days=CLEANUP_GRACE_DAYS)).isoformat(),
+        'has_more': has_more,
+        'token': token
+    }
+
+def _clean_str(data, key):
+    return (data.get(key) or '').strip() or None
+
+def build_user_event(data):
+    """Build the user collection document from a list-event form submission. Images stored as URLs."""
+    return {
+        'title': (data.get('title') or '').strip(),
+        'description': _clean_str(data, 'description'),
+        'venue': _clean_str(data, 'venue'),
+        'date_time': _clean_str(data, 'date_time'),
+        'end_time': _clean_str(data, 'end_time'),
+        'image_url': _clean_str(data, 'image_url'),
+        'category_tags': _clean_str(data, 'category_tags'),
+        'organizer': _clean_str(data, 'organizer'),
+        'ticket_url': _clean_str(data, 'ticket_url'),
+        'event_type': _clean_str(data, 'event_type'),
+        # Extended structured fields from multi-step form (all optional)
+        'organizer_details': data.get('organizer_details') or None,
+        'tickets': data.get('tickets') or [],
+        'sponsors': data.get('sponsors') or [],
+        'partners': data.get('partners') or [],
+        'faqs': data.get('faqs') or [],
+        'contents': data.get('contents') or [],
+    }
+
+def user_event_to_event_doc(event_data, external_id):
+    """Events collection document for a user-listed event, so it appears in listings"""
+    tags = event_data['category_tags']
+    if not tags:
+        base_tags = ['crypto', 'web3', 'blockchain']
+        if event_data.get('event_type'):
+            base_tags.append(event_data['event_type'])
+        tags = ','.join(base_tags)
+    
+    event_doc = {
+        'external_id': external_id,
+        'event_slug': None,
+        'title': event_data['title'],
+        'date_time': event_data['date_time'],
+        'end_time': event_data['end_time'],
+        'venue': event_data['venue'],
+        'organizer': event_data['organizer'],
+        'description': event_data['description'],
+        'category_tags': tags,
+        'ticket_url': event_data['ticket_url'],
+        'image_url': event_data['image_url'],
+        'guest_count': 0,
+        'ticket_count': 0,
+        'discovery_location': None,
+        'timezone': None,
+        'scraped_at': datetime.now(timezone.utc).isoformat(),
+        'source': 'user_listed'
+    }
+    event_doc.update(derived_text_fields(event_doc))
+    return event_doc
+
+def user_event_id(idempotency_key=None):
+    """
+    external_id for a user-listed event. With an idempotency key the ID is
+    derived from it (namespaced, so it can't collide with other key-derived
+    IDs), so a retried submission writes the same documents again instead of
+    creating a duplicate.
+    """
+    if idempotency_key:
+        digest = hashlib.sha1(f"list-event:{idempotency_key}".encode('utf-8')).hexdigest()
+        return 'user-' + digest[:12]
+    return 'user-' + str(uuid.uuid4())[:12]
+
+def payload_hash(user_doc):
+    """Hash of a submission's content, to tell a retry from a reused idempotency key"""
+    encoded = json.dumps(user_doc, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def validate_user_event(data):
+    """Error message for an invalid list-event submission, or None"""
+    if not isinstance(data, dict) or not data:
+        return 'No JSON body'
+    if not isinstance(data.get('title'), str) or not data['title'].strip():
+        return 'Title is required'
+    return None
+
+def prepare_user_event(data, idempotency_key=None):
+    """
+    User collection and events collection documents for one submission
+    (written together by save_user_events, alone or in a batch).
+    
+    Returns:
+        (user_doc, event_doc)
+    """
+    user_doc = build_user_event(data)
+    user_doc['payload_hash'] = payload_hash(user_doc)
+    user_doc['external_id'] = user_event_id(idempotency_key)
+    user_doc['listed_at'] = datetime.now(timezone.utc).isoformat()
+    user_doc['source'] = 'user_listed'
+    if idempotency_key:
+        user_doc['idempotency_key'] = idempotency_key
+    return user_doc, user_event_to_event_doc(user_doc, user_doc['external_id'])
+
+# list-event error for an idempotency key reused with a different payload (409)
+CONFLICT_ERROR = 'Idempotency key already used for a different event'
+
+def user_event_conflicts(items, outcomes, external_ids):
+    """
+    Submission indexes of a bulk list-events request whose idempotency key was
+    already used for a different event.
+    
+    Args:
+        outcomes: save_user_events outcomes per item (None when queued)
+        external_ids: per submission, the item's external_id or None if invalid
+    """
+    if not outcomes:
+        return []
+    indexes = [index for index, eid in enumerate(external_ids) if eid is not None]
+    return [index for index, outcome in zip(indexes, outcomes) if outcome == 'conflict']
+
+def parse_bulk_events(body, max_events=BULK_LIST_MAX_EVENTS):
+    """
+    Submissions from a bulk list-events body: {"events": [...]} or a bare list.
+    
+    Raises:
+        ValueError: not a list of events, or more than max_events
+    """
+    events = body.get('events') if isinstance(body, dict) else body
+    if not isinstance(events, list) or not events:
+        raise ValueError("Body must be a non-empty list of events (or {\"events\": [...]})")
+    if len(events) > max_events:
+        raise ValueError(f"Too many events (maximum {max_events})")
+    return events
@@ -0,0 +1,365 @@
+"""
+In-memory Event Store
+Optional read model for api_server.py: all events are loaded into compact
+slotted records at startup and kept current in a background thread, so
+listing, filter and detail reads never leave the process.
+
+Refresh:
+    - change stream on the events collection (replica sets / Atlas), or
+    - polling updated_at plus tombstones every EVENT_STORE_POLL_SECONDS when
+      change streams are unavailable, with a full reload every
+      EVENT_STORE_FULL_RELOAD_SECONDS (catches TTL expiry and image checks,
+      which don't move updated_at)
+
+Until the first load completes, ready is False and callers read from MongoDB.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from event_queries import INTERNAL_FIELDS, plain_text, text_tokens, changes_cursor
+from time_index import TimeIndex
+from config import (
+    EVENT_STORE_MODE, EVENT_STORE_POLL_SECONDS, EVENT_STORE_FULL_RELOAD_SECONDS,
+    CHANGES_MAX_LIMIT, CHANGES_SAFETY_WINDOW_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields held per record (everything the read endpoints return)
+RECORD_FIELDS = (
+    'external_id', 'event_slug', 'title', 'date_time', 'end_time', 'venue',
+    'organizer', 'description', 'category_tags', 'event_type', 'ticket_url',
+    'image_url', 'image_status', 'guest_count', 'ticket_count',
+    'discovery_location', 'timezone', 'excerpt', 'word_count'
+)
+# Low-cardinality strings shared between records
+INTERNED_FIELDS = ('category_tags', 'event_type', 'discovery_location', 'timezone', 'image_status')
+# Bookkeeping fields no read endpoint returns
+SKIPPED_FIELDS = INTERNAL_FIELDS
+
+_MISSING = object()
+
+
+def tokenize(text):
+    """Lowercase word tokens (HTML stripped, like derived search_tokens), interned so records share them"""
+    return {sys.intern(word) for word in text_tokens(plain_text(text))}
+
+
+@lru_cache(maxsize=256)
+def _venue_pattern(location):
+    # Same case-insensitive regex match as the Mongo $regex filter
+    return re.compile(location, re.IGNORECASE)
+
+
+class EventRecord:
+    """One event, stored without a per-instance dict"""
+
+    __slots__ = RECORD_FIELDS + ('expire_at', 'tokens', 'extra')
+
+    def __init__(self, doc):
+        for field in RECORD_FIELDS:
+            value = doc.get(field, _MISSING)
+            if field in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, field, value)
+        self.expire_at = doc.get('expire_at')
+        tokens = doc.get('search_tokens')
+        if isinstance(tokens, list):
+            # Derived at write time (event_queries.derived_text_fields)
+            self.tokens = frozenset(sys.intern(token) for token in tokens)
+        else:
+            self.tokens = frozenset(tokenize(f"{doc.get('title') or ''} {doc.get('description') or ''}"))
+        # Fields this module doesn't know about (kept so responses match MongoDB's)
+        extra = {k: v for k, v in doc.items()
+                 if k not in RECORD_FIELDS and k not in SKIPPED_FIELDS}
+        self.extra = extra or None
+
+    def to_dict(self):
+        doc = {}
+        for field in RECORD_FIELDS:
+            value = getattr(self, field)
+            if value is not _MISSING:
+                doc[field] = value
+        if self.extra:
+            doc.update(self.extra)
+        return doc
+
+    def get(self, field):
+        value = getattr(self, field, _MISSING)
+        return None if value is _MISSING else value
+
+
+def _sort_key(record):
+    # date_time descending with missing values last, like the Mongo sort
+    date_time = record.get('date_time')
+    return (isinstance(date_time, str), date_time if isinstance(date_time, str) else '')
+
+
+def _matcher(search, location, status):
+    """Predicate equivalent to build_event_filters(search, location, status)"""
+    checks = []
+
+    if search:
+        # $text semantics without stemming: any term matches, "-term" excludes
+        words = search.lower().split()
+        include = set().union(*(tokenize(w) for w in words if not w.startswith('-')))
+        exclude = set().union(*(tokenize(w[1:]) for w in words if w.startswith('-')))
+        checks.append(lambda r: not include.isdisjoint(r.tokens) and exclude.isdisjoint(r.tokens))
+
+    if location:
+        pattern = _venue_pattern(location)
+        checks.append(lambda r: isinstance(r.venue, str) and pattern.search(r.venue) is not None)
+
+    if status:
+        # Same clock and string comparison as build_event_filters
+        now = datetime.now().isoformat()
+        start = lambda r: r.date_time if isinstance(r.date_time, str) else None
+        end = lambda r: r.end_time if isinstance(r.end_time, str) else None
+        if status == 'upcoming':
+            checks.append(lambda r: start(r) is not None and start(r) > now)
+        elif status == 'ended':
+            checks.append(lambda r: end(r) is not None and end(r) < now)
+        elif status == 'ongoing':
+            checks.append(lambda r: start(r) is not None and end(r) is not None
+                          and start(r) <= now <= end(r))
+
+    return lambda record: all(check(record) for check in checks)
+
+
+class EventStore:
+    """All events in memory, refreshed from MongoDB in a background thread"""
+
+    def __init__(self, db, mode=EVENT_STORE_MODE, poll_seconds=EVENT_STORE_POLL_SECONDS,
+                 full_reload_seconds=EVENT_STORE_FULL_RELOAD_SECONDS):
+        self.db = db
+        self.mode = mode
+        self.poll_seconds = poll_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._by_id = {}
+        self._id_by_oid = {}
+        self._sorted = None
+        self.time_index = TimeIndex()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._watermark = None
+        self._loaded_at = None
+        self.ready = False
+        self.refresh_mode = None
+
+    # Lifecycle
+
+    def start(self):
+        """Start loading and refreshing in the background (once per process, safe after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.ready = False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='event-store', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Change streams need MongoDB; other backends are polled
+        if self.mode != 'poll' and self.db.backend == 'mongo':
+            try:
+                self._follow_change_stream()
+                return
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                logger.warning(f"⚠️  Change streams unavailable ({e}); polling every {self.poll_seconds}s")
+        self._poll_loop()
+
+    # Loading and applying changes
+
+    def load_all(self):
+        """Replace the store's contents with every event in the collection"""
+        by_id, id_by_oid = {}, {}
+        watermark = None
+        for doc in self.db.iter_events():
+            record = EventRecord(doc)
+            by_id[record.external_id] = record
+            id_by_oid[doc.get('_id')] = record.external_id
+            updated_at = doc.get('updated_at')
+            if isinstance(updated_at, datetime) and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        time_index = TimeIndex()
+        time_index.build((r.external_id, r.get('date_time'), r.get('end_time')) for r in by_id.values())
+        with self._lock:
+            self._by_id = by_id
+            self._id_by_oid = id_by_oid
+            self._sorted = None
+            self.time_index = time_index
+            self._watermark = watermark
+            self._loaded_at = time.monotonic()
+        self.ready = True
+        logger.info(f"🧠 Event store loaded {len(by_id)} events")
+
+    def upsert(self, doc):
+        if not doc or not doc.get('external_id'):
+            return
+        record = EventRecord(doc)
+        with self._lock:
+            self._by_id[record.external_id] = record
+            if '_id' in doc:
+                self._id_by_oid[doc['_id']] = record.external_id
+            self._sorted = None
+            self.time_index.add(record.external_id, record.get('date_time'), record.get('end_time'))
+
+    def remove(self, external_id=None, oid=None):
+        with self._lock:
+            if external_id is None:
+                external_id = self._id_by_oid.pop(oid, None)
+            if self._by_id.pop(external_id, None) is not None:
+                self._sorted = None
+                self.time_index.remove(external_id)
+
+    def prune_expired(self):
+        """Drop records past expire_at (the TTL index deletes them without a tombstone)"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            expired = [
+                eid for eid, r in self._by_id.items()
+                if isinstance(r.expire_at, datetime)
+                and (r.expire_at if r.expire_at.tzinfo else r.expire_at.replace(tzinfo=timezone.utc)) < now
+            ]
+            for eid in expired:
+                del self._by_id[eid]
+                self.time_index.remove(eid)
+            if expired:
+                self._sorted = None
+        return len(expired)
+
+    def _follow_change_stream(self):
+        """Open the stream first, then load, so no change between the two is lost"""
+        self.refresh_mode = 'change_stream'
+        while not self._stop.is_set():
+            try:
+                with self.db.events.watch(full_document='updateLookup', max_await_time_ms=1000) as stream:
+                    self.load_all()
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        operation = change.get('operationType')
+                        if operation in ('insert', 'update', 'replace'):
+                            if change.get('fullDocument'):
+                                self.upsert(change['fullDocument'])
+                            else:
+                                self.remove(oid=change['documentKey']['_id'])
+                        elif operation == 'delete':
+                            self.remove(oid=change['documentKey']['_id'])
+                        elif operation in ('drop', 'rename', 'dropDatabase', 'invalidate'):
+                            break
+            except Exception as e:
+                if not self.ready:
+                    raise
+                logger.error(f"Event store change stream error: {e}; reopening")
+                self._stop.wait(self.poll_seconds)
+
+    def _poll_once(self):
+        """Apply changes since the last watermark (upserts and tombstones)"""
+        if self._watermark is None:
+            since = datetime.fromtimestamp(0, tz=timezone.utc)
+        else:
+            since = self._watermark - timedelta(seconds=CHANGES_SAFETY_WINDOW_SECONDS)
+        after_id = None
+        while True:
+            upserts, deleted_ids, has_more = self.db.get_changes(since, limit=CHANGES_MAX_LIMIT, after_id=after_id)
+            upserted_ids = set()
+            for doc in upserts:
+                self.upsert(doc)
+                upserted_ids.add(doc.get('external_id'))
+            for external_id in deleted_ids:
+                # A tombstone older than a re-listing must not remove the new copy
+                if external_id not in upserted_ids:
+                    self.remove(external_id=external_id)
+            if upserts:
+                latest = upserts[-1]['updated_at']
+                with self._lock:
+                    if self._watermark is None or latest > self._watermark:
+                        self._watermark = latest
+            if not has_more:
+                break
+            since, after_id = changes_cursor(upserts[-1])
+        self.prune_expired()
+
+    def _poll_loop(self):
+        self.refresh_mode = 'poll'
+        while not self._stop.is_set():
+            try:
+                if not self.ready or time.monotonic() - self._loaded_at >= self.full_reload_seconds:
+                    self.load_all()
+                else:
+                    self._poll_once()
+            except Exception as e:
+                logger.error(f"Event store refresh error: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    # Reads (same shapes as DatabaseManager)
+
+    def _sorted_records(self):
+        records = self._sorted
+        if records is None:
+            with self._lock:
+                if self._sorted is None:
+                    self._sorted = sorted(self._by_id.values(), key=_sort_key, reverse=True)
+                records = self._sorted
+        return records
+
+    def query(self, search='', location='', status='', limit=None, skip=0, time_range=None):
+        """
+        A listing page and total match count, like get_all_events + count_events
+        with build_event_filters(search, location, status).
+
+        time_range: (start, end) epoch seconds from parse_time_range; only events
+        overlapping it are matched, found with the time index.
+
+        Returns:
+            (events, total)
+        """
+        if time_range is not None:
+            by_id = self._by_id
+            records = [by_id[eid] for eid in self.time_index.window(*time_range) if eid in by_id]
+        else:
+            records = self._sorted_records()
+        if search or location or status:
+            matches = _matcher(search, location, status)
+            records = [record for record in records if matches(record)]
+        end = skip + limit if limit else None
+        return [record.to_dict() for record in records[skip:end]], len(records)
+
+    def get_event_by_id(self, external_id):
+        record = self._by_id.get(external_id)
+        return record.to_dict() if record else None
+
+    def get_events_by_ids(self, external_ids, projection=None):
+        found = {}
+        for external_id in external_ids:
+            record = self._by_id.get(external_id)
+            if record:
+                found[external_id] = record.to_dict()
+        return found
+
+    def stats(self):
+        return {
+            'ready': self.ready,
+            'refresh_mode': self.refresh_mode,
+            'events': len(self._by_id),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+        }
@@ -10,6 +10,7 @@ const eventsPerPage = 12;
 let currentView = "grid";
 let currentStatus = "all";
 let currentEvent = null;
+let eventStream = null;
 
 // Initialize the application
 document.addEventListener("DOMContentLoaded", () => {
@@ -22,14 +23,9 @@ async function loadEvents() {
 	showLoading(true);
 
 	try {
-		// Use internal API endpoint that includes URLs
-		const response = await fetch(`${API_BASE_URL}/internal/events`);
-
-		if (!response.ok) {
-			throw new Error("Failed to load events from API");
-		}
-
-		const data = await response.json();
+		// Prefer the static snapshot (no database hit), fall back to the live endpoint
+		const data =
+			(await loadSnapshotEvents()) || (await loadInternalEvents());
 
 		if (data.success) {
 			allEvents = data.events.map((event) => ({
@@ -47,6 +43,7 @@ async function loadEvents() {
 			populateFilters();
 			updateEventCounts();
 			displayEvents();
+			subscribeToEventStream();
 		} else {
 			throw new Error(data.error || "Failed to load events");
 		}
@@ -81,6 +78,107 @@ async function loadEvents() {
 	}
 }
 
+// Load the "all" listing from the static snapshot shards, or null if unavailable
+async function loadSnapshotEvents() {
+	try {
+		const manifestResponse = await fetch(
+			`${API_BASE_URL}/snapshot/manifest.json`,
+		);
+		if (!manifestResponse.ok) return null;
+
+		const manifest = await manifestResponse.json();
+		const group = manifest.groups && manifest.groups.all;
+		if (!group) return null;
+
+		const shards = await Promise.all(
+			group.shards.map(async (shard) => {
+				const response = await fetch(
+					`${API_BASE_URL}/snapshot/${shard.path}`,
+				);
+				if (!response.ok) throw new Error("Snapshot shard missing");
+				return response.json();
+			}),
+		);
+
+		const events = await applyChangesSince(
+			shards.flatMap((shard) => shard.events),
+			manifest.changes_token,
+		);
+		return events && { success: true, events };
+	} catch (error) {
+		console.warn("Snapshot unavailable, using live API:", error.message);
+		return null;
+	}
+}
+
+// Snapshots are rebuilt only after scrapes: apply what changed since this one was
+// built (e.g. user-listed events). Null if too much changed to catch up
+async function applyChangesSince(events, token) {
+	if (!token) return events;
+
+	const byId = new Map(events.map((event) => [event.external_id, event]));
+	let since = token;
+	for (let page = 0; page < 10; page++) {
+		const response = await fetch(
+			`${API_BASE_URL}/internal/events/changes?since=${encodeURIComponent(since)}`,
+		);
+		if (!response.ok) throw new Error("Changes unavailable");
+
+		const changes = await response.json();
+		if (changes.full_resync) return null;
+		changes.upserts.forEach((event) => byId.set(event.external_id, event));
+		changes.deletions.forEach((externalId) => byId.delete(externalId));
+		if (!changes.has_more) return [...byId.values()];
+		since = changes.token;
+	}
+	return null;
+}
+
+// Load events from the internal API endpoint (includes URLs)
+async function loadInternalEvents() {
+	const response = await fetch(`${API_BASE_URL}/internal/events`);
+
+	if (!response.ok) {
+		throw new Error("Failed to load events from API");
+	}
+
+	return response.json();
+}
+
+// Apply upserts and deletions pushed by the API (Server-Sent Events) instead of polling.
+// EventSource reconnects on its own and resumes with Last-Event-ID; on "reset" the
+// server could not replay what was missed, so reload the full list
+function subscribeToEventStream() {
+	if (eventStream || typeof EventSource === "undefined") return;
+
+	eventStream = new EventSource(`${API_BASE_URL}/internal/events/stream`);
+	eventStream.addEventListener("upsert", (message) => {
+		const event = JSON.parse(message.data).event;
+		const updated = { ...event, status: getEventStatus(event) };
+		const index = allEvents.findIndex(
+			(existing) => existing.external_id === event.external_id,
+		);
+		if (index >= 0) allEvents[index] = { ...allEvents[index], ...updated };
+		else allEvents.push(updated);
+		refreshAfterLiveUpdate();
+	});
+	eventStream.addEventListener("delete", (message) => {
+		const { external_id } = JSON.parse(message.data);
+		allEvents = allEvents.filter((event) => event.external_id !== external_id);
+		refreshAfterLiveUpdate();
+	});
+	eventStream.addEventListener("reset", () => loadEvents());
+}
+
+// Re-filter after a burst of live updates, keeping the current page
+const refreshAfterLiveUpdate = debounce(() => {
+	const page = currentPage;
+	applyFilters();
+	const pages = Math.max(1, Math.ceil(filteredEvents.length / eventsPerPage));
+	currentPage = Math.min(page, pages);
+	if (currentPage !== 1) displayEvents();
+}, 500);
+
 // Get event status based on dates
 function getEventStatus(event) {
 	const now = new Date();
@@ -105,7 +203,13 @@ function getEventStatus(event) {
 }
 
 // Get image URL - use direct URL from event data or fallback to placeholder
-function getImageUrl(event) {
+// Cards pass preferThumbnail to use the API's resized copy when it provides one
+function getImageUrl(event, preferThumbnail = false) {
+	if (preferThumbnail && event.thumbnail_url) {
+		// thumbnail_url is an API path ("/api/..."); resolve it against API_BASE_URL
+		return API_BASE_URL + event.thumbnail_url.replace(/^\/api/, "");
+	}
+
 	// If event has image_url, use it directly (loads from Luma CDN)
 	if (
 		event.image_url &&
@@ -145,7 +249,7 @@ function createEventCard(event) {
 				.join("")
 		: "";
 
-	const imageUrl = getImageUrl(event);
+	const imageUrl = getImageUrl(event, true);
 	const dateStr = formatEventDate(event.date_time);
 	const timeStr = formatEventTime(event.date_time, event.end_time);
 	const venue = escapeHtml(event.venue || "Location TBA");
@@ -397,7 +501,7 @@ function applyFilters() {
 			if (searchQuery) {
 				const searchableText = [
 					event.title,
-					event.description,
+					event.description || event.excerpt,
 					event.venue,
 					event.organizer,
 					event.category_tags,
@@ -708,7 +812,7 @@ function addToCalendarService(service) {
 
 	const event = currentEvent;
 	const title = event.title || "Crypto Event";
-	const description = event.description || "";
+	const description = event.description || event.excerpt || "";
 	const location = event.venue || "";
 	const organizer = event.organizer || "";
 
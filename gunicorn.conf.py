@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for the Events API
+Multiple worker processes x threads; each worker creates its own MongoClient
+after fork (see DatabaseManager), sized by the MONGO_* pool settings in config.py.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from config import API_HOST, API_PORT, API_WORKERS, API_THREADS, API_WORKER_TIMEOUT
+
+bind = f"{API_HOST}:{API_PORT}"
+workers = API_WORKERS
+threads = API_THREADS
+worker_class = 'gthread'
+timeout = API_WORKER_TIMEOUT
+keepalive = 5
+
+# Import the app in each worker, never in the master, so no MongoClient
+# (or its monitor threads) exists before fork
+preload_app = False
+
+# Recycle workers periodically to bound memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def on_starting(server):
+    """
+    Migrate the schema once, in the master, before any worker starts: workers
+    only check the version (/api/ready), and a slow backfill can't hit their
+    timeout. The connection is closed again before fork.
+    """
+    from storage import open_database
+    db = open_database()
+    try:
+        if db.ensure_schema():
+            server.log.info("🗂️ Schema migrated before starting workers")
+    except Exception as e:
+        server.log.error(f"❌ Schema migration failed: {e}")
+    finally:
+        db.close()
+
+
+def post_fork(server, worker):
+    server.log.info(f"🚀 Worker {worker.pid} started")
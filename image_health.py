@@ -0,0 +1,156 @@
+"""
+Image URL Health Checks
+Validates event cover URLs with pooled HEAD requests (falling back to a
+one-byte ranged GET), concurrently on a bounded worker pool, and records
+image_status, content type, size and last-checked time per event.
+
+Rechecks are incremental: only images not checked within max_age_hours are
+fetched, and stored ETag/Last-Modified values make them conditional (304).
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    API_HEADERS, IMAGE_CHECK_WORKERS, IMAGE_CHECK_TIMEOUT_SECONDS,
+    IMAGE_CHECK_MAX_AGE_HOURS, IMAGE_CHECK_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# image_status values
+IMAGE_OK = 'ok'
+IMAGE_BROKEN = 'broken'  # Permanent failure (4xx, not an image, invalid URL)
+IMAGE_ERROR = 'error'    # Transient failure (timeout, 5xx, 429); retried next run
+
+# Stored with every non-ok result, so a later 304 can't revive a stale check
+NO_VALIDATORS = {'image_etag': None, 'image_last_modified': None}
+
+# Servers that reject HEAD; retried as a ranged GET
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+
+class ImageChecker:
+    """Checks image URLs over a shared, pooled HTTP session"""
+
+    def __init__(self, workers=IMAGE_CHECK_WORKERS, timeout=IMAGE_CHECK_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': API_HEADERS['User-Agent']})
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, url, previous):
+        headers = {}
+        # Only revalidate an image that was ok; anything else is checked from scratch
+        if previous.get('image_status') == IMAGE_OK:
+            if previous.get('image_etag'):
+                headers['If-None-Match'] = previous['image_etag']
+            if previous.get('image_last_modified'):
+                headers['If-Modified-Since'] = previous['image_last_modified']
+
+        response = self.session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        if response.status_code in HEAD_UNSUPPORTED:
+            headers['Range'] = 'bytes=0-0'
+            response = self.session.get(url, headers=headers, timeout=self.timeout,
+                                        allow_redirects=True, stream=True)
+            response.close()
+        return response, 'If-None-Match' in headers or 'If-Modified-Since' in headers
+
+    def check(self, event):
+        """
+        Check one event's image_url.
+
+        Args:
+            event: Document with external_id, image_url and any previous image_* fields
+
+        Returns:
+            Dict of image_* fields to store
+        """
+        url = event['image_url']
+        now = datetime.now(timezone.utc)
+        try:
+            response, conditional = self._request(url, event)
+        except (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                requests.exceptions.InvalidSchema):
+            return dict(NO_VALIDATORS, image_status=IMAGE_BROKEN, image_http_status=None, image_checked_at=now)
+        except requests.RequestException as e:
+            logger.debug(f"Image check failed for {url}: {e}")
+            return dict(NO_VALIDATORS, image_status=IMAGE_ERROR, image_http_status=None, image_checked_at=now)
+
+        status = response.status_code
+        result = {'image_http_status': status, 'image_checked_at': now}
+        if status == 304 and conditional:
+            result['image_status'] = IMAGE_OK
+            return result
+        # Validators are kept only while the image is ok (see _request)
+        if status == 429 or status >= 500:
+            result.update(NO_VALIDATORS, image_status=IMAGE_ERROR)
+            return result
+        if status >= 400 or status == 304:
+            result.update(NO_VALIDATORS, image_status=IMAGE_BROKEN)
+            return result
+
+        content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        size = response.headers.get('Content-Length')
+        content_range = response.headers.get('Content-Range', '')
+        if status == 206 and '/' in content_range:
+            size = content_range.rsplit('/', 1)[1]
+
+        result.update({
+            'image_status': IMAGE_OK if content_type.startswith('image/') else IMAGE_BROKEN,
+            'image_content_type': content_type or None,
+            'image_size': int(size) if size and size.isdigit() else None,
+            'image_etag': response.headers.get('ETag'),
+            'image_last_modified': response.headers.get('Last-Modified'),
+        })
+        return result
+
+    def check_many(self, events):
+        """Check events concurrently; returns [(external_id, fields), ...] in input order"""
+        with ThreadPoolExecutor(self.workers) as pool:
+            results = pool.map(self.check, events)
+            return [(event['external_id'], fields) for event, fields in zip(events, results)]
+
+    def close(self):
+        self.session.close()
+
+
+def run_image_checks(db, max_age_hours=IMAGE_CHECK_MAX_AGE_HOURS, limit=None,
+                     workers=IMAGE_CHECK_WORKERS, batch_size=IMAGE_CHECK_BATCH_SIZE):
+    """
+    Check images that are unchecked or older than max_age_hours, in batches.
+
+    Args:
+        db: DatabaseManager
+        max_age_hours: Recheck age (0 rechecks everything)
+        limit: Maximum number of images to check this run
+
+    Returns:
+        Counts per image_status plus 'checked'
+    """
+    checker = ImageChecker(workers=workers)
+    counts = {'checked': 0, IMAGE_OK: 0, IMAGE_BROKEN: 0, IMAGE_ERROR: 0}
+    started = datetime.now(timezone.utc)
+    try:
+        while limit is None or counts['checked'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - counts['checked'])
+            events = db.get_images_to_check(max_age_hours, size, checked_before=started)
+            if not events:
+                break
+
+            results = checker.check_many(events)
+            if not db.save_image_checks(results):
+                break
+            for _, fields in results:
+                counts[fields['image_status']] += 1
+            counts['checked'] += len(results)
+            logger.info(f"🖼️  Checked {counts['checked']} images "
+                        f"({counts[IMAGE_BROKEN]} broken, {counts[IMAGE_ERROR]} errors)")
+    finally:
+        checker.close()
+    return counts
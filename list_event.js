@@ -22,6 +22,10 @@
     /** Effective banner image: data URL (from file upload) or https URL (from paste). Stored as link in user collection. */
     let effectiveBannerUrl = '';
     const totalSteps = 7;
+    /** Sent as Idempotency-Key: resubmitting after a network error can't list the event twice. */
+    const submissionKey = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : Date.now().toString(36) + Math.random().toString(36).slice(2);
 
     // Data collections for complex sections
     const tickets = [];
@@ -535,7 +539,7 @@
 
         fetch(API_BASE + '/user/list-event', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': submissionKey },
             body: JSON.stringify(payload)
         })
             .then(function (r) { return r.json().then(function (j) { return { ok: r.ok, json: j }; }); })
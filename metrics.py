@@ -0,0 +1,154 @@
+"""
+Prometheus-style Metrics
+Per-route request counts, latency and payload-size histograms, Mongo command
+durations (via PyMongo command monitoring) and cache hit rates, rendered in
+the Prometheus text exposition format for /api/metrics.
+
+Metrics are kept per process; under gunicorn each worker reports its own
+series (see events_api_process_info for which pid answered the scrape).
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {series[-1]}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+REQUEST_COUNT = Counter(
+    'events_api_requests_total', 'HTTP requests by route and status',
+    labels=('method', 'route', 'status')
+)
+REQUEST_LATENCY = Histogram(
+    'events_api_request_duration_seconds', 'HTTP request latency by route',
+    labels=('method', 'route')
+)
+RESPONSE_SIZE = Histogram(
+    'events_api_response_size_bytes', 'HTTP response body size (as sent) by route',
+    labels=('method', 'route'), buckets=SIZE_BUCKETS
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    'events_api_mongo_command_duration_seconds', 'MongoDB command duration by command name',
+    labels=('command', 'outcome')
+)
+
+# name -> zero-argument callable returning {'hits': n, 'misses': n}
+_cache_sources = {}
+
+
+def register_cache(name, stats_fn):
+    """Expose a cache's hit/miss counters (e.g. ResponseCache.stats)"""
+    _cache_sources[name] = stats_fn
+
+
+def observe_request(method, route, status, seconds, size):
+    REQUEST_COUNT.inc(method, route, str(status))
+    REQUEST_LATENCY.observe(seconds, method, route)
+    if size is not None:
+        RESPONSE_SIZE.observe(size, method, route)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records the duration of every MongoDB command the client sends"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, event.command_name, 'success')
+
+    def failed(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, event.command_name, 'failure')
+
+
+# Shared listener instance, passed to MongoClient(event_listeners=[...])
+command_listener = MongoCommandListener()
+
+
+def render_metrics():
+    """All metrics in Prometheus text format (version 0.0.4)"""
+    lines = []
+    for metric in (REQUEST_COUNT, REQUEST_LATENCY, RESPONSE_SIZE, MONGO_COMMAND_LATENCY):
+        lines.extend(metric.render())
+
+    lines.append("# HELP events_api_cache_requests_total Cache lookups by cache and result")
+    lines.append("# TYPE events_api_cache_requests_total counter")
+    for name, stats_fn in sorted(_cache_sources.items()):
+        stats = stats_fn()
+        lines.append(f'events_api_cache_requests_total{{cache="{name}",result="hit"}} {stats.get("hits", 0)}')
+        lines.append(f'events_api_cache_requests_total{{cache="{name}",result="miss"}} {stats.get("misses", 0)}')
+
+    lines.append("# HELP events_api_process_info Process serving these metrics")
+    lines.append("# TYPE events_api_process_info gauge")
+    lines.append(f'events_api_process_info{{pid="{os.getpid()}"}} 1')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,168 @@
+"""
+Request Profiling
+Per-request stage timings (DB fetch, count, cleaning, serialization, time
+spent waiting on Mongo) with an optional cProfile capture, kept in a rolling
+in-memory store.
+
+A request is profiled when:
+    - it sends "X-Profile: <PROFILING_TOKEN>" (also captures cProfile), or
+    - PROFILING_ENABLED is set (stage timings for every request), or
+    - it falls in the PROFILE_SAMPLE_RATE random sample
+"""
+
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pymongo import monitoring
+from config import PROFILING_ENABLED, PROFILING_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_STORE_SIZE
+
+_current = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Timings for one request"""
+
+    def __init__(self, method, path, detailed=False):
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = {}
+        self.mongo_commands = 0
+        self.total_ms = None
+        self.cprofile_text = None
+        self._started = time.perf_counter()
+        self._profiler = cProfile.Profile() if detailed else None
+
+    def add_stage(self, name, ms):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def start(self):
+        if self._profiler:
+            self._profiler.enable()
+
+    def stop(self, top=25):
+        self.total_ms = (time.perf_counter() - self._started) * 1000
+        if self._profiler:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(top)
+            self.cprofile_text = out.getvalue()
+            self._profiler = None
+
+    def server_timing(self):
+        """Server-Timing header value"""
+        parts = [f"{name};dur={ms:.2f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms:.2f}")
+        return ', '.join(parts)
+
+    def to_dict(self, include_cprofile=False):
+        doc = {
+            'profile_id': self.profile_id,
+            'method': self.method,
+            'path': self.path,
+            'started_at': self.started_at.isoformat(),
+            'total_ms': self.total_ms,
+            'stages_ms': self.stages,
+            'mongo_commands': self.mongo_commands,
+        }
+        if include_cprofile:
+            doc['cprofile'] = self.cprofile_text
+        return doc
+
+
+class ProfileStore:
+    """Rolling store of the most recent request profiles"""
+
+    def __init__(self, size=PROFILE_STORE_SIZE):
+        self._profiles = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self):
+        with self._lock:
+            return [p.to_dict() for p in reversed(self._profiles)]
+
+    def get(self, profile_id):
+        with self._lock:
+            for profile in self._profiles:
+                if profile.profile_id == profile_id:
+                    return profile.to_dict(include_cprofile=True)
+        return None
+
+
+profile_store = ProfileStore()
+
+
+def is_authorized(headers):
+    """True if the request carries the admin profiling token"""
+    return bool(PROFILING_TOKEN) and headers.get('X-Profile') == PROFILING_TOKEN
+
+
+def begin(method, path, headers):
+    """Start profiling the current request if it qualifies; returns the profile or None"""
+    detailed = is_authorized(headers)
+    if not (detailed or PROFILING_ENABLED or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE)):
+        return None
+    profile = RequestProfile(method, path, detailed=detailed)
+    _current.set(profile)
+    profile.start()
+    return profile
+
+
+def end():
+    """Finish the current request's profile and store it"""
+    profile = _current.get()
+    if profile is None:
+        return None
+    _current.set(None)
+    profile.stop()
+    profile_store.add(profile)
+    return profile
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a named stage of the current request (no-op when not profiling)"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, (time.perf_counter() - started) * 1000)
+
+
+class ProfilingCommandListener(monitoring.CommandListener):
+    """Attributes Mongo round-trip time to the profiled request that issued it"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        profile = _current.get()
+        if profile is not None:
+            profile.mongo_commands += 1
+            profile.add_stage('mongo', event.duration_micros / 1000)
+
+
+command_listener = ProfilingCommandListener()
@@ -0,0 +1,84 @@
+"""
+In-process Response Cache
+Caches serialized JSON bodies of read endpoints, together with their
+compressed variants, so repeat hits skip Mongo, serialization and compression.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from compression import compress
+
+
+class CachedBody:
+    """A cached response body plus its lazily built compressed variants"""
+
+    __slots__ = ('body', 'created_at', 'variants')
+
+    def __init__(self, body):
+        self.body = body
+        self.created_at = time.monotonic()
+        self.variants = {}
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a fixed TTL"""
+
+    def __init__(self, ttl_seconds=60, max_entries=512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key):
+        """Return the live entry for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, body):
+        """Store a body and return its entry"""
+        entry = CachedBody(body)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def variant(self, entry, encoding):
+        """Body for the given encoding, compressing at most once per entry"""
+        if not encoding:
+            return entry.body
+        data = entry.variants.get(encoding)
+        if data is None:
+            # Concurrent misses may both compress; the result is identical
+            data = compress(entry.body, encoding)
+            entry.variants[encoding] = data
+        return data
+
+    def clear(self):
+        """Drop all entries (call after writes that change listings)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
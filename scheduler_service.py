@@ -1,6 +1,7 @@
 """
 Automated Scheduler Service
-Runs scraper every 24 hours and cleans up ended events daily
+Runs scraper every 24 hours, cleans up ended events daily and
+rechecks event image URLs every few hours
 """
 
 import schedule
@@ -8,8 +9,15 @@ import time
 import logging
 from datetime import datetime
 from scraper_mongodb import main as run_scraper
-from database import DatabaseManager
-from config import SCRAPE_INTERVAL_HOURS, CLEANUP_GRACE_DAYS
+from scrape_queue import ScrapeTaskQueue
+from discovery_planner import DiscoveryPlanner
+from snapshot import build_snapshot
+from storage import open_database
+from image_health import run_image_checks
+from config import (
+    SCRAPE_INTERVAL_HOURS, CLEANUP_GRACE_DAYS, CLEANUP_SWEEP_ENABLED, IMAGE_CHECK_INTERVAL_HOURS,
+    SCRAPE_MODE, DISCOVERY_MODE, SNAPSHOT_ENABLED, SCRAPE_RUN_WAIT_SECONDS
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,10 +25,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Reused across cleanup/image check runs instead of opening a new client each time
+_maintenance_db = None
+
+def _get_maintenance_db():
+    global _maintenance_db
+    if _maintenance_db is None:
+        _maintenance_db = open_database()
+    return _maintenance_db
+
+# Queued run awaiting its workers: (run_id, planner, enqueued at), checked every minute
+_queued_run = None
+
+def scheduled_queue_scrape():
+    """Enqueue a scrape run for scrape_queue.py workers; scheduled_queue_check follows it up"""
+    global _queued_run
+    if _get_maintenance_db().backend != 'mongo':
+        logger.error("❌ SCRAPE_MODE=queue needs STORAGE_BACKEND=mongo (workers share the task queue)")
+        return
+    queue = ScrapeTaskQueue(_get_maintenance_db())
+    planner = DiscoveryPlanner(_get_maintenance_db()).begin() if DISCOVERY_MODE == 'tiles' else None
+    run_id = queue.enqueue_run(planner=planner)
+    if run_id:
+        _queued_run = (run_id, planner, time.monotonic())
+
+def scheduled_queue_check():
+    """
+    Once the queued run has finished, adapt the discovery plan and build the snapshot.
+    Never blocks, so cleanup and image checks run while the workers scrape.
+    """
+    global _queued_run
+    if _queued_run is None:
+        return
+    run_id, planner, enqueued_at = _queued_run
+    try:
+        queue = ScrapeTaskQueue(_get_maintenance_db())
+        status = queue.run_status(run_id)
+        if not status['finished']:
+            if time.monotonic() - enqueued_at >= SCRAPE_RUN_WAIT_SECONDS:
+                _queued_run = None
+                logger.error(f"❌ Scrape run {run_id} unfinished after {SCRAPE_RUN_WAIT_SECONDS}s "
+                             f"(are scrape workers running?); skipping plan update and snapshot")
+            return
+        _queued_run = None
+        if planner:
+            queue.adapt_plan(run_id, planner)
+        logger.info(f"✅ Scrape run {run_id} finished: {status['tasks']['done']} tasks done, "
+                    f"{status['tasks']['failed']} failed, {status['events']} events")
+        if SNAPSHOT_ENABLED:
+            build_snapshot(_get_maintenance_db())
+    except Exception as e:
+        logger.error(f"❌ Scrape run check error: {e}")
+
 def scheduled_scrape():
-    """Run the scraper"""
+    """Run the scraper (or, with SCRAPE_MODE=queue, have the scrape workers run it)"""
     logger.info(f"⏰ Scheduled scrape started at {datetime.now()}")
     try:
+        if SCRAPE_MODE == 'queue':
+            scheduled_queue_scrape()
+            return
         stats = run_scraper()
         if stats:
             logger.info(f"✅ Scrape completed: {stats['events_saved']} events saved")
@@ -30,13 +93,18 @@ def scheduled_scrape():
         logger.error(f"❌ Scrape error: {e}")
 
 def scheduled_cleanup():
-    """Clean up ended events to save database storage"""
+    """
+    Backfill expire_at and sweep ended events the TTL index hasn't removed yet.
+    Expiry itself is continuous (TTL index on expire_at); this is batched and rate-limited.
+    """
+    if not CLEANUP_SWEEP_ENABLED:
+        return
     logger.info(f"🧹 Scheduled cleanup started at {datetime.now()}")
     try:
-        db = DatabaseManager()
+        db = _get_maintenance_db()
+        db.backfill_expire_at(grace_days=CLEANUP_GRACE_DAYS)
         # Delete events that ended more than CLEANUP_GRACE_DAYS ago
         deleted_count = db.delete_ended_events(grace_days=CLEANUP_GRACE_DAYS)
-        db.close()
         
         if deleted_count > 0:
             logger.info(f"✅ Cleanup completed: {deleted_count} ended events removed")
@@ -45,6 +113,16 @@ def scheduled_cleanup():
     except Exception as e:
         logger.error(f"❌ Cleanup error: {e}")
 
+def scheduled_image_check():
+    """Recheck image URLs not checked within IMAGE_CHECK_MAX_AGE_HOURS"""
+    logger.info(f"🖼️  Scheduled image check started at {datetime.now()}")
+    try:
+        counts = run_image_checks(_get_maintenance_db())
+        logger.info(f"✅ Image check completed: {counts['checked']} checked, "
+                    f"{counts['broken']} broken, {counts['error']} errors")
+    except Exception as e:
+        logger.error(f"❌ Image check error: {e}")
+
 def run_scheduler():
     """Run the scheduler service"""
     logger.info(f"""
@@ -52,8 +130,9 @@ def run_scheduler():
 ║         ⏰ Automated Scraper & Cleanup Scheduler         ║
 ╚══════════════════════════════════════════════════════════╝
 
-📅 Scraping Schedule: Every {SCRAPE_INTERVAL_HOURS} hours
-🧹 Cleanup Schedule: Daily at 02:00 AM
+📅 Scraping Schedule: Every {SCRAPE_INTERVAL_HOURS} hours ({SCRAPE_MODE} mode)
+🧹 Cleanup: Continuous (TTL index), backfill sweep daily at 02:00 AM
+🖼️  Image checks: Every {IMAGE_CHECK_INTERVAL_HOURS} hours
 🕐 Next scrape: {schedule.next_run()}
 
 Running initial scrape now...
@@ -65,12 +144,22 @@ Running initial scrape now...
     # Run cleanup immediately on start
     scheduled_cleanup()
     
+    # Check images of newly scraped events
+    scheduled_image_check()
+    
     # Schedule scraping every 24 hours
     schedule.every(SCRAPE_INTERVAL_HOURS).hours.do(scheduled_scrape)
     
+    # Follow up queued scrape runs without blocking the other jobs
+    if SCRAPE_MODE == 'queue':
+        schedule.every().minute.do(scheduled_queue_check)
+    
     # Schedule cleanup daily at 2 AM
     schedule.every().day.at("02:00").do(scheduled_cleanup)
     
+    # Recheck image URLs (incremental: only ones older than IMAGE_CHECK_MAX_AGE_HOURS)
+    schedule.every(IMAGE_CHECK_INTERVAL_HOURS).hours.do(scheduled_image_check)
+    
     logger.info(f"✅ Scheduler started. Next run: {schedule.next_run()}")
     
     # Keep running
@@ -0,0 +1,464 @@
+"""
+Distributed Scrape Work Queue
+A coordinator enqueues one task per (category, location) into the
+scrape_tasks collection; any number of workers, on any host, claim tasks
+with an atomic find_one_and_update lease, fetch the page at the task's
+cursor with MongoDBScraper, and enqueue the next page as a new task.
+
+Leases:
+    - a worker heartbeats its lease every SCRAPE_TASK_LEASE_SECONDS / 3
+    - a lease that is not renewed expires and the task is claimed again
+      (crashed or hung worker); event upserts are idempotent, so a page
+      processed twice is harmless
+    - failed tasks are retried after SCRAPE_TASK_RETRY_DELAY_SECONDS, up to
+      SCRAPE_TASK_MAX_ATTEMPTS, then marked failed
+
+Usage:
+    python scrape_queue.py enqueue [--wait]     # coordinator: queue a scrape run
+    python scrape_queue.py work [--drain]       # worker: process tasks (--drain exits when idle)
+    python scrape_queue.py status [run_id]
+
+With DISCOVERY_MODE=tiles the tasks are the discovery planner's tiles; tile
+tasks record the event IDs they found, and a coordinator that waits for the
+run (enqueue --wait, the scheduler) feeds them back to adapt the tile plan.
+"""
+
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import DatabaseManager
+from scraper_mongodb import MongoDBScraper
+from scrape_telemetry import ScrapeRunRecorder
+from snapshot import build_snapshot
+from discovery_planner import DiscoveryPlanner
+from config import (
+    EVENT_CATEGORIES, SCRAPING_LOCATIONS, DISCOVERY_MODE, SCRAPE_MAX_PAGES, SCRAPE_TASK_LEASE_SECONDS,
+    SCRAPE_TASK_MAX_ATTEMPTS, SCRAPE_TASK_RETRY_DELAY_SECONDS, SCRAPE_WORKER_POLL_SECONDS, SCRAPE_RUN_WAIT_SECONDS,
+    SNAPSHOT_ENABLED
+)
+
+logger = logging.getLogger(__name__)
+
+# Task states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class ScrapeTaskQueue:
+    """Lease-based task queue on the scrape_tasks collection"""
+
+    def __init__(self, db, lease_seconds=SCRAPE_TASK_LEASE_SECONDS, max_attempts=SCRAPE_TASK_MAX_ATTEMPTS,
+                 retry_delay_seconds=SCRAPE_TASK_RETRY_DELAY_SECONDS):
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+
+    @property
+    def tasks(self):
+        return self.db.scrape_tasks
+
+    @staticmethod
+    def task_id(run_id, category, location, page):
+        return f"{run_id}:{category['slug']}:{location['name']}:{page}"
+
+    def _task(self, run_id, category, location, page, cursor, max_pages, now):
+        # Category and location are stored whole, so workers don't depend on their own config
+        task_location = {'name': location['name'], 'lat': location['lat'], 'lng': location['lng']}
+        if location.get('tile'):
+            task_location['tile'] = location['tile']
+        return {
+            '_id': self.task_id(run_id, category, location, page),
+            'run_id': run_id,
+            'category': {'name': category['name'], 'slug': category['slug'], 'tags': category['tags']},
+            'location': task_location,
+            'page': page,
+            'cursor': cursor,
+            'max_pages': max_pages,
+            'state': PENDING,
+            'attempts': 0,
+            'available_at': now,
+            'created_at': now,
+        }
+
+    def open_tasks(self):
+        """Tasks not yet finished, across all runs"""
+        return self.tasks.count_documents({'state': {'$in': [PENDING, LEASED]}})
+
+    def enqueue_run(self, categories=None, locations=None, max_pages=SCRAPE_MAX_PAGES, force=False,
+                    planner=None):
+        """
+        Queue first-page tasks for every (category, location), or for every
+        (category, planned tile) with a begun DiscoveryPlanner.
+
+        Returns:
+            run_id, or None if a previous run still has open tasks (unless force)
+        """
+        # Tasks whose final lease expired count as open until reaped
+        self.reap_exhausted()
+        if not force and self.open_tasks():
+            logger.warning("⚠️  Previous scrape run still has open tasks; not enqueuing a new one")
+            return None
+        now = _now()
+        run_id = f"{now.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:6]}"
+        tasks = [
+            self._task(run_id, category, location, 0, None, max_pages, now)
+            for category in (categories or EVENT_CATEGORIES)
+            for location in (planner.locations(category) if planner else locations or SCRAPING_LOCATIONS)
+        ]
+        self.tasks.insert_many(tasks, ordered=False)
+        logger.info(f"📥 Scrape run {run_id}: {len(tasks)} tasks queued")
+        return run_id
+
+    def claim(self, worker_id):
+        """
+        Lease the oldest available task: pending and due, or leased with an
+        expired lease. Atomic, so two workers never hold the same lease.
+
+        Returns:
+            The task document, or None if nothing is available
+        """
+        now = _now()
+        return self.tasks.find_one_and_update(
+            {
+                '$or': [
+                    {'state': PENDING, 'available_at': {'$lte': now}},
+                    {'state': LEASED, 'lease_expires_at': {'$lt': now}},
+                ],
+                'attempts': {'$lt': self.max_attempts},
+            },
+            {
+                '$set': {
+                    'state': LEASED,
+                    'lease_owner': worker_id,
+                    'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+                    'heartbeat_at': now,
+                },
+                '$inc': {'attempts': 1},
+            },
+            sort=[('available_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def heartbeat(self, task_id, worker_id):
+        """Extend a held lease; False if the lease was lost (expired and claimed elsewhere)"""
+        now = _now()
+        result = self.tasks.update_one(
+            {'_id': task_id, 'state': LEASED, 'lease_owner': worker_id},
+            {'$set': {'lease_expires_at': now + timedelta(seconds=self.lease_seconds), 'heartbeat_at': now}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, task, worker_id, next_cursor=None, events=0, event_ids=None, truncated=False):
+        """
+        Mark a task done and queue its next page (if any). The next page is
+        inserted first, so a crash in between re-runs this page rather than
+        losing the rest of the location. Tile tasks also keep the event IDs
+        found and whether results remained past max_pages, for the planner.
+
+        Returns:
+            False if the lease was lost before completion
+        """
+        now = _now()
+        if next_cursor:
+            follow_up = self._task(task['run_id'], task['category'], task['location'],
+                                   task['page'] + 1, next_cursor, task['max_pages'], now)
+            try:
+                self.tasks.insert_one(follow_up)
+            except DuplicateKeyError:
+                pass  # Queued by an earlier attempt of this page
+        update = {'state': DONE, 'finished_at': now, 'events': events}
+        if task['location'].get('tile'):
+            update.update(event_ids=list(event_ids or []), truncated=truncated)
+        result = self.tasks.update_one(
+            {'_id': task['_id'], 'lease_owner': worker_id},
+            {'$set': update, '$unset': {'lease_expires_at': '', 'error': ''}}
+        )
+        return result.matched_count == 1
+
+    def fail(self, task, worker_id, error):
+        """Release a failed task for a delayed retry, or mark it failed after max_attempts"""
+        now = _now()
+        if task.get('attempts', 0) >= self.max_attempts:
+            update = {'state': FAILED, 'finished_at': now, 'error': str(error)}
+        else:
+            update = {'state': PENDING, 'available_at': now + timedelta(seconds=self.retry_delay_seconds),
+                      'error': str(error)}
+        self.tasks.update_one(
+            {'_id': task['_id'], 'lease_owner': worker_id},
+            {'$set': update, '$unset': {'lease_expires_at': ''}}
+        )
+        return update['state']
+
+    def reap_exhausted(self):
+        """Mark failed the tasks whose last allowed lease expired (worker died on every attempt)"""
+        now = _now()
+        result = self.tasks.update_many(
+            {'state': LEASED, 'lease_expires_at': {'$lt': now}, 'attempts': {'$gte': self.max_attempts}},
+            {'$set': {'state': FAILED, 'finished_at': now, 'error': 'lease expired on final attempt'},
+             '$unset': {'lease_expires_at': ''}}
+        )
+        return result.modified_count
+
+    def latest_run_id(self):
+        task = self.tasks.find_one({}, {'run_id': 1}, sort=[('created_at', -1)])
+        return task['run_id'] if task else None
+
+    def run_status(self, run_id):
+        """Task counts per state, events scraped and failed task errors for one run"""
+        self.reap_exhausted()
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        events = 0
+        failures = []
+        for task in self.tasks.find({'run_id': run_id}, {'state': 1, 'events': 1, 'error': 1}):
+            counts[task['state']] += 1
+            events += task.get('events', 0)
+            if task['state'] == FAILED:
+                failures.append({'task': task['_id'], 'error': task.get('error')})
+        return {
+            'run_id': run_id,
+            'tasks': counts,
+            'events': events,
+            'finished': counts[PENDING] + counts[LEASED] == 0,
+            'failures': failures,
+        }
+
+    def adapt_plan(self, run_id, planner, categories=None):
+        """
+        Feed a finished run's tile results to the planner that enqueued it, in
+        plan order (as a local scrape would have recorded them), then save the
+        adapted plan. Tiles with a failed page are left out of this run.
+        """
+        results = {}
+        failed = set()
+        for task in self.tasks.find({'run_id': run_id, 'location.tile': {'$exists': True}},
+                                    {'category.slug': 1, 'location.tile': 1, 'state': 1,
+                                     'event_ids': 1, 'truncated': 1}):
+            key = (task['category']['slug'], task['location']['tile'])
+            if task['state'] != DONE:
+                failed.add(key)
+                continue
+            event_ids, truncated = results.get(key, ([], False))
+            results[key] = (event_ids + task.get('event_ids', []), truncated or task.get('truncated', False))
+        for category in (categories or EVENT_CATEGORIES):
+            for location in planner.locations(category):
+                key = (category['slug'], location['tile'])
+                if key in results and key not in failed:
+                    planner.record(category, location, *results[key])
+        return planner.finish()
+
+    def wait_for_run(self, run_id, timeout=SCRAPE_RUN_WAIT_SECONDS, poll_seconds=SCRAPE_WORKER_POLL_SECONDS):
+        """
+        Block until every task of a run is done or failed, or for at most timeout
+        seconds; returns its status (status['finished'] is False on timeout)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.run_status(run_id)
+            if status['finished']:
+                return status
+            if time.monotonic() >= deadline:
+                logger.warning(f"⚠️  Stopped waiting for scrape run {run_id} after {timeout}s "
+                               f"({status['tasks'][PENDING]} tasks pending, {status['tasks'][LEASED]} leased)")
+                return status
+            time.sleep(poll_seconds)
+
+
+class _Heartbeat:
+    """Renews a task lease in the background while the worker processes it"""
+
+    def __init__(self, queue, task_id, worker_id):
+        self.queue = queue
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='scrape-heartbeat', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.task_id, self.worker_id):
+                    self.lost = True
+                    logger.warning(f"⚠️  Lease lost for task {self.task_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Heartbeat error for task {self.task_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class ScrapeWorker:
+    """Claims tasks and scrapes them with MongoDBScraper's fetch and save path"""
+
+    def __init__(self, db=None, scraper=None, queue=None, worker_id=None,
+                 poll_seconds=SCRAPE_WORKER_POLL_SECONDS):
+        self.scraper = scraper or MongoDBScraper(db=db)
+        self.db = self.scraper.db
+        self.queue = queue or ScrapeTaskQueue(self.db)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:4]}"
+        self.poll_seconds = poll_seconds
+        self.scraper.telemetry.settings['mode'] = 'worker'
+        self.scraper.telemetry.settings['worker_id'] = self.worker_id
+        self._telemetry = {}
+        self.counts = {'tasks': 0, 'failed': 0, 'lost': 0}
+
+    def _location_telemetry(self, task):
+        key = (task['category']['slug'], task['location']['name'])
+        if key not in self._telemetry:
+            self._telemetry[key] = self.scraper.telemetry.location(*key)
+        return self._telemetry[key]
+
+    def process(self, task):
+        """
+        Scrape one task's page.
+
+        Returns:
+            (next_cursor, events, event_ids, truncated)
+        """
+        category, location = task['category'], task['location']
+        telemetry = self._location_telemetry(task)
+        logger.info(f"🌍 {category['slug']} / {location['name']} (page {task['page'] + 1})")
+        data = self.scraper._fetch_page(location, category, telemetry, task.get('cursor'))
+        entries = data.get('entries', [])
+        self.scraper._process_entries(entries, location['name'], category, telemetry)
+
+        next_cursor = data.get('next_cursor')
+        more = bool(data.get('has_more') and next_cursor)
+        last_page = task['page'] + 1 >= task['max_pages']
+        if not more or last_page:
+            next_cursor = None
+        event_ids = [entry['api_id'] for entry in entries if entry.get('api_id')]
+        return next_cursor, len(entries), event_ids, more and last_page
+
+    def run_one(self):
+        """Claim and process one task; False if none was available"""
+        task = self.queue.claim(self.worker_id)
+        if task is None:
+            return False
+
+        try:
+            with _Heartbeat(self.queue, task['_id'], self.worker_id) as heartbeat:
+                next_cursor, events, event_ids, truncated = self.process(task)
+        except Exception as e:
+            state = self.queue.fail(task, self.worker_id, e)
+            logger.error(f"❌ Task {task['_id']} failed (attempt {task['attempts']}, now {state}): {e}")
+            self.counts['failed'] += 1
+            self.scraper.stats['errors'] += 1
+            return True
+
+        if heartbeat.lost or not self.queue.complete(task, self.worker_id, next_cursor, events,
+                                                     event_ids, truncated):
+            # Another worker re-claimed it; its results are idempotent upserts as well
+            self.counts['lost'] += 1
+        else:
+            self.counts['tasks'] += 1
+        time.sleep(self.scraper.rate_delay)
+        return True
+
+    def run(self, drain=False):
+        """
+        Process tasks until interrupted, or (drain) until none are available.
+
+        Returns:
+            The worker's task counts
+        """
+        logger.info(f"👷 Scrape worker {self.worker_id} started")
+        try:
+            while True:
+                if self.run_one():
+                    continue
+                if drain:
+                    break
+                time.sleep(self.poll_seconds)
+        except KeyboardInterrupt:
+            logger.info("🛑 Scrape worker stopped")
+        finally:
+            if self._telemetry:
+                self.scraper.telemetry.finish(self.db)
+                # A later run() records a new scrape run
+                self.scraper.telemetry = ScrapeRunRecorder(settings=self.scraper.telemetry.settings)
+                self._telemetry = {}
+        logger.info(f"👷 Worker {self.worker_id} done: {self.counts['tasks']} tasks, "
+                    f"{self.counts['failed']} failed, {self.counts['lost']} leases lost")
+        return self.counts
+
+
+def _print_status(status):
+    t = status['tasks']
+    print(f"{status['run_id']}  pending={t[PENDING]} leased={t[LEASED]} done={t[DONE]} "
+          f"failed={t[FAILED]}  events={status['events']}  finished={status['finished']}")
+    for failure in status['failures']:
+        print(f"   ❌ {failure['task']}: {failure['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed scrape work queue")
+    sub = parser.add_subparsers(dest='command', required=True)
+    enqueue = sub.add_parser('enqueue', help="Queue a scrape run (coordinator)")
+    enqueue.add_argument('--wait', action='store_true', help="Wait for the run to finish, then build the snapshot")
+    enqueue.add_argument('--force', action='store_true', help="Enqueue even if a previous run is unfinished")
+    work = sub.add_parser('work', help="Claim and process tasks (worker)")
+    work.add_argument('--drain', action='store_true', help="Exit when no task is available")
+    status = sub.add_parser('status', help="Task counts for a run (default: latest)")
+    status.add_argument('run_id', nargs='?')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger('pymongo').setLevel(logging.WARNING)
+
+    db = DatabaseManager(role='scraper')
+    try:
+        db.ensure_schema()
+        queue = ScrapeTaskQueue(db)
+        if args.command == 'enqueue':
+            planner = DiscoveryPlanner(db).begin() if DISCOVERY_MODE == 'tiles' else None
+            run_id = queue.enqueue_run(force=args.force, planner=planner)
+            if not run_id:
+                return 1
+            print(run_id)
+            if args.wait:
+                status = queue.wait_for_run(run_id)
+                _print_status(status)
+                if not status['finished']:
+                    return 1
+                if planner:
+                    queue.adapt_plan(run_id, planner)
+                if SNAPSHOT_ENABLED:
+                    build_snapshot(db)
+        elif args.command == 'work':
+            ScrapeWorker(db=db, queue=queue).run(drain=args.drain)
+        else:
+            run_id = args.run_id or queue.latest_run_id()
+            if not run_id:
+                print("No scrape runs queued")
+                return 1
+            _print_status(queue.run_status(run_id))
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Scrape Run Telemetry
+Records per-run and per-(category, location) timings and outcome counts
+into the scrape_runs collection, and compares runs.
+
+CLI:
+    python scrape_telemetry.py list [N]
+    python scrape_telemetry.py show <run_id>
+    python scrape_telemetry.py compare <run_id_a> <run_id_b>
+"""
+
+import logging
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Counters kept per location and summed into the run totals
+COUNTERS = (
+    'http_calls', 'retries', 'pages', 'bytes', 'events',
+    'new', 'updated', 'unchanged', 'errors',
+    'fetch_s', 'parse_s', 'write_s'
+)
+
+
+class LocationTelemetry:
+    """Timings and counts for one (category, location) fetch"""
+
+    def __init__(self, category, location):
+        self.category = category
+        self.location = location
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+    def add(self, key, amount=1):
+        self.counts[key] += amount
+
+    def timed(self, key):
+        """Context manager adding elapsed seconds to a *_s counter"""
+        return _Timer(self, key)
+
+    def to_doc(self):
+        doc = {'category': self.category, 'location': self.location}
+        doc.update(self.counts)
+        return doc
+
+
+class _Timer:
+    __slots__ = ('target', 'key', 'started')
+
+    def __init__(self, target, key):
+        self.target = target
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.target.add(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class ScrapeRunRecorder:
+    """Collects telemetry for one scrape run and persists it when finished"""
+
+    def __init__(self, settings=None):
+        started = datetime.now(timezone.utc)
+        self.run_id = f"{started.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:6]}"
+        self.started_at = started
+        self.settings = settings or {}
+        self._started = time.perf_counter()
+        self.locations = []
+
+    def location(self, category, location):
+        """Start telemetry for a (category, location) pair"""
+        entry = LocationTelemetry(category, location)
+        self.locations.append(entry)
+        return entry
+
+    def to_doc(self):
+        totals = dict.fromkeys(COUNTERS, 0)
+        for entry in self.locations:
+            for key in COUNTERS:
+                totals[key] += entry.counts[key]
+        wall_time = time.perf_counter() - self._started
+        totals['wall_time_s'] = wall_time
+        totals['events_per_s'] = totals['events'] / wall_time if wall_time else 0
+        return {
+            'run_id': self.run_id,
+            'host': socket.gethostname(),
+            'started_at': self.started_at,
+            'finished_at': datetime.now(timezone.utc),
+            'settings': self.settings,
+            'totals': totals,
+            'locations': [entry.to_doc() for entry in self.locations],
+        }
+
+    def finish(self, db):
+        """Persist the run; telemetry failures never fail the scrape"""
+        doc = self.to_doc()
+        try:
+            db.save_scrape_run(doc)
+            logger.info(f"📈 Scrape run {self.run_id} recorded ({doc['totals']['wall_time_s']:.1f}s)")
+        except Exception as e:
+            logger.error(f"Error recording scrape run: {e}")
+        return doc
+
+
+def compare_runs(run_a, run_b):
+    """
+    Compare two scrape_runs documents.
+
+    Returns:
+        {'totals': {key: {'a', 'b', 'delta'}}, 'locations': [...]} where locations
+        are matched on (category, location) and sorted by fetch time delta (largest first)
+    """
+    def diff(a, b, keys):
+        return {k: {'a': a.get(k, 0), 'b': b.get(k, 0), 'delta': b.get(k, 0) - a.get(k, 0)} for k in keys}
+
+    total_keys = COUNTERS + ('wall_time_s', 'events_per_s')
+    by_key_a = {(l['category'], l['location']): l for l in run_a.get('locations', [])}
+    by_key_b = {(l['category'], l['location']): l for l in run_b.get('locations', [])}
+
+    locations = []
+    for key in sorted(set(by_key_a) | set(by_key_b)):
+        entry = {'category': key[0], 'location': key[1]}
+        entry.update(diff(by_key_a.get(key, {}), by_key_b.get(key, {}), COUNTERS))
+        locations.append(entry)
+    locations.sort(key=lambda l: l['fetch_s']['delta'], reverse=True)
+
+    return {
+        'run_a': run_a.get('run_id'),
+        'run_b': run_b.get('run_id'),
+        'totals': diff(run_a.get('totals', {}), run_b.get('totals', {}), total_keys),
+        'locations': locations,
+    }
+
+
+def _print_run_summary(run):
+    t = run['totals']
+    print(f"{run['run_id']}  {t['wall_time_s']:7.1f}s  {t['events']:6d} events  "
+          f"{t['events_per_s']:6.1f}/s  http={t['http_calls']}  new={t['new']}  "
+          f"updated={t['updated']}  unchanged={t['unchanged']}  errors={t['errors']}")
+
+
+def main(argv):
+    from storage import open_database
+
+    if len(argv) < 2 or argv[1] not in ('list', 'show', 'compare'):
+        print(__doc__.strip())
+        return 1
+
+    db = open_database()
+    try:
+        command = argv[1]
+        if command == 'list':
+            limit = int(argv[2]) if len(argv) > 2 else 10
+            for run in db.get_scrape_runs(limit=limit):
+                _print_run_summary(run)
+        elif command == 'show':
+            run = db.get_scrape_run(argv[2])
+            if not run:
+                print(f"Run not found: {argv[2]}")
+                return 1
+            _print_run_summary(run)
+            for l in sorted(run['locations'], key=lambda l: l['fetch_s'], reverse=True):
+                print(f"   {l['category']:8s} {l['location']:28s} fetch={l['fetch_s']:6.2f}s "
+                      f"parse={l['parse_s']:5.2f}s write={l['write_s']:5.2f}s pages={l['pages']} "
+                      f"bytes={l['bytes']} events={l['events']} errors={l['errors']}")
+        else:
+            run_a, run_b = db.get_scrape_run(argv[2]), db.get_scrape_run(argv[3])
+            if not run_a or not run_b:
+                print("Run not found")
+                return 1
+            result = compare_runs(run_a, run_b)
+            print(f"Comparing {result['run_a']} -> {result['run_b']}")
+            for key, values in result['totals'].items():
+                print(f"   {key:14s} {values['a']:>12.2f} -> {values['b']:>12.2f}  ({values['delta']:+.2f})")
+            print("\nLocations by fetch time change:")
+            for l in result['locations']:
+                print(f"   {l['category']:8s} {l['location']:28s} fetch {l['fetch_s']['a']:6.2f}s -> "
+                      f"{l['fetch_s']['b']:6.2f}s ({l['fetch_s']['delta']:+.2f})")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    sys.exit(main(sys.argv))
@@ -8,7 +8,11 @@ import time
 import logging
 from datetime import datetime, timezone
 from dateutil import parser as dateparser
-from database import DatabaseManager
+from storage import open_database
+from snapshot import build_snapshot
+from scrape_telemetry import ScrapeRunRecorder
+from discovery_planner import DiscoveryPlanner
+from event_queries import derived_text_fields
 from config import *
 
 logging.basicConfig(
@@ -20,9 +24,34 @@ logger = logging.getLogger(__name__)
 # Reduce MongoDB logging verbosity
 logging.getLogger('pymongo').setLevel(logging.WARNING)
 
+# HTTP statuses worth retrying (rate limiting and transient upstream errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 class MongoDBScraper:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, db=None, categories=None, locations=None, page_size=SCRAPE_PAGE_SIZE,
+                 max_pages=SCRAPE_MAX_PAGES, rate_delay=API_RATE_DELAY, base_api_url=BASE_API_URL,
+                 planner=None):
+        """
+        Args:
+            db: Storage to write to (default: open_database(), per STORAGE_BACKEND)
+            categories, locations: Override EVENT_CATEGORIES / SCRAPING_LOCATIONS
+            planner: DiscoveryPlanner choosing the locations per category (default: one
+                when DISCOVERY_MODE is 'tiles' and no locations are given)
+            page_size: Events requested per page
+            max_pages: Pages followed per (category, location)
+            rate_delay: Seconds to sleep between requests
+            base_api_url: Luma API base URL (a local stand-in for benchmarks)
+        """
+        self.db = db or open_database(role='scraper')
+        self.categories = categories or EVENT_CATEGORIES
+        self.locations = locations or SCRAPING_LOCATIONS
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.rate_delay = rate_delay
+        self.base_api_url = base_api_url
+        if planner is None and DISCOVERY_MODE == 'tiles' and locations is None:
+            planner = DiscoveryPlanner(self.db)
+        self.planner = planner
         self.session = requests.Session()
         self.session.headers.update(API_HEADERS)
         self.stats = {
@@ -30,26 +59,47 @@ class MongoDBScraper:
             'events_saved': 0,
             'errors': 0
         }
+        self.telemetry = ScrapeRunRecorder(settings={
+            'categories': len(self.categories),
+            'locations': None if planner else len(self.locations),
+            'page_size': page_size,
+            'max_pages': max_pages,
+            'rate_delay': rate_delay,
+            'discovery': 'tiles' if planner else 'locations',
+        })
     
     def scrape_all_events(self):
         """Scrape events from all categories and locations"""
         logger.info("🚀 Starting event scraping...")
-        logger.info(f"📂 Categories: {len(EVENT_CATEGORIES)}")
-        logger.info(f"📍 Locations: {len(SCRAPING_LOCATIONS)}")
+        logger.info(f"📂 Categories: {len(self.categories)}")
+        if self.planner:
+            self.planner.begin()
+            logger.info(f"🗺️  Locations: discovery tiles (plan run {self.planner.run})")
+        else:
+            logger.info(f"📍 Locations: {len(self.locations)}")
         
-        for category in EVENT_CATEGORIES:
+        for category in self.categories:
             logger.info(f"\n{'='*60}")
             logger.info(f"📂 Category: {category['name']} (slug: {category['slug']})")
             logger.info(f"{'='*60}")
             
-            for idx, location in enumerate(SCRAPING_LOCATIONS, 1):
+            locations = self.planner.locations(category) if self.planner else self.locations
+            for idx, location in enumerate(locations, 1):
+                telemetry = self.telemetry.location(category['slug'], location['name'])
                 try:
-                    logger.info(f"[{idx}/{len(SCRAPING_LOCATIONS)}] 🌍 {location['name']}")
-                    self._scrape_location(location, category)
-                    time.sleep(API_RATE_DELAY)
+                    logger.info(f"[{idx}/{len(locations)}] 🌍 {location['name']}")
+                    event_ids, truncated = self._scrape_location(location, category, telemetry)
+                    if self.planner:
+                        self.planner.record(category, location, event_ids, truncated)
+                    time.sleep(self.rate_delay)
                 except Exception as e:
                     logger.error(f"❌ Error scraping {location['name']}: {e}")
                     self.stats['errors'] += 1
+                    telemetry.add('errors')
+        
+        if self.planner:
+            self.planner.finish()
+        self.telemetry.finish(self.db)
         
         logger.info(f"""
 ╔══════════════════════════════════════════════════════════╗
@@ -64,61 +114,137 @@ class MongoDBScraper:
         
         return self.stats
     
-    def _scrape_location(self, location, category):
-        """Scrape events for a specific location and category"""
-        try:
-            response = self.session.get(
-                f"{BASE_API_URL}/discover/get-paginated-events",
-                params={
-                    "latitude": location["lat"],
-                    "longitude": location["lng"],
-                    "pagination_limit": 100,
-                    "slug": category["slug"]
-                }
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            entries = data.get("entries", [])
+    def _fetch_page(self, location, category, telemetry, cursor=None):
+        """
+        Fetch one page of discovery results, retrying 429/5xx responses.
+        
+        Returns:
+            Parsed JSON response ({'entries': [...], 'has_more': bool, 'next_cursor': str})
+        """
+        params = {
+            "latitude": location["lat"],
+            "longitude": location["lng"],
+            "pagination_limit": self.page_size,
+            "slug": category["slug"]
+        }
+        if cursor:
+            params["pagination_cursor"] = cursor
+        
+        with telemetry.timed('fetch_s'):
+            for attempt in range(SCRAPE_MAX_RETRIES + 1):
+                response = self.session.get(
+                    f"{self.base_api_url}/discover/get-paginated-events",
+                    params=params
+                )
+                telemetry.add('http_calls')
+                if response.status_code not in RETRY_STATUSES or attempt == SCRAPE_MAX_RETRIES:
+                    break
+                
+                telemetry.add('retries')
+                retry_after = response.headers.get('Retry-After')
+                try:
+                    # Clamped, so a huge (or negative) Retry-After can't stall the scrape
+                    delay = max(0.0, min(SCRAPE_RETRY_MAX_DELAY_SECONDS, float(retry_after)))
+                except (TypeError, ValueError):
+                    delay = SCRAPE_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                logger.warning(f"   ⏳ HTTP {response.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
             
-            logger.info(f"   📊 Found {len(entries)} events")
+            response.raise_for_status()
+            telemetry.add('pages')
+            telemetry.add('bytes', len(response.content))
+            return response.json()
+    
+    def _scrape_location(self, location, category, telemetry):
+        """
+        Scrape events for a specific location and category, following up to max_pages pages.
+        Parsed events are written in batches of SCRAPE_WRITE_BATCH_SIZE, and whatever
+        was parsed is still written if a later page fails.
+        
+        Returns:
+            (event IDs found, True if more pages remained than max_pages allowed)
+        """
+        pending = {}
+        event_ids = []
+        truncated = False
+        try:
+            cursor = None
+            for page in range(self.max_pages):
+                if page:
+                    time.sleep(self.rate_delay)
+                data = self._fetch_page(location, category, telemetry, cursor)
+                entries = data.get("entries", [])
+                
+                logger.info(f"   📊 Found {len(entries)} events")
+                
+                for entry in entries:
+                    if entry.get("api_id"):
+                        event_ids.append(entry["api_id"])
+                    parsed_event = self._parse_entry(entry, location["name"], category, telemetry)
+                    if parsed_event:
+                        # An event on two pages is written once (latest copy)
+                        pending[parsed_event['external_id']] = parsed_event
+                if len(pending) >= SCRAPE_WRITE_BATCH_SIZE:
+                    self._write_events(list(pending.values()), telemetry)
+                    pending.clear()
+                
+                cursor = data.get("next_cursor")
+                truncated = bool(data.get("has_more") and cursor)
+                if not truncated:
+                    break
             
-            for entry in entries:
-                self._process_event(entry, location["name"], category)
+            return event_ids, truncated
                 
         except Exception as e:
             logger.error(f"Error fetching events for {location['name']}: {e}")
             raise
+        finally:
+            self._write_events(list(pending.values()), telemetry)
     
-    def _process_event(self, entry, location_name, category):
-        """Process and save a single event"""
+    def _process_entries(self, entries, location_name, category, telemetry):
+        """Parse and save one page of entries in a single batch"""
+        parsed = {}
+        for entry in entries:
+            parsed_event = self._parse_entry(entry, location_name, category, telemetry)
+            if parsed_event:
+                parsed[parsed_event['external_id']] = parsed_event
+        self._write_events(list(parsed.values()), telemetry)
+    
+    def _parse_entry(self, entry, location_name, category, telemetry):
+        """Parse a single discovery entry; None if it has no id or fails to parse"""
         try:
-            event_data = entry.get("event", {})
-            event_id = entry.get("api_id")
-            
-            if not event_id:
-                return
+            if not entry.get("api_id"):
+                return None
             
-            # Parse event data
-            parsed_event = self._parse_event_data(entry, location_name, category)
+            with telemetry.timed('parse_s'):
+                return self._parse_event_data(entry, location_name, category)
             
-            if not parsed_event:
-                return
+        except Exception as e:
+            logger.error(f"Error processing event: {e}")
+            self.stats['errors'] += 1
+            telemetry.add('errors')
+            return None
+    
+    def _write_events(self, events, telemetry):
+        """Upsert parsed events in bulk batches; the content hashes tell new/updated/unchanged"""
+        for start in range(0, len(events), SCRAPE_WRITE_BATCH_SIZE):
+            batch = events[start:start + SCRAPE_WRITE_BATCH_SIZE]
+            with telemetry.timed('write_s'):
+                outcomes = self.db.upsert_events(batch)
             
-            # Check if event already exists
-            existing_event = self.db.get_event_by_id(event_id)
+            if outcomes is None:
+                self.stats['errors'] += len(batch)
+                telemetry.add('errors', len(batch))
+                continue
             
-            # Save event to database
-            if self.db.save_event(parsed_event):
-                if not existing_event:
+            for parsed_event, outcome in zip(batch, outcomes):
+                telemetry.add(outcome)
+                if outcome == 'new':
                     self.stats['events_saved'] += 1
-                    logger.info(f"   ✅ Saved: {parsed_event['title'][:50]}")
-            
-            self.stats['events_scraped'] += 1
+                    logger.info(f"   ✅ Saved: {(parsed_event['title'] or '')[:50]}")
             
-        except Exception as e:
-            logger.error(f"Error processing event: {e}")
-            self.stats['errors'] += 1
+            self.stats['events_scraped'] += len(batch)
+            telemetry.add('events', len(batch))
     
     def _parse_event_data(self, entry, location_name, category):
         """Parse event data from API response"""
@@ -170,7 +296,7 @@ class MongoDBScraper:
             start_iso = self._normalize_datetime(entry.get("start_at"))
             end_iso = self._normalize_datetime(entry.get("end_at"))
             
-            return {
+            event = {
                 "external_id": event_id,
                 "event_slug": slug or None,
                 "title": event_data.get("name"),
@@ -190,6 +316,9 @@ class MongoDBScraper:
                 "scraped_at": datetime.now(timezone.utc).isoformat(),
                 "source": f"api-{category['slug']}"
             }
+            # Excerpt, search tokens and word count, computed once here instead of per read
+            event.update(derived_text_fields(event))
+            return event
             
         except Exception as e:
             logger.error(f"Error parsing event data: {e}")
@@ -211,7 +340,11 @@ def main():
     """Main scraping function"""
     scraper = MongoDBScraper()
     try:
+        # One find_one on normal runs; creates indexes on a fresh database
+        scraper.db.ensure_schema()
         stats = scraper.scrape_all_events()
+        if SNAPSHOT_ENABLED:
+            build_snapshot(scraper.db)
         return stats
     except Exception as e:
         logger.error(f"Scraping failed: {e}")
@@ -0,0 +1,77 @@
+"""
+JSON Serialization for API Responses
+Pluggable encoder: uses orjson when available, falls back to the stdlib encoder.
+Mongo-native types (ObjectId, datetime) are serialized directly, so documents
+can be returned as they come out of PyMongo.
+"""
+
+import json
+import logging
+from datetime import datetime, date
+from bson import ObjectId
+from flask.json.provider import JSONProvider
+from config import JSON_SERIALIZER
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default(obj):
+    """Encode types the JSON backends don't know about"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_dumps(obj):
+    # orjson encodes datetime natively; ObjectId goes through _default
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _select_backend(name):
+    """Pick the encoder backend ('auto', 'orjson' or 'stdlib')"""
+    if name in ('auto', 'orjson') and orjson is not None:
+        return 'orjson', _orjson_dumps, orjson.loads
+    if name == 'orjson':
+        logger.warning("⚠️  JSON_SERIALIZER=orjson but orjson is not installed, using stdlib json")
+    return 'stdlib', _stdlib_dumps, json.loads
+
+
+BACKEND, _dumps, _loads = _select_backend(JSON_SERIALIZER)
+
+
+def dumps(obj):
+    """Serialize obj to UTF-8 encoded JSON bytes"""
+    return _dumps(obj)
+
+
+def loads(data):
+    """Deserialize JSON from str or bytes"""
+    return _loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps()/loads() above, used by jsonify"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of the default implementation
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
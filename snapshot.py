@@ -0,0 +1,173 @@
+"""
+Static Snapshot Exporter
+Writes versioned, sharded, precompressed JSON listings (per status,
+category and location) plus a manifest, so read-only listing pages can
+be served as static files without touching MongoDB.
+
+Layout:
+    SNAPSHOT_DIR/manifest.json
+    SNAPSHOT_DIR/<version>/<group>/<key>/<shard>.json[.gz|.br]
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+from datetime import datetime, timezone, timedelta
+from compression import compress, SUPPORTED_ENCODINGS
+from event_queries import internal_listing_event_data, event_status
+from serialization import dumps
+from config import (
+    SNAPSHOT_DIR, SNAPSHOT_SHARD_SIZE, SNAPSHOT_KEEP_VERSIONS, EVENT_CATEGORIES,
+    CHANGES_SAFETY_WINDOW_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+# File suffix for each precompressed encoding
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def slugify(value):
+    """Filesystem/URL-safe key for a location or category name"""
+    return re.sub(r'[^a-z0-9]+', '-', (value or '').lower()).strip('-') or 'unknown'
+
+
+def _group_events(events, now_iso):
+    """Bucket events into listing groups: all, status/<s>, category/<slug>, location/<slug>"""
+    groups = {'all': []}
+    for event in events:
+        keys = ['all', f"status/{event_status(event, now_iso)}"]
+
+        tags = [t.strip() for t in (event.get('category_tags') or '').split(',')]
+        for category in EVENT_CATEGORIES:
+            if category['slug'] in tags:
+                keys.append(f"category/{category['slug']}")
+
+        if event.get('discovery_location'):
+            keys.append(f"location/{slugify(event['discovery_location'])}")
+
+        for key in keys:
+            groups.setdefault(key, []).append(event)
+    return groups
+
+
+def _write_shard(path, events):
+    """Write one shard and its precompressed variants; returns manifest info"""
+    body = dumps({'success': True, 'events': events, 'count': len(events)})
+    with open(path, 'wb') as f:
+        f.write(body)
+    for encoding in SUPPORTED_ENCODINGS:
+        with open(path + ENCODING_SUFFIXES[encoding], 'wb') as f:
+            f.write(compress(body, encoding, best=True))
+    return {
+        'count': len(events),
+        'bytes': len(body),
+        'sha256': hashlib.sha256(body).hexdigest(),
+    }
+
+
+def _prune_versions(root, keep):
+    """Remove all but the newest `keep` snapshot versions"""
+    versions = sorted(
+        d for d in os.listdir(root)
+        if os.path.isdir(os.path.join(root, d))
+    )
+    for version in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def build_snapshot(db, root=SNAPSHOT_DIR, shard_size=SNAPSHOT_SHARD_SIZE):
+    """
+    Export all events to a new snapshot version and publish its manifest.
+
+    The version directory is fully written before the manifest is atomically
+    replaced, so readers never see a partial snapshot.
+
+    Args:
+        db: Storage to read events from
+        root: Snapshot directory
+        shard_size: Events per shard file
+
+    Returns:
+        The manifest dict, or None on failure
+    """
+    try:
+        now = datetime.now(timezone.utc)
+        version = now.strftime('%Y%m%dT%H%M%SZ')
+        version_dir = os.path.join(root, version)
+        os.makedirs(version_dir, exist_ok=True)
+
+        # Same order as the listing endpoints (date_time descending)
+        events = [internal_listing_event_data(e) for e in db.get_all_events()]
+        groups = _group_events(events, now.isoformat())
+
+        manifest = {
+            'version': version,
+            'generated_at': now.isoformat(),
+            # /api/events/changes?since= token: clients apply writes made after this
+            # build (list-event submissions, cleanup) on top of the shards
+            'changes_token': str(int((now - timedelta(seconds=CHANGES_SAFETY_WINDOW_SECONDS)).timestamp() * 1000)),
+            'total_events': len(events),
+            'encodings': SUPPORTED_ENCODINGS,
+            'groups': {},
+        }
+        for key, group_events in sorted(groups.items()):
+            group_dir = os.path.join(version_dir, *key.split('/'))
+            os.makedirs(group_dir, exist_ok=True)
+            shards = []
+            for index, start in enumerate(range(0, max(len(group_events), 1), shard_size)):
+                name = f"{index:04d}.json"
+                info = _write_shard(os.path.join(group_dir, name), group_events[start:start + shard_size])
+                info['path'] = f"{version}/{key}/{name}"
+                shards.append(info)
+            manifest['groups'][key] = {'count': len(group_events), 'shards': shards}
+
+        manifest_tmp = os.path.join(root, MANIFEST_NAME + '.tmp')
+        with open(manifest_tmp, 'wb') as f:
+            f.write(dumps(manifest))
+        os.replace(manifest_tmp, os.path.join(root, MANIFEST_NAME))
+
+        _prune_versions(root, SNAPSHOT_KEEP_VERSIONS)
+
+        logger.info(f"📦 Snapshot {version}: {len(events)} events, {len(groups)} groups")
+        return manifest
+    except Exception as e:
+        logger.error(f"❌ Snapshot export failed: {e}")
+        return None
+
+
+def snapshot_file(root, relative_path, encoding=None):
+    """
+    Resolve a shard path inside the snapshot directory.
+
+    Args:
+        root: Snapshot directory
+        relative_path: '<version>/<group>/<key>/<shard>.json' from the manifest
+        encoding: Preferred precompressed variant ('br', 'gzip' or None)
+
+    Returns:
+        (absolute_path, encoding_used) or (None, None) if not found
+    """
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if not path.startswith(root + os.sep) or not path.endswith('.json'):
+        return None, None
+    if encoding and os.path.isfile(path + ENCODING_SUFFIXES[encoding]):
+        return path + ENCODING_SUFFIXES[encoding], encoding
+    if os.path.isfile(path):
+        return path, None
+    return None, None
+
+
+if __name__ == '__main__':
+    from storage import open_database
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    db = open_database()
+    try:
+        build_snapshot(db)
+    finally:
+        db.close()
@@ -0,0 +1,751 @@
+"""
+SQLite Database Manager
+Embedded storage backend (STORAGE_BACKEND=sqlite): the same operations and
+upsert semantics as DatabaseManager, in one local database file.
+
+    - events keep their full document as JSON, plus the queried fields as
+      indexed columns (date_time, end_time, updated_at, expire_at, ...)
+    - title/description are indexed with FTS5 (porter stemming), which serves
+      the $text search filter
+    - build_event_filters output is translated to SQL (see _where); venue
+      $regex uses a Python REGEXP function
+    - expire_at is enforced by a purge on access instead of a TTL index, and
+      tombstones older than TOMBSTONE_RETENTION_DAYS are purged with it
+    - the event feed (SSE stream) is a table with an increasing seq, written in
+      the same transaction as the change it announces and trimmed to
+      EVENT_FEED_MAX_ENTRIES rows
+
+Connections are per thread (and per process, so forked workers open their own),
+in WAL mode so API reads never wait for scraper writes.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from storage import EventStorage
+from database import (
+    SCHEMA_VERSION, IMAGE_CHECK_FIELDS, content_hash, compute_expire_at, feed_upserts, feed_deletes,
+    stats_queries, format_stats, backfill_fields, user_event_outcomes
+)
+from config import (
+    SQLITE_PATH, TOMBSTONE_RETENTION_DAYS, CLEANUP_GRACE_DAYS, CLEANUP_BATCH_SIZE,
+    CLEANUP_BATCH_PAUSE_SECONDS, EVENT_FEED_ENABLED, EVENT_FEED_MAX_ENTRIES, EVENT_FEED_POLL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Event fields stored as columns (filterable and sortable); everything is also in doc
+EVENT_COLUMNS = (
+    'external_id', 'title', 'description', 'date_time', 'end_time', 'venue', 'scraped_at',
+    'source', 'image_url', 'image_status', 'image_checked_at', 'updated_at', 'expire_at',
+    'content_hash'
+)
+DATETIME_COLUMNS = frozenset(['image_checked_at', 'updated_at', 'expire_at'])
+# $in/$nin lists longer than this are bound as one JSON array (see _condition)
+IN_MAX_PARAMS = 500
+# How often reads purge events past expire_at (MongoDB's TTL monitor runs every 60s)
+PURGE_INTERVAL_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    external_id TEXT PRIMARY KEY,
+    title TEXT, description TEXT, date_time TEXT, end_time TEXT, venue TEXT,
+    scraped_at TEXT, source TEXT, image_url TEXT, image_status TEXT, image_checked_at TEXT,
+    updated_at TEXT, expire_at TEXT, content_hash TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_date_time ON events (date_time DESC);
+CREATE INDEX IF NOT EXISTS events_end_time ON events (end_time);
+CREATE INDEX IF NOT EXISTS events_scraped_at ON events (scraped_at);
+CREATE INDEX IF NOT EXISTS events_updated_at ON events (updated_at);
+CREATE INDEX IF NOT EXISTS events_expire_at ON events (expire_at);
+CREATE INDEX IF NOT EXISTS events_image_checked_at ON events (image_checked_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    title, description, content='events', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, description ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, title, description)
+    VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO events_fts (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+
+CREATE TABLE IF NOT EXISTS tombstones (external_id TEXT NOT NULL, deleted_at TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS tombstones_deleted_at ON tombstones (deleted_at);
+
+CREATE TABLE IF NOT EXISTS user_listed (external_id TEXT PRIMARY KEY, listed_at TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS user_listed_listed_at ON user_listed (listed_at DESC);
+
+CREATE TABLE IF NOT EXISTS scrape_runs (run_id TEXT PRIMARY KEY, started_at TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS scrape_runs_started_at ON scrape_runs (started_at DESC);
+
+CREATE TABLE IF NOT EXISTS event_feed (seq INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL);
+
+CREATE TABLE IF NOT EXISTS schema_meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _iso(value):
+    """Sortable UTC text for a datetime column (naive datetimes are UTC, like BSON dates)"""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {'$date': _iso(value)}
+    return str(value)
+
+
+def _json_hook(obj):
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.fromisoformat(obj['$date'])
+    return obj
+
+
+def _dumps(doc):
+    return json.dumps(doc, default=_json_default, separators=(',', ':'))
+
+
+def _loads(text):
+    return json.loads(text, object_hook=_json_hook)
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern):
+    return re.compile(pattern)
+
+
+def _regexp(pattern, value):
+    return isinstance(value, str) and _compile(pattern).search(value) is not None
+
+
+def _fts_query(search):
+    """FTS5 MATCH expression with $text semantics: any term matches, "-term" excludes"""
+    def quote(word):
+        return '"' + word.replace('"', '""') + '"'
+
+    words = search.split()
+    include = [quote(w) for w in words if not w.startswith('-')]
+    exclude = [quote(w[1:]) for w in words if w.startswith('-') and len(w) > 1]
+    if not include:
+        return None
+    query = ' OR '.join(include)
+    if exclude:
+        query = f"({query}) NOT ({' OR '.join(exclude)})"
+    return query
+
+
+def _condition(field, spec, params):
+    """SQL for one field's MongoDB-style condition"""
+    if field not in EVENT_COLUMNS:
+        raise ValueError(f"Unsupported filter field: {field}")
+    if not isinstance(spec, dict):
+        spec = {'$eq': spec}
+
+    clauses = []
+    for op, value in spec.items():
+        if op == '$options':
+            continue
+        if field in DATETIME_COLUMNS:
+            value = [_iso(v) for v in value] if isinstance(value, list) else _iso(value)
+        if op in ('$eq', '$ne') and value is None:
+            clauses.append(f"{field} IS {'NOT ' if op == '$ne' else ''}NULL")
+        elif op in ('$eq', '$ne', '$gt', '$gte', '$lt', '$lte'):
+            sql_op = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}[op]
+            clauses.append(f"{field} {sql_op} ?")
+            params.append(value)
+        elif op == '$exists':
+            clauses.append(f"{field} IS {'NOT ' if value else ''}NULL")
+        elif op in ('$in', '$nin'):
+            values = [v for v in value if v is not None]
+            has_null = len(values) != len(value)
+            if len(values) > IN_MAX_PARAMS:
+                # One JSON array parameter instead of one per value, so long lists
+                # (time-window IDs) stay under SQLite's bound-parameter limit
+                placeholders = 'SELECT value FROM json_each(?)'
+                params.append(json.dumps(values))
+            else:
+                placeholders = ', '.join('?' * len(values))
+                params.extend(values)
+            if op == '$in':
+                parts = [f"{field} IN ({placeholders})"] if values else []
+                if has_null:
+                    parts.append(f"{field} IS NULL")
+                clauses.append('(' + ' OR '.join(parts) + ')' if parts else '0')
+            else:
+                parts = [f"{field} NOT IN ({placeholders})"] if values else []
+                if has_null:
+                    parts.append(f"{field} IS NOT NULL")
+                clauses.append('(' + ' AND '.join(parts) + ')' if parts else '1')
+        elif op == '$regex':
+            flags = spec.get('$options', '')
+            prefix = '(?i)' if 'i' in flags else ''
+            clauses.append(f"{field} REGEXP ?")
+            params.append(prefix + value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return ' AND '.join(clauses) or '1'
+
+
+def _where(filters, params):
+    """SQL WHERE expression for a MongoDB-style filter dict (the subset the app builds)"""
+    clauses = []
+    for key, value in (filters or {}).items():
+        if key == '$text':
+            query = _fts_query(value.get('$search', ''))
+            if query is None:
+                clauses.append('0')
+            else:
+                clauses.append("rowid IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)")
+                params.append(query)
+        elif key in ('$and', '$or'):
+            parts = [f"({_where(sub, params)})" for sub in value]
+            clauses.append((' AND ' if key == '$and' else ' OR ').join(parts) or '1')
+        else:
+            clauses.append(_condition(key, value, params))
+    return ' AND '.join(clauses) or '1'
+
+
+class SQLiteDatabaseManager(EventStorage):
+    backend = 'sqlite'
+
+    def __init__(self, path=None):
+        """
+        Set up the manager; the file is opened on first use.
+
+        Args:
+            path: Database file (default: SQLITE_PATH); ':memory:' is per connection,
+                  so use a file for anything multi-threaded
+        """
+        self.path = path or SQLITE_PATH
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    @property
+    def conn(self):
+        """This thread's connection (autocommit; batches use explicit transactions)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.create_function('REGEXP', 2, _regexp, deterministic=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    # Schema
+
+    def schema_version(self):
+        try:
+            row = self.conn.execute("SELECT value FROM schema_meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        return int(row['value']) if row else 0
+
+    def ensure_schema(self, force=False):
+        """Create tables and indexes once per SCHEMA_VERSION (all statements are idempotent)"""
+        if not force and self.schema_version() >= SCHEMA_VERSION:
+            return False
+        self.conn.executescript(SCHEMA)
+        self._backfill_events()
+        self.conn.execute(
+            "INSERT INTO schema_meta (key, value) VALUES ('version', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (str(SCHEMA_VERSION),)
+        )
+        logger.info(f"✅ SQLite schema migrated to version {SCHEMA_VERSION} ({self.path})")
+        return True
+
+    def _backfill_events(self):
+        """Bring stored events up to the current schema (see backfill_fields); updated_at is kept"""
+        updated = 0
+        with self._transaction() as conn:
+            for row in conn.execute("SELECT doc FROM events").fetchall():
+                doc = _loads(row['doc'])
+                fields = backfill_fields(doc)
+                if fields:
+                    doc.update(fields)
+                    self._write_event(conn, doc)
+                    updated += 1
+        logger.info(f"✅ Backfilled {updated} events")
+
+    def is_ready(self):
+        try:
+            return self.schema_version() >= SCHEMA_VERSION
+        except Exception as e:
+            logger.error(f"Readiness check failed: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # Owned by a thread that already exited
+        self._local = threading.local()
+
+    # Writes
+
+    def _purge_expired(self, force=False):
+        """Delete events past expire_at (no tombstone, like the TTL index) and old tombstones"""
+        now = time.monotonic()
+        if not force and now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        utc_now = datetime.now(timezone.utc)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM events WHERE expire_at < ?", (_iso(utc_now),))
+            conn.execute(
+                "DELETE FROM tombstones WHERE deleted_at < ?",
+                (_iso(utc_now - timedelta(days=TOMBSTONE_RETENTION_DAYS)),)
+            )
+
+    def _write_event(self, conn, doc):
+        columns = {name: doc.get(name) for name in EVENT_COLUMNS}
+        for name in DATETIME_COLUMNS:
+            columns[name] = _iso(columns[name])
+        for name, value in columns.items():
+            if value is not None and not isinstance(value, (str, int, float)):
+                columns[name] = str(value)
+        columns['doc'] = _dumps(doc)
+        names = ', '.join(columns)
+        updates = ', '.join(f"{name} = excluded.{name}" for name in columns if name != 'external_id')
+        conn.execute(
+            f"INSERT INTO events ({names}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (external_id) DO UPDATE SET {updates}",
+            list(columns.values())
+        )
+
+    def _upsert(self, conn, event_data):
+        """The build_event_upsert semantics: merge fields, move updated_at only on content change"""
+        digest = content_hash(event_data)
+        row = conn.execute(
+            "SELECT content_hash, doc FROM events WHERE external_id = ?", (event_data['external_id'],)
+        ).fetchone()
+
+        doc = _loads(row['doc']) if row else {}
+        if doc.get('image_url') != event_data.get('image_url'):
+            # A new image_url invalidates the previous health check
+            for field in IMAGE_CHECK_FIELDS:
+                doc.pop(field, None)
+        unchanged = row is not None and row['content_hash'] == digest
+        doc.update({k: v for k, v in event_data.items() if k != '_id'})
+        doc['content_hash'] = digest
+        doc['expire_at'] = compute_expire_at(event_data.get('end_time'))
+        doc['updated_at'] = doc.get('updated_at') if unchanged else datetime.now(timezone.utc)
+        self._write_event(conn, doc)
+
+        if row is None:
+            return 'new'
+        return 'unchanged' if unchanged else 'updated'
+
+    def upsert_event(self, event_data):
+        try:
+            with self._transaction() as conn:
+                outcome = self._upsert(conn, event_data)
+                if outcome != 'unchanged':
+                    self._append_feed(conn, feed_upserts([event_data], 'scraper'))
+                return outcome
+        except Exception as e:
+            logger.error(f"Error saving event {event_data.get('external_id')}: {e}")
+            return None
+
+    def upsert_events(self, events):
+        """Upsert many events in one transaction; outcomes in input order"""
+        if not events:
+            return []
+        try:
+            with self._transaction() as conn:
+                outcomes = [self._upsert(conn, event) for event in events]
+                self._append_feed(conn, feed_upserts(
+                    [event for event, outcome in zip(events, outcomes) if outcome != 'unchanged'], 'scraper'
+                ))
+                return outcomes
+        except Exception as e:
+            logger.error(f"Error saving {len(events)} events: {e}")
+            return None
+
+    def save_events(self, events):
+        """Upsert many events in one transaction"""
+        if not events:
+            return True
+        try:
+            with self._transaction() as conn:
+                for event in events:
+                    self._upsert(conn, event)
+                self._append_feed(conn, feed_upserts(events, 'scraper'))
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {len(events)} events: {e}")
+            return False
+
+    # Event feed
+
+    def _append_feed(self, conn, entries):
+        if not EVENT_FEED_ENABLED or not entries:
+            return
+        now = datetime.now(timezone.utc)
+        conn.executemany("INSERT INTO event_feed (doc) VALUES (?)",
+                         [(_dumps(dict(entry, at=now)),) for entry in entries])
+        conn.execute("DELETE FROM event_feed WHERE seq <= (SELECT MAX(seq) FROM event_feed) - ?",
+                     (EVENT_FEED_MAX_ENTRIES,))
+
+    def append_feed(self, entries):
+        try:
+            with self._transaction() as conn:
+                self._append_feed(conn, entries)
+        except Exception as e:
+            logger.error(f"Error appending {len(entries)} entries to the event feed: {e}")
+
+    def _feed_rows(self, rows):
+        entries = []
+        for row in rows:
+            entry = _loads(row['doc'])
+            entry['id'] = str(row['seq'])
+            entries.append(entry)
+        return entries
+
+    def tail_feed(self, stop, backlog=0, poll_seconds=EVENT_FEED_POLL_SECONDS):
+        """Follow the event feed by polling seq (see DatabaseManager.tail_feed)"""
+        last_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM event_feed").fetchone()[0]
+        yield self._feed_rows(self.conn.execute(
+            "SELECT seq, doc FROM event_feed WHERE seq > ? ORDER BY seq", (last_seq - backlog,)
+        )) if backlog else []
+        while not stop.wait(poll_seconds):
+            rows = self.conn.execute(
+                "SELECT seq, doc FROM event_feed WHERE seq > ? ORDER BY seq LIMIT 500", (last_seq,)
+            ).fetchall()
+            if rows:
+                last_seq = rows[-1]['seq']
+                yield self._feed_rows(rows)
+
+    # Reads
+
+    def _docs(self, rows):
+        return [_loads(row['doc']) for row in rows]
+
+    def get_all_events(self, filters=None, limit=None, skip=0):
+        try:
+            self._purge_expired()
+            params = []
+            sql = f"SELECT doc FROM events WHERE {_where(filters, params)} ORDER BY date_time DESC"
+            if limit or skip:
+                sql += " LIMIT ? OFFSET ?"
+                params.extend([limit if limit else -1, skip or 0])
+            return self._docs(self.conn.execute(sql, params))
+        except Exception as e:
+            logger.error(f"Error retrieving events: {e}")
+            return []
+
+    def count_events(self, filters=None):
+        try:
+            params = []
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM events WHERE {_where(filters, params)}", params
+            ).fetchone()[0]
+        except Exception as e:
+            logger.error(f"Error counting events: {e}")
+            return 0
+
+    def get_event_by_id(self, external_id):
+        try:
+            row = self.conn.execute("SELECT doc FROM events WHERE external_id = ?", (external_id,)).fetchone()
+            return _loads(row['doc']) if row else None
+        except Exception as e:
+            logger.error(f"Error retrieving event {external_id}: {e}")
+            return None
+
+    def get_events_by_ids(self, external_ids, projection=None):
+        if not external_ids:
+            return {}
+        try:
+            ids = list(external_ids)
+            found = {}
+            # Stay under SQLite's bound-parameter limit
+            for offset in range(0, len(ids), 500):
+                chunk = ids[offset:offset + 500]
+                rows = self.conn.execute(
+                    f"SELECT doc FROM events WHERE external_id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                for doc in self._docs(rows):
+                    if projection:
+                        doc = {k: v for k, v in doc.items() if projection.get(k)}
+                    found[doc.get('external_id')] = doc
+            return found
+        except Exception as e:
+            logger.error(f"Error retrieving {len(external_ids)} events by id: {e}")
+            return {}
+
+    def iter_events(self, fields=None):
+        for row in self.conn.execute("SELECT doc FROM events"):
+            doc = _loads(row['doc'])
+            yield {k: doc.get(k) for k in fields} if fields else doc
+
+    def get_changes(self, since, limit=500, after_id=None):
+        # Stored updated_at has microseconds; pages are ordered by its millisecond
+        # (the ISO prefix) then external_id, like BSON dates (see changes_query)
+        where, params = "updated_at >= ?", [_iso(since)]
+        if after_id:
+            bucket_end = _iso(since + timedelta(milliseconds=1))
+            where = "(updated_at >= ? OR (updated_at >= ? AND updated_at < ? AND external_id > ?))"
+            params = [bucket_end, _iso(since), bucket_end, after_id]
+        upserts = self._docs(self.conn.execute(
+            f"SELECT doc FROM events WHERE {where} "
+            "ORDER BY substr(updated_at, 1, 23), external_id LIMIT ?",
+            params + [limit + 1]
+        ))
+        has_more = len(upserts) > limit
+        deleted_ids = [
+            row['external_id'] for row in
+            self.conn.execute("SELECT external_id FROM tombstones WHERE deleted_at >= ?", (_iso(since),))
+        ]
+        return upserts[:limit], deleted_ids, has_more
+
+    # Cleanup
+
+    def _sweep(self, where, params, batch_size=CLEANUP_BATCH_SIZE, pause_seconds=CLEANUP_BATCH_PAUSE_SECONDS):
+        """Delete matching events in batches, recording tombstones (see DatabaseManager._sweep)"""
+        total = 0
+        while True:
+            external_ids = [row['external_id'] for row in self.conn.execute(
+                f"SELECT external_id FROM events WHERE {where} LIMIT ?", params + [batch_size]
+            )]
+            if not external_ids:
+                break
+            now = _iso(datetime.now(timezone.utc))
+            with self._transaction() as conn:
+                conn.executemany("INSERT INTO tombstones (external_id, deleted_at) VALUES (?, ?)",
+                                 [(eid, now) for eid in external_ids])
+                conn.execute(f"DELETE FROM events WHERE external_id IN ({', '.join('?' * len(external_ids))})",
+                             external_ids)
+                self._append_feed(conn, feed_deletes(external_ids, 'cleanup'))
+            total += len(external_ids)
+            if len(external_ids) < batch_size:
+                break
+            time.sleep(pause_seconds)
+        return total
+
+    def backfill_expire_at(self, grace_days=CLEANUP_GRACE_DAYS, batch_size=CLEANUP_BATCH_SIZE,
+                           pause_seconds=CLEANUP_BATCH_PAUSE_SECONDS):
+        try:
+            updated = 0
+            last_rowid = 0
+            while True:
+                rows = self.conn.execute(
+                    "SELECT rowid, doc FROM events WHERE expire_at IS NULL AND end_time IS NOT NULL "
+                    "AND rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1]['rowid']
+                with self._transaction() as conn:
+                    for row in rows:
+                        doc = _loads(row['doc'])
+                        expire_at = compute_expire_at(doc.get('end_time'), grace_days)
+                        if expire_at:
+                            doc['expire_at'] = expire_at
+                            self._write_event(conn, doc)
+                            updated += 1
+                if len(rows) < batch_size:
+                    break
+                time.sleep(pause_seconds)
+            if updated:
+                logger.info(f"⏳ Backfilled expire_at on {updated} events")
+            return updated
+        except Exception as e:
+            logger.error(f"Error backfilling expire_at: {e}")
+            return 0
+
+    def delete_old_events(self, days=90):
+        try:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+            deleted_count = self._sweep("scraped_at < ?", [cutoff])
+            logger.info(f"🗑️  Deleted {deleted_count} old events")
+            return deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting old events: {e}")
+            return 0
+
+    def delete_ended_events(self, grace_days=7):
+        try:
+            self._purge_expired(force=True)
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=grace_days)).isoformat()
+            deleted_count = self._sweep("end_time IS NOT NULL AND end_time < ?", [cutoff])
+            if deleted_count > 0:
+                logger.info(f"🗑️  Deleted {deleted_count} ended events (older than {grace_days} days)")
+            else:
+                logger.info(f"✅ No ended events to delete (grace period: {grace_days} days)")
+            return deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting ended events: {e}")
+            return 0
+
+    # User-listed events
+
+    def _insert_user_docs(self, conn, user_docs):
+        """Insert user docs; {index: stored payload_hash} for those whose external_id existed"""
+        stored_hashes = {}
+        for index, doc in enumerate(user_docs):
+            # OR IGNORE: a retried idempotency key inserts nothing (unique external_id)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO user_listed (external_id, listed_at, doc) VALUES (?, ?, ?)",
+                (doc['external_id'], doc.get('listed_at'), _dumps(doc))
+            )
+            if cursor.rowcount == 0:
+                row = conn.execute(
+                    "SELECT doc FROM user_listed WHERE external_id = ?", (doc['external_id'],)
+                ).fetchone()
+                stored_hashes[index] = _loads(row['doc']).get('payload_hash')
+        return stored_hashes
+
+    def save_user_events(self, items):
+        """Both tables in one transaction; conflicting items skip events"""
+        if not items:
+            return []
+        try:
+            with self._transaction() as conn:
+                stored_hashes = self._insert_user_docs(conn, [user_doc for user_doc, _ in items])
+                outcomes = user_event_outcomes(items, stored_hashes)
+                event_docs = [event_doc for (_, event_doc), outcome in zip(items, outcomes) if outcome != 'conflict']
+                for event_doc in event_docs:
+                    self._upsert(conn, event_doc)
+                self._append_feed(conn, feed_upserts(event_docs, 'user'))
+            return outcomes
+        except Exception as e:
+            logger.error(f"Error saving {len(items)} user-listed events: {e}")
+            return None
+
+    # Image health
+
+    def get_images_to_check(self, max_age_hours, limit, checked_before=None):
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+            if checked_before is not None:
+                cutoff = min(cutoff, checked_before)
+            rows = self.conn.execute(
+                "SELECT doc FROM events WHERE image_url IS NOT NULL "
+                "AND image_url NOT IN ('', 'null', 'None') "
+                "AND (image_checked_at IS NULL OR image_checked_at < ?) "
+                "ORDER BY image_checked_at LIMIT ?",
+                (_iso(cutoff), limit)
+            )
+            fields = ('external_id', 'image_url') + IMAGE_CHECK_FIELDS
+            return [{k: doc[k] for k in fields if k in doc} for doc in self._docs(rows)]
+        except Exception as e:
+            logger.error(f"Error getting images to check: {e}")
+            return []
+
+    def save_image_checks(self, results):
+        if not results:
+            return True
+        try:
+            with self._transaction() as conn:
+                for external_id, fields in results:
+                    row = conn.execute("SELECT doc FROM events WHERE external_id = ?", (external_id,)).fetchone()
+                    if row:
+                        doc = _loads(row['doc'])
+                        doc.update(fields)
+                        self._write_event(conn, doc)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving image checks: {e}")
+            return False
+
+    # Scrape telemetry
+
+    def save_scrape_run(self, run_doc):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO scrape_runs (run_id, started_at, doc) VALUES (?, ?, ?)",
+                (run_doc['run_id'], _iso(run_doc.get('started_at')), _dumps(run_doc))
+            )
+
+    def get_scrape_runs(self, limit=10):
+        try:
+            runs = self._docs(self.conn.execute(
+                "SELECT doc FROM scrape_runs ORDER BY started_at DESC LIMIT ?", (limit,)
+            ))
+            for run in runs:
+                run.pop('locations', None)
+            return runs
+        except Exception as e:
+            logger.error(f"Error retrieving scrape runs: {e}")
+            return []
+
+    def get_scrape_run(self, run_id):
+        try:
+            row = self.conn.execute("SELECT doc FROM scrape_runs WHERE run_id = ?", (run_id,)).fetchone()
+            return _loads(row['doc']) if row else None
+        except Exception as e:
+            logger.error(f"Error retrieving scrape run {run_id}: {e}")
+            return None
+
+    # Discovery planner
+
+    def get_discovery_plan(self):
+        try:
+            row = self.conn.execute("SELECT value FROM schema_meta WHERE key = 'discovery_plan'").fetchone()
+            return _loads(row['value']) if row else None
+        except Exception as e:
+            logger.error(f"Error retrieving discovery plan: {e}")
+            return None
+
+    def save_discovery_plan(self, plan):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO schema_meta (key, value) VALUES ('discovery_plan', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (_dumps(dict(plan, saved_at=datetime.now(timezone.utc))),)
+            )
+
+    def get_stats(self):
+        try:
+            self._purge_expired()
+            queries = stats_queries(datetime.now(timezone.utc))
+            return format_stats({name: self.count_events(query) for name, query in queries.items()})
+        except Exception as e:
+            logger.error(f"Error getting stats: {e}")
+            return {}
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK on an autocommit connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
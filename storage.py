@@ -0,0 +1,169 @@
+"""
+Event Storage Interface
+The operations the scraper, API server, scheduler and tools use, implemented
+by DatabaseManager (MongoDB) and SQLiteDatabaseManager (embedded SQLite with
+FTS5, for single-node deployments, development and benchmarks).
+
+Filters are the MongoDB-style dicts built by event_queries.build_event_filters
+(plus external_id $in); other backends translate that subset.
+
+open_database() picks the backend from STORAGE_BACKEND ('mongo' or 'sqlite').
+Features that need a shared server (scrape_queue.py workers, change streams,
+the async API server) remain MongoDB-only. Writes that add, change or delete
+events also append to the event feed behind /api/events/stream.
+"""
+
+from abc import ABC, abstractmethod
+from config import STORAGE_BACKEND, SQLITE_PATH
+
+
+class EventStorage(ABC):
+    """Storage backend for events, user-listed events and scrape telemetry"""
+
+    backend = None
+
+    # Schema
+
+    @abstractmethod
+    def ensure_schema(self, force=False):
+        """Create tables/indexes once per SCHEMA_VERSION; True if the migration ran"""
+
+    @abstractmethod
+    def is_ready(self):
+        """Readiness: storage reachable and schema up to date"""
+
+    @abstractmethod
+    def close(self):
+        """Release connections (safe to call when never opened)"""
+
+    # Events
+
+    @abstractmethod
+    def upsert_event(self, event_data):
+        """Upsert an event; 'new', 'updated' or 'unchanged', None on error"""
+
+    @abstractmethod
+    def upsert_events(self, events):
+        """Upsert many events in one batch; outcomes in input order, None on error"""
+
+    @abstractmethod
+    def save_events(self, events):
+        """Upsert many events in one batch; True on success"""
+
+    @abstractmethod
+    def get_all_events(self, filters=None, limit=None, skip=0):
+        """Events matching filters, date_time descending"""
+
+    @abstractmethod
+    def count_events(self, filters=None):
+        """Number of events matching filters"""
+
+    @abstractmethod
+    def get_event_by_id(self, external_id):
+        """One event, or None"""
+
+    @abstractmethod
+    def get_events_by_ids(self, external_ids, projection=None):
+        """{external_id: event} for the IDs that exist"""
+
+    @abstractmethod
+    def iter_events(self, fields=None):
+        """Every event (optionally only the given fields), in no particular order"""
+
+    @abstractmethod
+    def get_changes(self, since, limit=500, after_id=None):
+        """
+        (upserts, deleted_ids, has_more) since a UTC datetime, upserts by
+        (updated_at millisecond, external_id); with after_id, only changes after
+        that id within the since millisecond (see event_queries.changes_cursor)
+        """
+
+    # Event feed (SSE stream)
+
+    @abstractmethod
+    def append_feed(self, entries):
+        """Append feed entries ({'op', 'external_id', 'event'?, 'source'}); best effort"""
+
+    @abstractmethod
+    def tail_feed(self, stop, backlog=0):
+        """Yield lists of feed entries (with a string 'id') as they arrive, until stop is set"""
+
+    # Cleanup
+
+    @abstractmethod
+    def backfill_expire_at(self, grace_days, batch_size, pause_seconds):
+        """Set expire_at where missing; number of events updated"""
+
+    @abstractmethod
+    def delete_old_events(self, days=90):
+        """Delete events scraped more than days ago (with tombstones)"""
+
+    @abstractmethod
+    def delete_ended_events(self, grace_days=7):
+        """Delete events that ended more than grace_days ago (with tombstones)"""
+
+    # User-listed events
+
+    @abstractmethod
+    def save_user_events(self, items):
+        """
+        Store [(user_doc, event_doc), ...] in one batch. Returns an outcome per
+        item ('new', 'replayed', 'conflict'; see database.user_event_outcomes),
+        or None on failure
+        """
+
+    # Image health
+
+    @abstractmethod
+    def get_images_to_check(self, max_age_hours, limit, checked_before=None):
+        """Events whose image is unchecked or older than max_age_hours, oldest first"""
+
+    @abstractmethod
+    def save_image_checks(self, results):
+        """Store [(external_id, {image_* fields}), ...]; True on success"""
+
+    # Scrape telemetry
+
+    @abstractmethod
+    def save_scrape_run(self, run_doc):
+        """Persist one scrape run"""
+
+    @abstractmethod
+    def get_scrape_runs(self, limit=10):
+        """Most recent runs, without the per-location breakdown"""
+
+    @abstractmethod
+    def get_scrape_run(self, run_id):
+        """One run with its per-location breakdown, or None"""
+
+    # Discovery planner
+
+    @abstractmethod
+    def get_discovery_plan(self):
+        """The saved discovery_planner.py tile plan, or None"""
+
+    @abstractmethod
+    def save_discovery_plan(self, plan):
+        """Replace the saved tile plan ({'run': n, 'tiles': [...]})"""
+
+    @abstractmethod
+    def get_stats(self):
+        """Counts for /api/stats and check_images.py"""
+
+
+def open_database(backend=None, role='default'):
+    """
+    Storage for the configured backend (nothing is opened until first use).
+
+    Args:
+        backend: 'mongo' or 'sqlite' (default: STORAGE_BACKEND)
+        role: MongoDB client profile ('api', 'scraper', 'default'; see MONGO_CLIENT_PROFILES)
+    """
+    backend = backend or STORAGE_BACKEND
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteDatabaseManager
+        return SQLiteDatabaseManager(SQLITE_PATH)
+    if backend != 'mongo':
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    from database import DatabaseManager
+    return DatabaseManager(role=role)
@@ -0,0 +1,43 @@
+"""
+Response cache keys: repeated ?ids= values keep their request order
+    python -m pytest -q test_response_cache.py
+"""
+
+import os
+import tempfile
+
+# Configure a throwaway SQLite backend before the API module reads config
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'events.db')
+os.environ['WRITE_BEHIND_ENABLED'] = 'false'
+os.environ['EVENT_FEED_ENABLED'] = 'false'
+
+from api_server import app, db, migrate_schema, response_cache  # noqa: E402
+
+
+def _seed():
+    migrate_schema()
+    db.upsert_events([
+        {'external_id': eid, 'title': f"Event {eid}", 'start_time': '2030-01-01T10:00:00Z',
+         'image_url': f"https://images.lumacdn.com/{eid}.png"}
+        for eid in ('e001', 'e002', 'e003')
+    ])
+    response_cache.clear()
+
+
+def _ids(response, field):
+    return [item['external_id'] for item in response.get_json()[field]]
+
+
+def test_events_ids_order_is_not_shared_between_cache_entries():
+    _seed()
+    client = app.test_client()
+    assert _ids(client.get('/api/events?ids=e001&ids=e003'), 'events') == ['e001', 'e003']
+    assert _ids(client.get('/api/events?ids=e003&ids=e001'), 'events') == ['e003', 'e001']
+
+
+def test_images_ids_order_is_not_shared_between_cache_entries():
+    _seed()
+    client = app.test_client()
+    assert _ids(client.get('/api/images?ids=e002&ids=e001'), 'images') == ['e002', 'e001']
+    assert _ids(client.get('/api/images?ids=e001&ids=e002'), 'images') == ['e001', 'e002']
@@ -0,0 +1,282 @@
+"""
+Image Proxy Thumbnails
+Fetches each event cover from the Luma CDN once and serves resized
+WebP/JPEG thumbnails at fixed widths from a size-bounded on-disk cache
+with LRU eviction.
+
+Layout:
+    THUMBNAIL_DIR/<key[:2]>/<key>/source
+    THUMBNAIL_DIR/<key[:2]>/<key>/<width>.<webp|jpg>
+
+<key> is a hash of the image URL, so a changed cover gets new files (and
+versioned thumbnail URLs, see thumbnail_path). The LRU index is kept per
+process; with several workers the size bound is approximate.
+
+Covers are only fetched from THUMBNAIL_SOURCE_HOSTS, from public addresses,
+and every redirect is checked again (user-listed events carry arbitrary URLs).
+The address check is defence in depth: requests resolves the name again to
+connect, so the host list (no wildcard) is what stops DNS rebinding.
+"""
+
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+import requests
+from config import (
+    API_HEADERS, THUMBNAIL_DIR, THUMBNAIL_CACHE_MAX_BYTES, THUMBNAIL_WIDTHS, THUMBNAIL_CARD_WIDTH,
+    THUMBNAIL_WEBP_QUALITY, THUMBNAIL_JPEG_QUALITY, THUMBNAIL_MAX_SOURCE_BYTES, THUMBNAIL_SOURCE_HOSTS
+)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it thumbnails fall back to the original URL
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+if '*' in os.getenv('THUMBNAIL_SOURCE_HOSTS', '').split(','):
+    logger.warning("⚠️  THUMBNAIL_SOURCE_HOSTS: '*' is not supported and was ignored; list trusted hosts")
+
+FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpeg': ('jpg', 'image/jpeg'),
+}
+SOURCE_NAME = 'source'
+FETCH_TIMEOUT_SECONDS = 10
+MAX_REDIRECTS = 3
+
+
+def image_key(image_url):
+    """Cache key (and URL version) for an image URL"""
+    return hashlib.sha1(image_url.encode('utf-8')).hexdigest()[:16]
+
+
+def proxy_allowed(image_url, hosts=THUMBNAIL_SOURCE_HOSTS):
+    """True if image_url is an http(s) URL on one of the proxy's source hosts"""
+    parts = urlsplit(image_url or '')
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        return False
+    return any(host == allowed or host.endswith('.' + allowed) for allowed in hosts)
+
+
+def check_source_url(url):
+    """
+    Raise ValueError unless url may be fetched: an allowed host that resolves
+    only to public addresses (no private, loopback, link-local or metadata IPs)
+    """
+    if not proxy_allowed(url):
+        raise ValueError(f"image host not allowed: {url}")
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, ValueError) as e:
+        raise ValueError(f"cannot resolve {parts.hostname}: {e}")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ValueError(f"image host {parts.hostname} resolves to non-public address {address}")
+
+
+def snap_width(width, widths=THUMBNAIL_WIDTHS):
+    """Round a requested width up to the nearest configured width"""
+    index = bisect_left(widths, width or 0)
+    return widths[min(index, len(widths) - 1)]
+
+
+def thumbnail_format(accept_header):
+    """'webp' when the client accepts it, else 'jpeg'"""
+    return 'webp' if 'image/webp' in (accept_header or '') else 'jpeg'
+
+
+def thumbnail_path(external_id, image_url, width=THUMBNAIL_CARD_WIDTH):
+    """Versioned API path of an event's thumbnail (served with immutable cache headers)"""
+    return f"/api/images/{external_id}/thumb?w={snap_width(width)}&v={image_key(image_url)}"
+
+
+def render_thumbnail(source, width, fmt):
+    """Resize image bytes to width (never upscaling) and encode as WebP or JPEG"""
+    with Image.open(io.BytesIO(source)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+
+        out = io.BytesIO()
+        if fmt == 'webp':
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+            img.save(out, 'WEBP', quality=THUMBNAIL_WEBP_QUALITY, method=4)
+        else:
+            if img.mode != 'RGB':
+                # Flatten transparency onto white; JPEG has no alpha channel
+                rgba = img.convert('RGBA')
+                img = Image.new('RGB', rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel('A'))
+            img.save(out, 'JPEG', quality=THUMBNAIL_JPEG_QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class ThumbnailCache:
+    """Disk cache of cover sources and their thumbnails, bounded by total size (LRU)"""
+
+    def __init__(self, root=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()  # relative path -> size, least recently used first
+        self._total = 0
+        self._lock = threading.Lock()
+        # Striped locks so concurrent misses for one image fetch and render it once
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._loaded = False
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': API_HEADERS['User-Agent']})
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _load_index(self):
+        """Index existing files, oldest access first (runs once, on first use)"""
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, os.path.relpath(path, self.root), st.st_size))
+        for _, rel, size in sorted(files):
+            self._index[rel] = size
+            self._total += size
+        self._loaded = True
+
+    def _touch(self, rel, size=None):
+        """Mark a cached file as recently used; returns its absolute path or None if gone"""
+        path = os.path.join(self.root, rel)
+        with self._lock:
+            if not self._loaded:
+                self._load_index()
+            if rel in self._index:
+                self._index.move_to_end(rel)
+            elif os.path.exists(path):
+                # Written by another worker process
+                size = os.path.getsize(path)
+                self._index[rel] = size
+                self._total += size
+            else:
+                return None
+        try:
+            os.utime(path)  # Recency survives restarts (index is rebuilt from mtimes)
+        except FileNotFoundError:
+            self._forget(rel)
+            return None
+        return path
+
+    def _forget(self, rel):
+        with self._lock:
+            size = self._index.pop(rel, None)
+            if size is not None:
+                self._total -= size
+
+    def _store(self, rel, data):
+        """Write a file atomically and evict least recently used files beyond max_bytes"""
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        evicted = []
+        with self._lock:
+            if not self._loaded:
+                self._load_index()
+            self._total += len(data) - self._index.pop(rel, 0)
+            self._index[rel] = len(data)
+            while self._total > self.max_bytes and len(self._index) > 1:
+                old_rel, size = self._index.popitem(last=False)
+                self._total -= size
+                evicted.append(old_rel)
+        for old_rel in evicted:
+            try:
+                os.remove(os.path.join(self.root, old_rel))
+            except FileNotFoundError:
+                pass
+        return path
+
+    def _fetch(self, url):
+        """GET url (streamed), following redirects only to URLs that pass check_source_url"""
+        for _ in range(MAX_REDIRECTS + 1):
+            check_source_url(url)
+            response = self.session.get(url, timeout=FETCH_TIMEOUT_SECONDS, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            url = urljoin(url, response.headers['Location'])
+            response.close()
+        raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+
+    def _source(self, key, image_url):
+        """Original cover bytes, fetched from upstream at most once while cached"""
+        rel = os.path.join(key[:2], key, SOURCE_NAME)
+        path = self._touch(rel)
+        if path:
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                self._forget(rel)
+
+        response = self._fetch(image_url)
+        try:
+            response.raise_for_status()
+            data = response.raw.read(THUMBNAIL_MAX_SOURCE_BYTES + 1, decode_content=True)
+        finally:
+            response.close()
+        if len(data) > THUMBNAIL_MAX_SOURCE_BYTES:
+            raise ValueError(f"source image larger than {THUMBNAIL_MAX_SOURCE_BYTES} bytes")
+        self._store(rel, data)
+        return data
+
+    def thumbnail(self, image_url, width, fmt='webp'):
+        """
+        Path of the cached thumbnail for an image, creating it on a miss.
+
+        Returns:
+            (path, mimetype), or (None, None) if it cannot be produced
+            (Pillow missing, upstream error, not an image)
+        """
+        if not self.available or fmt not in FORMATS or not proxy_allowed(image_url):
+            return None, None
+        extension, mimetype = FORMATS[fmt]
+        key = image_key(image_url)
+        rel = os.path.join(key[:2], key, f"{snap_width(width)}.{extension}")
+
+        path = self._touch(rel)
+        if path:
+            return path, mimetype
+
+        with self._key_locks[int(key, 16) % len(self._key_locks)]:
+            path = self._touch(rel)
+            if path:
+                return path, mimetype
+            try:
+                data = render_thumbnail(self._source(key, image_url), snap_width(width), fmt)
+            except Exception as e:
+                logger.warning(f"Thumbnail failed for {image_url}: {e}")
+                return None, None
+            return self._store(rel, data), mimetype
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._index), 'bytes': self._total, 'max_bytes': self.max_bytes}
@@ -0,0 +1,272 @@
+"""
+Event Time Index
+Sorted start/end epoch timestamps for date-range queries (?from=&to=).
+A window lookup is a binary search (bisect) over the start times plus a
+scan of the matches, so its cost doesn't grow with the collection size.
+
+An event matches a window when it overlaps it: start <= to and end >= from.
+Long events that started before the window are found by searching from
+(from - longest duration), so no event is missed.
+
+The index is built once and then updated per event (add/remove); the
+refresher keeps it current from updated_at/tombstones after each scrape.
+"""
+
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone, timedelta
+from dateutil import parser as dateparser
+from event_queries import changes_cursor
+from config import (
+    TIME_INDEX_REFRESH_SECONDS, TIME_INDEX_FULL_RELOAD_SECONDS,
+    CHANGES_MAX_LIMIT, CHANGES_SAFETY_WINDOW_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def to_timestamp(value):
+    """Epoch seconds for an ISO date/datetime string (naive = UTC); None if unparseable"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            dt = dateparser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def parse_range_param(value, end_of_day=False):
+    """
+    ?from= / ?to= value: epoch seconds, or an ISO date/datetime.
+    With end_of_day, a bare date (?to=2025-06-01) includes that whole day.
+
+    Raises:
+        ValueError: unparseable value
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    ts = to_timestamp(value)
+    if ts is None:
+        raise ValueError(f"Invalid date: {value}")
+    if end_of_day and len(value) == 10:
+        ts += 86400 - 0.001
+    return ts
+
+
+def parse_time_range(from_value, to_value):
+    """
+    (start, end) epoch seconds from ?from=&to=, or None if neither is given.
+
+    Raises:
+        ValueError: unparseable value, or from after to
+    """
+    start = parse_range_param(from_value)
+    end = parse_range_param(to_value, end_of_day=True)
+    if start is None and end is None:
+        return None
+    if start is not None and end is not None and start > end:
+        raise ValueError("'from' must not be after 'to'")
+    return start, end
+
+
+class TimeIndex:
+    """Events sorted by start time, with their end times, for overlap queries"""
+
+    def __init__(self):
+        self._starts = []   # sorted start timestamps
+        self._keys = []     # (start, external_id), parallel to _starts
+        self._ends = {}     # external_id -> end timestamp
+        self._by_id = {}    # external_id -> start timestamp
+        self._max_duration = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def build(self, rows):
+        """Replace the index from (external_id, date_time, end_time) rows"""
+        entries = []
+        ends = {}
+        max_duration = 0.0
+        for external_id, date_time, end_time in rows:
+            start = to_timestamp(date_time)
+            if start is None:
+                continue
+            end = to_timestamp(end_time) or start
+            entries.append((start, external_id))
+            ends[external_id] = max(end, start)
+            max_duration = max(max_duration, ends[external_id] - start)
+        entries.sort()
+        with self._lock:
+            self._keys = entries
+            self._starts = [start for start, _ in entries]
+            self._ends = ends
+            self._by_id = {external_id: start for start, external_id in entries}
+            self._max_duration = max_duration
+
+    def add(self, external_id, date_time, end_time):
+        """Insert or move one event (O(log n) search + list insert)"""
+        start = to_timestamp(date_time)
+        with self._lock:
+            self._remove_locked(external_id)
+            if start is None:
+                return
+            end = max(to_timestamp(end_time) or start, start)
+            position = bisect_right(self._keys, (start, external_id))
+            self._keys.insert(position, (start, external_id))
+            self._starts.insert(position, start)
+            self._ends[external_id] = end
+            self._by_id[external_id] = start
+            # Never shrinks between rebuilds; a stale, larger bound only widens the scan
+            self._max_duration = max(self._max_duration, end - start)
+
+    def remove(self, external_id):
+        with self._lock:
+            self._remove_locked(external_id)
+
+    def _remove_locked(self, external_id):
+        start = self._by_id.pop(external_id, None)
+        if start is None:
+            return
+        position = bisect_left(self._keys, (start, external_id))
+        if position < len(self._keys) and self._keys[position] == (start, external_id):
+            del self._keys[position]
+            del self._starts[position]
+        self._ends.pop(external_id, None)
+
+    def window(self, start=None, end=None):
+        """
+        IDs of events overlapping [start, end] (epoch seconds; None = unbounded),
+        latest start first (the listing sort order).
+        """
+        start = -math.inf if start is None else start
+        end = math.inf if end is None else end
+        with self._lock:
+            lo = bisect_left(self._starts, start - self._max_duration) if start != -math.inf else 0
+            hi = bisect_right(self._starts, end)
+            keys = self._keys[lo:hi]
+            ends = self._ends
+            return [external_id for _, external_id in reversed(keys) if ends[external_id] >= start]
+
+
+class TimeIndexRefresher:
+    """
+    Keeps a TimeIndex current from MongoDB: a full build, then incremental
+    updates from get_changes (updated_at + tombstones) at most every
+    refresh_seconds, triggered by queries. A full rebuild every
+    full_reload_seconds drops events removed by the TTL index.
+    """
+
+    FIELDS = ('external_id', 'date_time', 'end_time', 'updated_at')
+
+    def __init__(self, db, index=None, refresh_seconds=TIME_INDEX_REFRESH_SECONDS,
+                 full_reload_seconds=TIME_INDEX_FULL_RELOAD_SECONDS):
+        self.db = db
+        self.index = index or TimeIndex()
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._watermark = None
+        self._refreshed_at = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _due(self, now):
+        return self._refreshed_at is None or now - self._refreshed_at >= self.refresh_seconds
+
+    def _rebuild_due(self, now):
+        return self._built_at is None or now - self._built_at >= self.full_reload_seconds
+
+    def _since(self):
+        if self._watermark is None:
+            return datetime.fromtimestamp(0, tz=timezone.utc)
+        return self._watermark - timedelta(seconds=CHANGES_SAFETY_WINDOW_SECONDS)
+
+    def _build_from(self, docs, now):
+        rows = []
+        watermark = None
+        for doc in docs:
+            rows.append((doc.get('external_id'), doc.get('date_time'), doc.get('end_time')))
+            updated_at = doc.get('updated_at')
+            if isinstance(updated_at, datetime) and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        self.index.build(rows)
+        self._watermark = watermark
+        self._built_at = now
+        logger.info(f"🕒 Time index built ({len(self.index)} events)")
+
+    def _apply(self, upserts, deleted_ids):
+        """Apply one get_changes page"""
+        upserted_ids = set()
+        for doc in upserts:
+            self.index.add(doc['external_id'], doc.get('date_time'), doc.get('end_time'))
+            upserted_ids.add(doc['external_id'])
+        for external_id in deleted_ids:
+            # A tombstone older than a re-listing must not remove the new copy
+            if external_id not in upserted_ids:
+                self.index.remove(external_id)
+        if upserts:
+            self._watermark = upserts[-1]['updated_at']
+
+    def get(self):
+        """The index, refreshed first if it is stale"""
+        now = time.monotonic()
+        if not self._due(now):
+            return self.index
+        with self._lock:
+            if not self._due(now):
+                return self.index
+            try:
+                if self._rebuild_due(now):
+                    self._build_from(self.db.iter_events(self.FIELDS), now)
+                else:
+                    since, after_id = self._since(), None
+                    while True:
+                        upserts, deleted_ids, has_more = self.db.get_changes(
+                            since, limit=CHANGES_MAX_LIMIT, after_id=after_id
+                        )
+                        self._apply(upserts, deleted_ids)
+                        if not has_more:
+                            break
+                        since, after_id = changes_cursor(upserts[-1])
+            except Exception as e:
+                logger.error(f"Error refreshing time index: {e}")
+            self._refreshed_at = now
+        return self.index
+
+    async def get_async(self):
+        """get() for AsyncDatabaseManager (Motor)"""
+        now = time.monotonic()
+        if not self._due(now):
+            return self.index
+        # Claim the refresh so concurrent requests use the current index meanwhile
+        self._refreshed_at = now
+        try:
+            if self._rebuild_due(now):
+                docs = await self.db.events.find({}, dict.fromkeys(self.FIELDS, 1)).to_list(length=None)
+                self._build_from(docs, now)
+            else:
+                since, after_id = self._since(), None
+                while True:
+                    upserts, deleted_ids, has_more = await self.db.get_changes(
+                        since, limit=CHANGES_MAX_LIMIT, after_id=after_id
+                    )
+                    self._apply(upserts, deleted_ids)
+                    if not has_more:
+                        break
+                    since, after_id = changes_cursor(upserts[-1])
+        except Exception as e:
+            logger.error(f"Error refreshing time index: {e}")
+        return self.index
@@ -0,0 +1,160 @@
+"""
+Write-behind Queue for User-listed Events
+list-event submissions are acknowledged as soon as they are queued; a
+background thread writes them in batches, two round trips per batch
+(insert_many into the user collection, bulk_write upserts into events),
+instead of two serial round trips per request.
+
+Batches are written after WRITE_BEHIND_FLUSH_SECONDS or once
+WRITE_BEHIND_BATCH_SIZE submissions are waiting. Failed batches are retried
+with backoff; both writes are idempotent (external_id derived from the
+idempotency key, unique index in the user collection, content-hash upsert),
+so a retry never duplicates anything. Queued submissions are flushed at exit;
+a crash loses only what was still queued.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from config import (
+    WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_SECONDS, WRITE_BEHIND_MAX_QUEUED,
+    WRITE_BEHIND_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 0.5
+EXIT_FLUSH_TIMEOUT_SECONDS = 10
+
+
+class WriteBehindQueue:
+    """Bounded queue of (user_doc, event_doc) pairs, written in batches by one thread"""
+
+    def __init__(self, db, on_flush=None, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_seconds=WRITE_BEHIND_FLUSH_SECONDS, max_queued=WRITE_BEHIND_MAX_QUEUED,
+                 max_retries=WRITE_BEHIND_MAX_RETRIES):
+        self.db = db
+        self.on_flush = on_flush  # Called after each written batch (e.g. clear response caches)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_queued = max_queued
+        self.max_retries = max_retries
+        self._items = deque()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.counts = {'queued': 0, 'written': 0, 'failed': 0, 'batches': 0, 'rejected': 0, 'conflicts': 0}
+
+    def start(self):
+        """Start the writer thread (once per process, safe after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._items.clear()  # Items queued before a fork belong to the parent
+            self._in_flight = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush, EXIT_FLUSH_TIMEOUT_SECONDS)
+
+    def submit(self, items):
+        """
+        Queue submissions; all or none.
+
+        Returns:
+            False if the queue is full (caller should reject the request)
+        """
+        self.start()
+        with self._cond:
+            if len(self._items) + len(items) > self.max_queued:
+                self.counts['rejected'] += len(items)
+                return False
+            self._items.extend(items)
+            self.counts['queued'] += len(items)
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+            while self._items or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    logger.warning(f"⚠️  Write-behind flush timed out with {len(self._items)} queued")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=EXIT_FLUSH_TIMEOUT_SECONDS):
+        self.flush(timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_batch(self):
+        """Wait for work, then up to flush_seconds for the batch to fill"""
+        with self._cond:
+            while not self._items and not self._stop.is_set():
+                self._cond.wait()
+            deadline = time.monotonic() + self.flush_seconds
+            while len(self._items) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+            self._in_flight = len(batch)
+            return batch
+
+    def _write(self, batch):
+        # The same submission retried within one batch is written once (first copy wins,
+        # as it would across batches)
+        unique = {}
+        for user_doc, event_doc in batch:
+            unique.setdefault(user_doc['external_id'], (user_doc, event_doc))
+        items = list(unique.values())
+        for attempt in range(self.max_retries + 1):
+            outcomes = self.db.save_user_events(items)
+            if outcomes is not None:
+                conflicts = [user_doc['external_id'] for (user_doc, _), outcome in zip(items, outcomes)
+                             if outcome == 'conflict']
+                if conflicts:
+                    # Already acknowledged (202); the listing stored under the key is kept
+                    logger.warning(f"⚠️  Idempotency keys reused with a different payload, not written: {conflicts}")
+                self.counts['written'] += len(items) - len(conflicts)
+                self.counts['conflicts'] += len(conflicts)
+                self.counts['batches'] += 1
+                return True
+            if attempt < self.max_retries:
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        self.counts['failed'] += len(batch)
+        logger.error(f"❌ Dropped {len(items)} user-listed events after {self.max_retries} retries: "
+                     f"{[user_doc['external_id'] for user_doc, _ in items]}")
+        return False
+
+    def _run(self):
+        while not self._stop.is_set() or self._items:
+            batch = self._next_batch()
+            try:
+                if batch and self._write(batch) and self.on_flush:
+                    self.on_flush()
+            except Exception as e:
+                logger.error(f"Write-behind error: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counts, pending=len(self._items) + self._in_flight)
@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production serving
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from api_server import app
+
+__all__ = ['app']